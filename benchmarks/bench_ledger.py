@@ -0,0 +1,71 @@
+"""
+Запись сделки: перезапись портфеля целиком (снимок в portfolios.json)
+против дописывания одного события в журнал; время восстановления
+состояния (снимки + хвост журнала).
+
+Запуск (данные создаются во временной папке):
+    poetry run python benchmarks/bench_ledger.py --users 2000 --trades 500
+"""
+import argparse
+import os
+import time
+
+from workdir import temp_workdir
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000, help="портфелей в хранилище")
+    parser.add_argument("--trades", type=int, default=500)
+    args = parser.parse_args()
+
+    with temp_workdir("bench_ledger_"):
+        with open("pyproject.toml", "w", encoding="utf-8") as f:
+            # снимок не должен срабатывать посреди замера
+            f.write(f'[tool.valutatrade]\nDATA_DIR = "data"\nLEDGER_SNAPSHOT_EVERY = {args.trades * 10}\n')
+        os.makedirs("data", exist_ok=True)
+
+        # импорт после chdir: настройки читаются из pyproject.toml рабочей папки
+        from finalproject_1_perfilova.core import usecases
+        from finalproject_1_perfilova.core.models import Portfolio
+        from finalproject_1_perfilova.infra.record_store import get_record_store, PORTFOLIOS
+
+        store = get_record_store()
+        store.put_many(
+            PORTFOLIOS,
+            {uid: Portfolio(uid, {}).to_dict() for uid in range(1, args.users + 1)},
+        )
+        print(f"users={args.users} trades={args.trades}")
+
+        # было: прочитать портфель, изменить, перезаписать файл хранилища
+        started_at = time.perf_counter()
+        for _ in range(args.trades):
+            portfolio = Portfolio.from_dict(store.get(PORTFOLIOS, 1))
+            usecases._apply_buy(portfolio, "EUR", 1.0)
+            store.put(PORTFOLIOS, 1, portfolio.to_dict(), expected_version=portfolio.version)
+        rewrite = (time.perf_counter() - started_at) / args.trades
+
+        # стало: одно событие в журнал (с fsync)
+        started_at = time.perf_counter()
+        for _ in range(args.trades):
+            event = usecases._trade_event(2, "buy", "EUR", 1.0, 1.1, "USD")
+            usecases.ledger.append([event])
+        append = (time.perf_counter() - started_at) / args.trades
+
+        print(f"перезапись портфеля : {rewrite * 1e3:7.2f} ms/сделка")
+        print(f"событие в журнал    : {append * 1e3:7.2f} ms/сделка (x{rewrite / append:.1f})")
+
+        started_at = time.perf_counter()
+        portfolio = usecases.load_portfolio(2)
+        print(
+            f"восстановление: снимок + хвост из {usecases.ledger.tail_length()} событий "
+            f"за {(time.perf_counter() - started_at) * 1e3:.1f} ms, EUR={portfolio.get_wallet('EUR').balance:.2f}"
+        )
+
+        started_at = time.perf_counter()
+        moved = usecases.snapshot_portfolios()
+        print(f"снимок портфелей: {moved} событий за {(time.perf_counter() - started_at) * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Стоимость записи лога для вызывающего потока: FileHandler с f-строкой
+(как было) против очереди фонового писателя из logging_config.
+
+Замеры: вызовы с паузой (--gap-ms, как ожидание ввода-вывода между запросами)
+и записи подряд. Время досписывания очереди — работа, которую фоновый поток
+делает уже вне пути сделки.
+
+Запуск (логи пишутся во временную папку):
+    poetry run python benchmarks/bench_logging.py --ops 50000
+"""
+import argparse
+import logging
+import logging.handlers
+import os
+import queue
+import time
+
+from workdir import temp_workdir
+
+
+class FsyncFileHandler(logging.FileHandler):
+    """Диск, который «тормозит»: fsync после каждой записи."""
+
+    def emit(self, record):
+        super().emit(record)
+        self.flush()
+        os.fsync(self.stream.fileno())
+
+
+def run(title, ops, emit):
+    started_at = time.perf_counter()
+    for i in range(ops):
+        emit(i)
+    elapsed = time.perf_counter() - started_at
+    print(f"{title:38s}: {elapsed / ops * 1e6:6.2f} us/запись")
+    return elapsed
+
+
+def run_spaced(title, ops, emit, gap: float):
+    """Время каждого вызова отдельно, с паузой gap секунд между вызовами."""
+    timings = []
+    for i in range(ops):
+        started_at = time.perf_counter()
+        emit(i)
+        timings.append(time.perf_counter() - started_at)
+        time.sleep(gap)
+    timings.sort()
+    mean = sum(timings) / ops
+    p99 = timings[min(ops - 1, int(ops * 0.99))]
+    print(f"{title:38s}: {mean * 1e6:6.2f} us/запись, p99 {p99 * 1e6:6.2f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=50000)
+    parser.add_argument("--spaced-ops", type=int, default=2000, help="вызовов в замере с паузами")
+    parser.add_argument("--gap-ms", type=float, default=0.2, help="пауза между вызовами")
+    args = parser.parse_args()
+
+    with temp_workdir("bench_logging_"):
+        with open("pyproject.toml", "w", encoding="utf-8") as f:
+            f.write('[tool.valutatrade]\nLOG_DIR = "logs"\n')
+
+        # было: синхронная запись в файл, строка собирается в вызывающем потоке
+        sync = logging.getLogger("bench.sync")
+        sync.propagate = False
+        handler = logging.FileHandler("sync.log", encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(levelname)s %(asctime)s %(message)s"))
+        sync.addHandler(handler)
+        sync.setLevel(logging.INFO)
+
+        def emit_sync(i):
+            sync.info(
+                f"BUY user='bench' currency='BTC' amount={0.01 * i:.4f} "
+                f"rate={60000.0:.2f} base='USD' result=OK"
+            )
+
+        # импорт после chdir: настройки читаются из pyproject.toml рабочей папки
+        from finalproject_1_perfilova import logging_config
+        from finalproject_1_perfilova.decorators import log_event
+
+        logging_config.setup_logging()
+
+        def emit_queue(i):
+            log_event("BUY", {"username": "bench", "currency": "BTC", "amount": 0.01 * i, "rate": 60000.0, "base": "USD"})
+
+        gap = args.gap_ms / 1000
+        print(f"вызовы с паузой {args.gap_ms} ms, ops={args.spaced_ops}")
+        run_spaced("FileHandler + f-строка (было)", args.spaced_ops, emit_sync, gap)
+        run_spaced("очередь, поля (стало)", args.spaced_ops, emit_queue, gap)
+
+        print(f"записи подряд, ops={args.ops}")
+        run("FileHandler + f-строка (было)", args.ops, emit_sync)
+        run("очередь, поля (стало)", args.ops, emit_queue)
+
+        started_at = time.perf_counter()
+        logging_config.shutdown_logging()
+        print(f"досписывание очереди фоновым потоком: {(time.perf_counter() - started_at) * 1e3:.0f} ms")
+
+        logging.getLogger("valutatrade.actions").setLevel(logging.WARNING)
+        run("уровень WARNING (поля не собираются)", args.ops, emit_queue)
+
+        # медленный диск: синхронный fsync против того же обработчика за очередью
+        n = min(args.ops, 2000)
+        slow = FsyncFileHandler("fsync_sync.log", encoding="utf-8")
+        sync.removeHandler(handler)
+        sync.addHandler(slow)
+        print(f"медленный диск (fsync на каждую запись), ops={n}")
+        run("fsync в вызывающем потоке", n, emit_sync)
+
+        log_queue = queue.SimpleQueue()
+        queued = logging.getLogger("bench.queued")
+        queued.propagate = False
+        queued.addHandler(logging.handlers.QueueHandler(log_queue))
+        listener = logging.handlers.QueueListener(log_queue, FsyncFileHandler("fsync_queue.log", encoding="utf-8"))
+        listener.start()
+        run("fsync за очередью", n, lambda i: queued.info("BUY amount=%.4f", 0.01 * i))
+        listener.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Память на кошелёк: объекты с __dict__ (как было до __slots__), текущие
+Portfolio/Wallet на __slots__ и PortfolioTable (параллельные массивы).
+
+Запуск:
+    poetry run python benchmarks/bench_memory.py --users 20000 --wallets 4
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from bench_valuation import make_portfolios
+
+from finalproject_1_perfilova.core.models import Portfolio
+from finalproject_1_perfilova.core.valuation import PortfolioTable
+
+
+class DictWallet:
+    """Раскладка Wallet до __slots__: атрибуты в __dict__ экземпляра."""
+
+    def __init__(self, currency_code: str, balance: float):
+        self._currency_code = currency_code
+        self._balance = balance
+
+
+class DictPortfolio:
+    def __init__(self, user_id: int, wallets: dict):
+        self._user_id = user_id
+        self._wallets = wallets
+        self.version = 0
+
+
+def build_dict_objects(records):
+    return [
+        DictPortfolio(
+            int(p["user_id"]),
+            {code: DictWallet(code, float(w["balance"])) for code, w in p["wallets"].items()},
+        )
+        for p in records
+    ]
+
+
+def build_slotted_objects(records):
+    return [Portfolio.from_dict(p) for p in records]
+
+
+def measure(build, records):
+    """Байты, которые остаются занятыми построенной структурой."""
+    gc.collect()
+    tracemalloc.start()
+    result = build(records)
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--wallets", type=int, default=4)
+    args = parser.parse_args()
+
+    records = make_portfolios(args.users, args.wallets)
+    wallets = sum(len(p["wallets"]) for p in records)
+    print(f"users={args.users} wallets={wallets}")
+
+    for title, build in (
+        ("объекты с __dict__ (было)", build_dict_objects),
+        ("Portfolio/Wallet __slots__", build_slotted_objects),
+        ("PortfolioTable", PortfolioTable.from_records),
+    ):
+        used = measure(build, records)
+        print(f"{title:28s}: {used / wallets:8.1f} байт/кошелёк ({used / 1024 / 1024:.1f} MiB)")
+
+    # доступ к Portfolio.wallets: раньше — копия dict, теперь — MappingProxyType
+    portfolio = Portfolio.from_dict(records[0])
+    n = 200000
+    started_at = time.perf_counter()
+    for _ in range(n):
+        dict(portfolio._wallets)
+    copy_ns = (time.perf_counter() - started_at) / n * 1e9
+    started_at = time.perf_counter()
+    for _ in range(n):
+        portfolio.wallets
+    view_ns = (time.perf_counter() - started_at) / n * 1e9
+    print(f"Portfolio.wallets: копия dict {copy_ns:.0f} ns, view {view_ns:.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Накладные расходы инструментирования: вызов функции без декоратора,
+с metrics.timed при выключенных и включённых метриках.
+
+Запуск:
+    poetry run python benchmarks/bench_metrics.py --ops 1000000
+"""
+import argparse
+import time
+
+from finalproject_1_perfilova.infra import metrics
+
+
+def plain(x):
+    return x + 1
+
+
+@metrics.timed("bench")
+def instrumented(x):
+    return x + 1
+
+
+@metrics.timed("bench_labeled", labels_from=lambda x: {"parity": x & 1})
+def labeled(x):
+    return x + 1
+
+
+def per_call(func, ops):
+    started_at = time.perf_counter()
+    for i in range(ops):
+        func(i)
+    return (time.perf_counter() - started_at) / ops * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=1000000)
+    args = parser.parse_args()
+
+    base = per_call(plain, args.ops)
+    print(f"ops={args.ops}")
+    print(f"без декоратора              : {base:6.0f} ns/вызов")
+
+    metrics.configure(enabled=False)
+    print(f"timed, метрики выключены    : {per_call(instrumented, args.ops) - base:+6.0f} ns/вызов")
+
+    metrics.configure(enabled=True)
+    print(f"timed, метрики включены     : {per_call(instrumented, args.ops) - base:+6.0f} ns/вызов")
+    print(f"timed + labels_from         : {per_call(labeled, args.ops) - base:+6.0f} ns/вызов")
+
+    # в файл метрик не пишем: это только замер
+    metrics.registry.drain()
+    metrics.configure(enabled=False)
+
+
+if __name__ == "__main__":
+    main()
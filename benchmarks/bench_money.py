@@ -0,0 +1,89 @@
+"""
+Баланс в минимальных единицах (int) против float и decimal.Decimal:
+точность после множества операций и скорость в горячем цикле.
+
+Запуск:
+    poetry run python benchmarks/bench_money.py --ops 1000000
+"""
+import argparse
+import random
+import time
+from decimal import Decimal
+
+from finalproject_1_perfilova.core import money
+from finalproject_1_perfilova.core.models import Wallet
+
+
+def run(title, func, *args):
+    started_at = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started_at
+    return title, elapsed, result
+
+
+def float_loop(amounts):
+    balance = 0.0
+    for a in amounts:
+        balance += a
+        balance -= a / 2
+    return balance
+
+
+def decimal_loop(amounts):
+    balance = Decimal(0)
+    half = Decimal(2)
+    for a in amounts:
+        balance += a
+        balance -= a / half
+    return balance
+
+
+def units_loop(amounts):
+    balance = 0
+    for a in amounts:
+        balance += a
+        balance -= a // 2
+    return balance
+
+
+def wallet_loop(amounts):
+    wallet = Wallet("BTC", 0)
+    for a in amounts:
+        wallet.deposit(a)
+        wallet.withdraw(a / 2)
+    return wallet.units
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=1000000)
+    args = parser.parse_args()
+
+    rnd = random.Random(7)
+    # суммы с 2 знаками, чётное число сотых: половина тоже точна
+    cents = [rnd.randrange(2, 100000, 2) for _ in range(args.ops)]
+    exact = sum(c - c // 2 for c in cents)
+
+    results = [
+        run("float", float_loop, [c / 100 for c in cents]),
+        run("decimal.Decimal", decimal_loop, [Decimal(c).scaleb(-2) for c in cents]),
+        run("int (мин. единицы)", units_loop, cents),
+    ]
+
+    print(f"ops={args.ops}, точный итог: {money.format_minor(exact, 2)}")
+    base = results[-1][1]
+    for title, elapsed, value in results:
+        if isinstance(value, int):
+            shown, error = money.format_minor(value, 2), abs(value - exact)
+        else:
+            shown, error = f"{value:.10f}", abs(Decimal(value) - Decimal(exact).scaleb(-2)) * 100
+        print(f"{title:20s}: {elapsed * 1e3:8.1f} ms (x{elapsed / base:5.1f})  итог={shown}  ошибка={float(error):.2e} мин.ед.")
+
+    # через Wallet: проверка amount и перевод float -> минимальные единицы на каждой операции
+    n = min(args.ops, 200000)
+    _title, elapsed, units = run("Wallet", wallet_loop, [c / 100 for c in cents[:n]])
+    print(f"Wallet.deposit/withdraw: {elapsed / (2 * n) * 1e9:.0f} ns/операция, итог={money.format_minor(units, 8)} BTC")
+
+
+if __name__ == "__main__":
+    main()
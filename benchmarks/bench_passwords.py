@@ -0,0 +1,58 @@
+"""
+Пропускная способность логина для разных схем/стоимостей хеширования пароля.
+
+Проверка пароля = один hash_password, поэтому logins/sec ~ 1 / время хеша.
+По результатам выбирается PASSWORD_HASH_* в [tool.valutatrade], при которой
+p99 логина укладывается в бюджет.
+
+Запуск:
+    poetry run python benchmarks/bench_passwords.py --rounds 20 --budget-ms 250
+"""
+import argparse
+import statistics
+import time
+
+from finalproject_1_perfilova.core.passwords import LEGACY_SCHEME, hash_password
+
+
+SETTINGS = [
+    (LEGACY_SCHEME, {}),
+    ("pbkdf2_sha256", {"iterations": 50000}),
+    ("pbkdf2_sha256", {"iterations": 100000}),
+    ("pbkdf2_sha256", {"iterations": 300000}),
+    ("pbkdf2_sha256", {"iterations": 600000}),
+    ("scrypt", {"n": 8192, "r": 8, "p": 1}),
+    ("scrypt", {"n": 16384, "r": 8, "p": 1}),
+    ("scrypt", {"n": 65536, "r": 8, "p": 1}),
+]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--budget-ms", dest="budget_ms", type=float, default=250.0)
+    args = parser.parse_args()
+
+    print(f"{'scheme':15s} {'params':28s} {'logins/s':>10s} {'p50 ms':>8s} {'p99 ms':>8s}")
+    for scheme, params in SETTINGS:
+        timings = []
+        for i in range(args.rounds):
+            started_at = time.perf_counter()
+            hash_password(f"password{i}", "0123456789abcdef", scheme, params)
+            timings.append(time.perf_counter() - started_at)
+
+        p99 = percentile(timings, 0.99) * 1000
+        mark = "" if p99 <= args.budget_ms else "  > budget"
+        print(
+            f"{scheme:15s} {str(params):28s} {1 / statistics.mean(timings):10.1f} "
+            f"{percentile(timings, 0.5) * 1000:8.2f} {p99:8.2f}{mark}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Чтение курса из snapshot: rates.json (json.load + матрица курсов) против
+rates.bin (mmap + struct.unpack_from по смещению записи).
+
+«Холодное» чтение — первое после замены файла (так работает каждый запуск
+CLI и каждый процесс после update-rates), «тёплое» — повторное в процессе.
+
+Запуск (данные создаются во временной папке):
+    poetry run python benchmarks/bench_rates_binary.py --pairs 8 200 --ops 2000
+"""
+import argparse
+import time
+from datetime import datetime, timezone
+
+from workdir import temp_workdir
+
+
+def run(title, ops, func):
+    started_at = time.perf_counter()
+    for _ in range(ops):
+        func()
+    elapsed = time.perf_counter() - started_at
+    print(f"  {title:30s}: {elapsed / ops * 1e6:9.2f} us/чтение")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=int, nargs="+", default=[8, 200], help="пар *_USD в snapshot")
+    parser.add_argument("--ops", type=int, default=2000)
+    args = parser.parse_args()
+
+    with temp_workdir("bench_rates_binary_"):
+        with open("pyproject.toml", "w", encoding="utf-8") as f:
+            f.write('[tool.valutatrade]\nDATA_DIR = "data"\nRATES_TTL_SECONDS = 86400\nRATES_BINARY_SNAPSHOT = true\n')
+
+        # импорт после chdir: настройки читаются из pyproject.toml рабочей папки
+        from finalproject_1_perfilova.core import usecases
+        from finalproject_1_perfilova.core.rate_matrix import RateMatrix
+        from finalproject_1_perfilova.infra import rates_binary
+        from finalproject_1_perfilova.parser_service.storage import RatesStorage
+
+        db = usecases.db
+        storage = RatesStorage("rates.json", "exchange_rates")
+        now = datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+        for count in args.pairs:
+            pairs = {f"C{i:03d}_USD": {"rate": 1.0 + i, "updated_at": now, "source": "bench"} for i in range(count)}
+            storage.write_snapshot(pairs, last_refresh=now)
+            print(f"pairs={count}: rates.json {db.path_for('rates.json').stat().st_size} B, "
+                  f"rates.bin {db.path_for('rates.bin').stat().st_size} B")
+
+            def cold_json():
+                db.invalidate("rates.json")
+                RateMatrix.from_snapshot(db.read("rates.json", {}), "USD", 86400).get("C001", "USD")
+
+            def cold_binary():
+                rates_binary._cache.clear()
+                rates_binary.open_snapshot("rates.bin").get("C001_USD")
+
+            # холодные замеры с матрицей дорогие на больших snapshot — меньше повторов
+            cold_ops = max(10, args.ops // max(1, count // 8))
+            run("json: разбор + матрица", cold_ops, cold_json)
+            run("bin: mmap + запись", cold_ops, cold_binary)
+
+            matrix = RateMatrix.from_snapshot(db.read("rates.json", {}), "USD", 86400)
+            snapshot = rates_binary.open_snapshot("rates.bin")
+            run("json: готовая матрица", args.ops, lambda: matrix.get("C001", "USD"))
+            run("bin: готовое отображение", args.ops, lambda: snapshot.get("C001_USD"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Пропускная способность buy в project serve при N одновременных клиентах
+(каждый клиент — свой пользователь и своё соединение) против прямого
+вызова usecases.buy в одном процессе.
+
+Запуск (данные создаются во временной папке):
+    poetry run python benchmarks/bench_service.py --clients 1 4 16 --ops 200
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from workdir import temp_workdir
+
+
+def write_rates(path: str):
+    now = datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+    pairs = {"BTC_USD": 60000.0, "ETH_USD": 3000.0, "EUR_USD": 1.1}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"pairs": {k: {"rate": v, "updated_at": now, "source": "bench"} for k, v in pairs.items()},
+                   "last_refresh": now}, f)
+
+
+def wait_for_socket(path: str, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if time.monotonic() > deadline:
+            raise RuntimeError("сервис не запустился")
+        time.sleep(0.05)
+
+
+def run_clients(socket_path: str, usernames: list[str], ops: int):
+    from finalproject_1_perfilova.service.client import ServiceClient
+
+    def worker(username):
+        client = ServiceClient(socket_path)
+        for _ in range(ops):
+            client.call("buy", currency="EUR", amount=1.0, username=username)
+        client.close()
+
+    threads = [threading.Thread(target=worker, args=(name,)) for name in usernames]
+    started_at = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - started_at
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--ops", type=int, default=200, help="сделок на клиента")
+    parser.add_argument("--commit-interval", type=float, default=0.002)
+    args = parser.parse_args()
+
+    with temp_workdir("bench_service_") as workdir:
+        with open("pyproject.toml", "w", encoding="utf-8") as f:
+            f.write(f'[tool.valutatrade]\nDATA_DIR = "data"\nSERVICE_COMMIT_INTERVAL = {args.commit_interval}\n'
+                    f'PASSWORD_HASH_SCHEME = "sha256"\n')
+        os.makedirs("data", exist_ok=True)
+        write_rates("data/rates.json")
+
+        # импорт после chdir: настройки читаются из pyproject.toml рабочей папки
+        from finalproject_1_perfilova.core import usecases
+
+        max_clients = max(args.clients)
+        usernames = [f"bench{i}" for i in range(max_clients)]
+        for name in usernames:
+            usecases.register_user(name, "bench1234")
+        usecases.login_user(usernames[0], "bench1234")
+
+        ops = min(args.ops, 50)
+        started_at = time.perf_counter()
+        for _ in range(ops):
+            usecases.buy("EUR", 1.0)
+        per_op = (time.perf_counter() - started_at) / ops
+        print(f"usecases.buy (без сервиса): {1 / per_op:10.0f} ops/s")
+
+        socket_path = os.path.join(workdir, "data", "bench.sock")
+        server = subprocess.Popen(
+            [sys.executable, "-c",
+             "from finalproject_1_perfilova.service.server import CoreService; import sys; CoreService(sys.argv[1]).run()",
+             socket_path],
+            env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+        )
+        try:
+            wait_for_socket(socket_path)
+            for n in args.clients:
+                elapsed = run_clients(socket_path, usernames[:n], args.ops)
+                total = n * args.ops
+                print(f"serve, клиентов={n:3d}: {total / elapsed:10.0f} ops/s ({total} сделок за {elapsed:.2f} s)")
+        finally:
+            server.terminate()
+            server.wait()
+
+        # после остановки сервиса все сделки должны быть в файле
+        expected = ops + args.ops * len(args.clients)
+        balance = usecases.load_portfolio(1).get_wallet("EUR").balance
+        print(f"проверка: EUR у {usernames[0]} = {balance:.0f} (ожидается {expected})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Регистрация и логин при большом числе пользователей: индекс username -> user_id
+против линейного поиска по всем записям. «cold» — поиск с пустым кешем файлов,
+как первый вызов в новом CLI-процессе.
+
+Запуск (данные создаются во временной папке):
+    poetry run python benchmarks/bench_users.py --users 100000 --backend json
+    poetry run python benchmarks/bench_users.py --users 100000 --backend sqlite
+"""
+import argparse
+import random
+import time
+
+from workdir import temp_workdir
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--backend", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--ops", type=int, default=50)
+    args = parser.parse_args()
+
+    with temp_workdir("bench_users_"):
+        with open("pyproject.toml", "w", encoding="utf-8") as f:
+            f.write(f'[tool.valutatrade]\nDATA_DIR = "data"\nSTORAGE_BACKEND = "{args.backend}"\n')
+
+        # импорт после chdir: настройки читаются из pyproject.toml рабочей папки
+        from finalproject_1_perfilova.core import usecases
+        from finalproject_1_perfilova.core.models import User
+        from finalproject_1_perfilova.infra.record_store import get_record_store, USERS
+
+        store = get_record_store()
+        template = User.create_new(user_id=1, username="template", password="bench1234").to_dict()
+
+        started_at = time.perf_counter()
+        store.put_many(USERS, {
+            i: {**template, "user_id": i, "username": f"user{i}"}
+            for i in range(1, args.users + 1)
+        })
+        store.rebuild_indexes()
+        print(f"backend={args.backend} users={args.users} (заполнение {time.perf_counter() - started_at:.1f} s)")
+
+        rnd = random.Random(1)
+        names = [f"user{rnd.randint(1, args.users)}" for _ in range(args.ops)]
+
+        def linear_lookup(name):
+            for u in store.all(USERS):
+                if u["username"] == name:
+                    return u
+            return None
+
+        def cold_lookup(name):
+            # первый поиск в новом процессе (CLI login): кеш файлов пуст
+            usecases.db.invalidate()
+            return usecases._find_user(name)
+
+        for title, func in (
+            ("linear scan", linear_lookup),
+            ("index", usecases._find_user),
+            ("index, cold", cold_lookup),
+        ):
+            func(names[0])  # прогрев: разбор файлов и построение индекса не входят в замер
+            started_at = time.perf_counter()
+            for name in names:
+                assert func(name) is not None
+            per_op = (time.perf_counter() - started_at) / len(names)
+            print(f"lookup {title:13s}: {per_op * 1e6:10.1f} us/op")
+
+        started_at = time.perf_counter()
+        for name in names[:10]:
+            usecases.login_user(name, "bench1234")
+        print(f"login_user          : {(time.perf_counter() - started_at) / 10 * 1e3:10.2f} ms/op")
+
+        started_at = time.perf_counter()
+        for i in range(10):
+            usecases.register_user(f"new_user_{i}", "bench1234")
+        print(f"register_user       : {(time.perf_counter() - started_at) / 10 * 1e3:10.2f} ms/op")
+
+
+if __name__ == "__main__":
+    main()
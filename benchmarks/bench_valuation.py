@@ -0,0 +1,94 @@
+"""
+Сравнение пакетной переоценки (valuate_columns) с циклом в духе show_portfolio.
+
+Запуск:
+    poetry run python benchmarks/bench_valuation.py --users 20000 --wallets 4
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timezone
+
+from finalproject_1_perfilova.core.models import Portfolio
+from finalproject_1_perfilova.core.money import decimals_for
+from finalproject_1_perfilova.core.rate_matrix import RateMatrix
+from finalproject_1_perfilova.core.valuation import PortfolioTable, valuate_columns
+
+
+RATES = {"BTC": 60000.0, "ETH": 3000.0, "EUR": 1.1, "RUB": 0.011, "GBP": 1.3}
+
+
+def make_matrix():
+    now = datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+    pairs = {f"{code}_USD": {"rate": rate, "updated_at": now, "source": "bench"} for code, rate in RATES.items()}
+    return RateMatrix.from_snapshot({"pairs": pairs, "last_refresh": now}, base="USD", ttl=3600)
+
+
+def make_portfolios(users: int, wallets: int, seed: int = 42):
+    rnd = random.Random(seed)
+    codes = list(RATES) + ["USD"]
+    records = []
+    for user_id in range(1, users + 1):
+        chosen = rnd.sample(codes, k=min(wallets, len(codes)))
+        records.append({
+            "user_id": user_id,
+            # формат хранилища (Portfolio.to_dict): баланс — десятичная строка в масштабе валюты
+            "wallets": {code: {"balance": f"{rnd.uniform(0, 100):.{decimals_for(code)}f}"} for code in chosen},
+        })
+    return records
+
+
+def loop_valuation(records, matrix, base):
+    totals = []
+    for data in records:
+        portfolio = Portfolio.from_dict(data)
+        total = 0.0
+        for code, wallet in portfolio.wallets.items():
+            if code == base:
+                total += wallet.balance
+            else:
+                rate, _ts = matrix.get(code, base)
+                total += wallet.balance * rate
+        totals.append(total)
+    return totals
+
+
+def columnar_valuation(records, matrix, base):
+    return valuate_columns(PortfolioTable.from_records(records), matrix.get, base)
+
+
+def best_of(func, repeat, *args):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - started_at)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--wallets", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--base", default="USD")
+    args = parser.parse_args()
+
+    matrix = make_matrix()
+    records = make_portfolios(args.users, args.wallets)
+
+    loop_time, loop_totals = best_of(loop_valuation, args.repeat, records, matrix, args.base)
+    col_time, col_totals = best_of(columnar_valuation, args.repeat, records, matrix, args.base)
+
+    diff = max(abs(a - b) for a, b in zip(loop_totals, col_totals))
+    print(f"users={args.users} wallets={args.wallets} base={args.base}")
+    print(f"loop (show_portfolio):   {loop_time * 1000:8.1f} ms")
+    print(f"columnar (valuate_all):  {col_time * 1000:8.1f} ms  x{loop_time / col_time:.1f}")
+    print(f"max abs diff: {diff:.3e}")
+    # балансы округляются одинаково, порядок сложения тот же — суммы должны совпасть точно
+    assert list(col_totals) == loop_totals, "valuate_all и show_portfolio разошлись"
+
+
+if __name__ == "__main__":
+    main()
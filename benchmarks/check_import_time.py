@@ -0,0 +1,85 @@
+"""
+Бюджет времени импорта для коротких команд CLI (python -X importtime).
+
+Для каждого сценария в отдельном процессе импортируются модули, которые
+нужны команде, и проверяется:
+1. суммарное время импорта (медиана по --runs запускам) не больше бюджета;
+2. тяжёлые модули (requests, asyncio, sqlite3, ...) не импортируются.
+
+Код возврата 1, если бюджет превышен. Запуск:
+    make importtime
+    poetry run python benchmarks/check_import_time.py --budget-ms 60
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+PACKAGE = "finalproject_1_perfilova"
+
+# сценарий -> модули, которые импортирует команда
+SCENARIOS = {
+    "project (разбор аргументов)": [f"{PACKAGE}.cli.interface"],
+    "get-rate / login / buy / sell / show-portfolio": [f"{PACKAGE}.cli.interface", f"{PACKAGE}.core.usecases"],
+    "--socket (тонкий клиент)": [f"{PACKAGE}.cli.interface", f"{PACKAGE}.service.client"],
+}
+
+# не должны попадать в короткие команды
+FORBIDDEN = ("requests", "urllib3", "asyncio", "sqlite3", "concurrent.futures", f"{PACKAGE}.parser_service")
+
+
+def measure(modules: list[str]):
+    """Время импорта (мкс) и множество импортированных модулей."""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(p for p in sys.path if p)}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "; ".join(f"import {m}" for m in modules)],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+
+    total = 0
+    imported = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self_us, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # строка-заголовок
+        imported.add(name.strip())
+        # верхний уровень (без отступа) — модули, импортированные самим -c
+        if not name.startswith("  ") and name.strip() in modules:
+            total += int(cumulative)
+    return total, imported
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=60.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    for title, modules in SCENARIOS.items():
+        results = [measure(modules) for _ in range(args.runs)]
+        median_ms = statistics.median(total for total, _ in results) / 1000
+        heavy = sorted(
+            name for name in results[0][1]
+            if any(name == f or name.startswith(f + ".") for f in FORBIDDEN)
+        )
+
+        status = "OK"
+        if median_ms > args.budget_ms or heavy:
+            status = "FAIL"
+            failed = True
+        print(f"[{status}] {title}: {median_ms:.1f} ms (бюджет {args.budget_ms:.0f} ms)")
+        if heavy:
+            print(f"       лишние импорты: {', '.join(heavy)}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
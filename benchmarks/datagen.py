@@ -0,0 +1,101 @@
+"""
+Синтетические данные для бенчмарков: N пользователей, M кошельков на
+пользователя, K записей истории курсов, snapshot rates.json.
+
+Всё детерминировано (seed): одинаковые параметры дают одинаковые файлы.
+Пишет в DATA_DIR текущей рабочей папки — вызывать после chdir во временную
+папку и записи pyproject.toml (см. suite.py).
+"""
+import random
+from datetime import datetime, timedelta, timezone
+
+
+# только валюты из get_currency: show_portfolio проверяет каждый кошелёк
+RATES = {"BTC": 60000.0, "ETH": 3000.0, "EUR": 1.1, "RUB": 0.011}
+PASSWORD = "bench1234"
+
+
+def iso(dt: datetime):
+    return dt.replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+
+def rates_pairs(now: str, rnd: random.Random | None = None, source: str = "bench"):
+    """Пары *_USD для snapshot; с rnd — курсы с небольшим шумом."""
+    pairs = {}
+    for code, rate in RATES.items():
+        if rnd is not None:
+            rate *= 1 + rnd.uniform(-0.01, 0.01)
+        pairs[f"{code}_USD"] = {"rate": rate, "updated_at": now, "source": source}
+    return pairs
+
+
+def make_users(store, users: int):
+    """
+    N пользователей одной записью; хеш пароля считается один раз и
+    копируется (стоимость хеширования меряет bench_passwords.py).
+    """
+    from finalproject_1_perfilova.core.models import User
+    from finalproject_1_perfilova.infra.record_store import USERS
+
+    template = User.create_new(user_id=1, username="bench1", password=PASSWORD).to_dict()
+    records = {
+        user_id: {**template, "user_id": user_id, "username": f"bench{user_id}"}
+        for user_id in range(1, users + 1)
+    }
+    store.put_many(USERS, records)
+    store.rebuild_indexes()
+
+
+def make_portfolios(store, users: int, wallets: int, seed: int):
+    from finalproject_1_perfilova.core.models import Portfolio, Wallet
+    from finalproject_1_perfilova.infra.record_store import PORTFOLIOS
+
+    rnd = random.Random(seed)
+    codes = list(RATES) + ["USD"]
+    records = {}
+    for user_id in range(1, users + 1):
+        chosen = rnd.sample(codes, k=min(wallets, len(codes)))
+        portfolio = Portfolio(
+            user_id,
+            {code: Wallet(code, round(rnd.uniform(0, 100), 2)) for code in chosen},
+        )
+        records[user_id] = portfolio.to_dict()
+    store.put_many(PORTFOLIOS, records)
+
+
+def make_history(storage, records: int, seed: int, now: datetime):
+    """K записей истории: пары по кругу, шаг 1 минута назад от now."""
+    rnd = random.Random(seed)
+    pairs = [f"{code}_USD" for code in RATES]
+    history = []
+    for i in range(records):
+        pair = pairs[i % len(pairs)]
+        ts = iso(now - timedelta(minutes=i // len(pairs) + 1))
+        history.append({
+            "id": storage.make_id(pair, ts),
+            "from_currency": pair.split("_")[0],
+            "to_currency": "USD",
+            "rate": RATES[pair.split("_")[0]] * (1 + rnd.uniform(-0.05, 0.05)),
+            "timestamp": ts,
+            "source": "bench",
+            "meta": {},
+        })
+    history.reverse()
+    storage.append_history(history)
+
+
+def generate(users: int, wallets: int, history: int, seed: int = 42):
+    """Создаёт все данные в DATA_DIR. Возвращает RatesStorage для кейсов парсера."""
+    from finalproject_1_perfilova.cli.interface import _rates_storage
+    from finalproject_1_perfilova.infra.record_store import get_record_store
+    from finalproject_1_perfilova.parser_service.config import get_config
+
+    store = get_record_store()
+    make_users(store, users)
+    make_portfolios(store, users, wallets, seed)
+
+    now = datetime.now(timezone.utc)
+    storage = _rates_storage(get_config())
+    storage.write_snapshot(rates_pairs(iso(now)), last_refresh=iso(now))
+    make_history(storage, history, seed, now)
+    return storage
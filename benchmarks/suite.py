@@ -0,0 +1,238 @@
+"""
+Набор бенчмарков: usecases, хранилище и конвейер парсера на синтетических данных.
+
+1. Во временной папке генерируются N пользователей, M кошельков на
+   пользователя и K записей истории курсов (datagen.py, фиксированный seed).
+2. Каждый кейс выполняется --ops раз (после разогрева) в --repeat раундах;
+   по лучшему раунду считаются медиана, p95 и операций в секунду.
+3. Результат — JSON (--output). С --baseline результат сравнивается с
+   сохранённым: рост медианы больше чем на --threshold — регрессия, код возврата 1.
+
+Запуск:
+    make bench
+    poetry run python benchmarks/suite.py --users 2000 --wallets 3 --history 20000 --ops 50
+    poetry run python benchmarks/suite.py --save-baseline benchmarks/results/baseline.json
+    poetry run python benchmarks/suite.py --baseline benchmarks/results/baseline.json --threshold 0.25
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from datagen import PASSWORD, iso, rates_pairs
+from workdir import temp_workdir
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# параметры, от которых зависят результаты: baseline сравним только при совпадении
+PARAMS = ("users", "wallets", "history", "ops", "repeat", "seed", "backend", "hash_scheme")
+
+
+class StubClient:
+    """Источник курсов без сети: те же пары с шумом, как у настоящего API."""
+
+    def __init__(self, name: str, seed: int):
+        self.SOURCE_NAME = name
+        self.rnd = random.Random(seed)
+
+    def fetch_rates(self):
+        now = iso(datetime.now(timezone.utc))
+        return {pair: entry["rate"] for pair, entry in rates_pairs(now, self.rnd).items()}
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def measure(func, ops: int, repeat: int = 3, warmup: int = 2):
+    """
+    Время операций, секунды. func(i) получает номер операции.
+    ops операций повторяются repeat раундов; берётся раунд с лучшей медианой
+    (меньше всего фонового шума).
+    """
+    for i in range(warmup):
+        func(-1 - i)
+    best = None
+    for _round in range(repeat):
+        samples = []
+        for i in range(ops):
+            started_at = time.perf_counter()
+            func(i)
+            samples.append(time.perf_counter() - started_at)
+        if best is None or statistics.median(samples) < statistics.median(best):
+            best = samples
+    return {
+        "ops": ops,
+        "median_ms": statistics.median(best) * 1e3,
+        "p95_ms": percentile(best, 0.95) * 1e3,
+        "ops_per_sec": ops / sum(best),
+    }
+
+
+def run_cli(*argv):
+    """Команда CLI в этом же процессе; вывод отбрасывается."""
+    from finalproject_1_perfilova.cli.interface import main
+
+    sys.argv = ["project", *argv]
+    with contextlib.redirect_stdout(io.StringIO()):
+        main()
+
+
+def build_cases(args, storage):
+    from finalproject_1_perfilova.core import usecases
+    from finalproject_1_perfilova.parser_service.updater import RatesUpdater
+
+    updater = RatesUpdater(
+        clients=[StubClient("StubCrypto", args.seed), StubClient("StubFiat", args.seed + 1)],
+        storage=storage,
+        deadline_seconds=10,
+    )
+    rnd = random.Random(args.seed)
+
+    def login(_i):
+        usecases.login_user(f"bench{rnd.randint(1, args.users)}", PASSWORD)
+
+    def buy(_i):
+        usecases.buy("BTC", 0.01)
+
+    def sell(_i):
+        usecases.sell("BTC", 0.01)
+
+    # порядок важен: buy и sell идут после логина, sell продаёт купленное в buy
+    return [
+        ("register", lambda i: usecases.register_user(f"new{i}_{time.monotonic_ns()}", PASSWORD)),
+        ("login", login),
+        ("buy", buy),
+        ("sell", sell),
+        ("show_portfolio", lambda _i: usecases.show_portfolio("USD")),
+        ("get_rate", lambda _i: usecases.get_rate("BTC", "EUR")),
+        ("show_rates_cli", lambda _i: run_cli("show-rates", "--top", "3")),
+        ("valuate_all", lambda _i: usecases.valuate_all("USD")),
+        ("rate_history", lambda _i: storage.query_history("BTC_USD")),
+        ("run_update", lambda _i: updater.run_update()),
+    ]
+
+
+def git_revision():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, threshold: float):
+    """Печатает сравнение с baseline; возвращает имена кейсов с регрессией."""
+    regressions = []
+    print(f"\nСравнение с baseline ({baseline['meta'].get('revision') or '-'}), порог +{threshold:.0%}:")
+    for name, current in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"  {name:16s}: нет в baseline")
+            continue
+        ratio = current["median_ms"] / before["median_ms"] if before["median_ms"] else 1.0
+        mark = "OK"
+        if ratio > 1 + threshold:
+            mark = "РЕГРЕССИЯ"
+            regressions.append(name)
+        print(f"  {name:16s}: {before['median_ms']:9.3f} -> {current['median_ms']:9.3f} ms (x{ratio:4.2f}) {mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--wallets", type=int, default=3)
+    parser.add_argument("--history", type=int, default=20000, help="записей истории курсов")
+    parser.add_argument("--ops", type=int, default=50, help="повторов каждого кейса")
+    parser.add_argument("--repeat", type=int, default=3, help="раундов на кейс (берётся лучший)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--backend", choices=("json", "sqlite"), default="json")
+    parser.add_argument(
+        "--hash-scheme",
+        default="sha256",
+        help="схема паролей; по умолчанию быстрая, чтобы login мерил хранилище, а не хеш",
+    )
+    parser.add_argument("--only", nargs="+", help="только эти кейсы")
+    parser.add_argument("--output", default=str(ROOT / "benchmarks" / "results" / "latest.json"))
+    parser.add_argument("--baseline", help="JSON прошлого запуска для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимый рост медианы (0.2 = 20%%)")
+    parser.add_argument("--save-baseline", help="дополнительно сохранить результат как baseline")
+    args = parser.parse_args()
+
+    output = Path(args.output).resolve()
+    baseline_path = Path(args.baseline).resolve() if args.baseline else None
+    save_baseline = Path(args.save_baseline).resolve() if args.save_baseline else None
+    # baseline не хранится в git (benchmarks/results/ в .gitignore): без него сравнивать не с чем
+    if baseline_path is not None and not baseline_path.exists():
+        parser.error(f"baseline {baseline_path} не найден — сначала выполните make bench-baseline")
+
+    with temp_workdir("bench_suite_") as workdir:
+        with open("pyproject.toml", "w", encoding="utf-8") as f:
+            f.write(
+                f'[tool.valutatrade]\nDATA_DIR = "data"\nLOG_DIR = "logs"\n'
+                f'STORAGE_BACKEND = "{args.backend}"\nPASSWORD_HASH_SCHEME = "{args.hash_scheme}"\n'
+                f"RATES_TTL_SECONDS = 86400\n"
+            )
+
+        # импорт после chdir: настройки читаются из pyproject.toml рабочей папки
+        from datagen import generate
+        from finalproject_1_perfilova.core import usecases
+        from finalproject_1_perfilova.logging_config import setup_logging
+
+        # как в CLI: логи через очередь в LOG_DIR временной папки
+        setup_logging()
+
+        started_at = time.perf_counter()
+        storage = generate(args.users, args.wallets, args.history, args.seed)
+        print(
+            f"данные: users={args.users} wallets={args.wallets} history={args.history} "
+            f"backend={args.backend} ({time.perf_counter() - started_at:.1f} s, {workdir})"
+        )
+        usecases.login_user("bench1", PASSWORD)
+
+        results = {}
+        for name, func in build_cases(args, storage):
+            if args.only and name not in args.only:
+                continue
+            results[name] = measure(func, args.ops, args.repeat)
+            r = results[name]
+            print(f"  {name:16s}: median {r['median_ms']:9.3f} ms  p95 {r['p95_ms']:9.3f} ms  {r['ops_per_sec']:9.1f} ops/s")
+
+        report = {
+            "meta": {
+                "created_at": iso(datetime.now(timezone.utc)),
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "params": {k: v for k, v in vars(args).items() if k in PARAMS},
+            },
+            "results": results,
+        }
+        for path in filter(None, (output, save_baseline)):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+            print(f"результат: {path}")
+
+        if baseline_path is not None:
+            baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+            if baseline["meta"].get("params") != report["meta"]["params"]:
+                print("Внимание: параметры baseline отличаются от текущего запуска.")
+            if compare(results, baseline, args.threshold):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Временная рабочая папка бенчмарка: создаётся на время замера и удаляется после."""
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+
+
+@contextmanager
+def temp_workdir(prefix: str):
+    """
+    Переходит во временную папку (pyproject.toml, data/, logs/ бенчмарка пишутся туда)
+    и удаляет её на выходе, в том числе при ошибке.
+
+    Перед удалением дописываются фоновый лог и метрики: иначе их
+    atexit-обработчики писали бы уже в исходную рабочую папку.
+    """
+    previous = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix=prefix)
+    os.chdir(workdir)
+    try:
+        yield workdir
+    finally:
+        logging_config = sys.modules.get("finalproject_1_perfilova.logging_config")
+        if logging_config is not None:
+            logging_config.shutdown_logging()
+        metrics = sys.modules.get("finalproject_1_perfilova.infra.metrics")
+        if metrics is not None:
+            metrics.registry.drain()
+            metrics.configure(enabled=False)
+        os.chdir(previous)
+        shutil.rmtree(workdir, ignore_errors=True)
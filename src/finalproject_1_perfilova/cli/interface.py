@@ -1,16 +1,9 @@
 import argparse
+import os
 
+from finalproject_1_perfilova.infra import metrics
 from finalproject_1_perfilova.logging_config import setup_logging
 
-from finalproject_1_perfilova.core.usecases import (
-    register_user,
-    login_user,
-    show_portfolio,
-    buy,
-    sell,
-    get_rate,
-)
-
 from finalproject_1_perfilova.core.exceptions import (
     InsufficientFundsError,
     CurrencyNotFoundError,
@@ -18,19 +11,40 @@ from finalproject_1_perfilova.core.exceptions import (
     WalletNotFoundError,
 )
 
-from finalproject_1_perfilova.parser_service.api_clients import CoinGeckoClient, ExchangeRateApiClient
-from finalproject_1_perfilova.parser_service.config import get_config
-from finalproject_1_perfilova.parser_service.storage import RatesStorage
-from finalproject_1_perfilova.parser_service.updater import RatesUpdater
-from finalproject_1_perfilova.parser_service.scheduler import RatesScheduler
+# Модули подкоманд импортируются внутри веток main(): короткие команды
+# (get-rate, login, buy...) не должны платить за requests, asyncio, sqlite3
+# и parser_service. Бюджет проверяет benchmarks/check_import_time.py.
+
+
+# команды, которые можно выполнить в запущенном сервисе (project serve)
+REMOTE_COMMANDS = ("get-rate", "buy", "sell", "show-portfolio")
+
+# размеры свечей для rate-history (совпадают с parser_service.storage.OHLC_BUCKETS)
+OHLC_BUCKET_NAMES = ("1m", "1h", "1d")
+
 
-from finalproject_1_perfilova.infra.database import DatabaseManager
+def _rates_storage(cfg):
+    from finalproject_1_perfilova.parser_service.updater import build_storage
+
+    return build_storage(cfg)
+
+
+def _rates_updater(source: str):
+    from finalproject_1_perfilova.parser_service.updater import build_updater
+
+    return build_updater(source)
 
 
 def main():
     setup_logging()
+    metrics.configure()
 
     parser = argparse.ArgumentParser(prog="project")
+    parser.add_argument(
+        "--socket",
+        default=os.environ.get("VALUTATRADE_SOCKET"),
+        help="Unix socket сервиса (project serve): get-rate/buy/sell/show-portfolio выполняются в нём",
+    )
     subparsers = parser.add_subparsers(dest="command", required=True)
 
     # register
@@ -47,6 +61,10 @@ def main():
     p_show = subparsers.add_parser("show-portfolio")
     p_show.add_argument("--base", default="USD")
 
+    # valuate-all
+    p_val = subparsers.add_parser("valuate-all")
+    p_val.add_argument("--base", default="USD")
+
     # buy
     p_buy = subparsers.add_parser("buy")
     p_buy.add_argument("--currency", required=True)
@@ -57,6 +75,22 @@ def main():
     p_sell.add_argument("--currency", required=True)
     p_sell.add_argument("--amount", required=True, type=float)
 
+    # trade-batch
+    p_batch = subparsers.add_parser("trade-batch")
+    p_batch.add_argument("--file", default="-", help="CSV/JSONL с заявками; '-' — stdin")
+    p_batch.add_argument("--format", dest="fmt", choices=("csv", "jsonl"), default=None)
+    p_batch.add_argument("--base", default="USD")
+    p_batch.add_argument("--atomic", action="store_true", help="всё или ничего")
+
+    # trade-history
+    p_trades = subparsers.add_parser("trade-history")
+    p_trades.add_argument("--start", required=False)
+    p_trades.add_argument("--end", required=False)
+    p_trades.add_argument("--limit", type=int, required=False)
+
+    # ledger-snapshot
+    subparsers.add_parser("ledger-snapshot")
+
     # get-rate
     p_rate = subparsers.add_parser("get-rate")
     p_rate.add_argument("--from", dest="from_cur", required=True)
@@ -72,7 +106,12 @@ def main():
 
     # scheduler
     p_sched = subparsers.add_parser("scheduler")
-    p_sched.add_argument("--interval", type=int, default=300)
+    p_sched.add_argument(
+        "--interval",
+        type=float,
+        default=None,
+        help="один интервал (сек) для всех источников; по умолчанию — свой у каждого (SCHEDULER_INTERVALS)",
+    )
     p_sched.add_argument(
         "--source",
         choices=["coingecko", "exchangerate", "all"],
@@ -83,12 +122,48 @@ def main():
     p_show_rates = subparsers.add_parser("show-rates")
     p_show_rates.add_argument("--currency", required=False)
     p_show_rates.add_argument("--top", required=False, type=int)
-    p_show_rates.add_argument("--base", default="USD")
+    p_show_rates.add_argument("--base", default=None)
+
+    # rate-history
+    p_hist = subparsers.add_parser("rate-history")
+    p_hist.add_argument("--from", dest="from_cur", required=True)
+    p_hist.add_argument("--to", dest="to_cur", default="USD")
+    p_hist.add_argument("--start", required=False)
+    p_hist.add_argument("--end", required=False)
+    p_hist.add_argument("--bucket", choices=OHLC_BUCKET_NAMES, required=False)
+
+    # compact-history
+    p_compact = subparsers.add_parser("compact-history")
+    p_compact.add_argument("--older-than-days", dest="older_than_days", type=int, default=30)
+
+    # serve
+    subparsers.add_parser("serve")
+
+    # migrate-storage
+    p_migrate = subparsers.add_parser("migrate-storage")
+    p_migrate.add_argument("--to", dest="backend", choices=("sqlite",), default="sqlite")
+
+    # migrate-balances
+    subparsers.add_parser("migrate-balances")
+
+    # stats
+    p_stats = subparsers.add_parser("stats")
+    p_stats.add_argument("--format", dest="fmt", choices=("table", "json", "prometheus"), default="table")
+    p_stats.add_argument("--reset", action="store_true", help="обнулить накопленные метрики")
 
     args = parser.parse_args()
 
+    # при --socket короткие команды уходят в уже запущенный сервис
+    remote = None
+    if args.socket and args.command in REMOTE_COMMANDS:
+        from finalproject_1_perfilova.service.client import ServiceClient
+
+        remote = ServiceClient(args.socket)
+
     try:
         if args.command == "register":
+            from finalproject_1_perfilova.core.usecases import register_user
+
             user = register_user(args.username, args.password)
             print(
                 f"Пользователь '{user.username}' зарегистрирован (id={user.user_id})."
@@ -96,20 +171,82 @@ def main():
             )
 
         elif args.command == "login":
+            from finalproject_1_perfilova.core.usecases import login_user
+
             user = login_user(args.username, args.password)
             print(f"Вы вошли как '{user.username}'")
 
         elif args.command == "show-portfolio":
-            print(show_portfolio(args.base))
+            if remote:
+                print(remote.call("show_portfolio", base=args.base))
+            else:
+                from finalproject_1_perfilova.core.usecases import show_portfolio
+
+                print(show_portfolio(args.base))
+
+        elif args.command == "valuate-all":
+            from finalproject_1_perfilova.core.usecases import valuate_all
+
+            rows = valuate_all(args.base)
+            base = args.base.strip().upper()
+            if not rows:
+                print("Портфелей нет.")
+                return
+
+            print(f"Оценка всех портфелей (база: {base}):")
+            for user_id, username, total in rows:
+                print(f"- {username} (id={user_id}): {total:,.2f} {base}")
+            print("-" * 30)
+            print(f"ИТОГО: {sum(total for _u, _n, total in rows):,.2f} {base} ({len(rows)} портфелей)")
 
         elif args.command == "buy":
-            print(buy(args.currency, args.amount))
+            if remote:
+                print(remote.call("buy", currency=args.currency, amount=args.amount))
+            else:
+                from finalproject_1_perfilova.core.usecases import buy
+
+                print(buy(args.currency, args.amount))
 
         elif args.command == "sell":
-            print(sell(args.currency, args.amount))
+            if remote:
+                print(remote.call("sell", currency=args.currency, amount=args.amount))
+            else:
+                from finalproject_1_perfilova.core.usecases import sell
+
+                print(sell(args.currency, args.amount))
+
+        elif args.command == "trade-batch":
+            import sys
+
+            from finalproject_1_perfilova.core.usecases import read_orders, trade_batch
+
+            if args.file == "-":
+                orders = read_orders(sys.stdin, args.fmt)
+            else:
+                with open(args.file, "r", encoding="utf-8") as f:
+                    orders = read_orders(f, args.fmt)
+
+            results = trade_batch(orders, base=args.base, atomic=args.atomic)
+            for r in results:
+                print(
+                    f"[{r['status']}] line {r['line']}: {r['side']} {r['amount']} {r['currency']} "
+                    f"user='{r['user']}' {r['message']}"
+                )
+
+            ok = sum(1 for r in results if r["status"] == "OK")
+            failed = sum(1 for r in results if r["status"] == "ERROR")
+            if args.atomic and failed:
+                print(f"Пакет отклонён целиком: ошибок {failed} из {len(results)}.")
+            else:
+                print(f"Пакет исполнен: успешно {ok} из {len(results)}.")
 
         elif args.command == "get-rate":
-            rate, updated_at = get_rate(args.from_cur, args.to_cur)
+            if remote:
+                rate, updated_at = remote.call("get_rate", from_currency=args.from_cur, to_currency=args.to_cur)
+            else:
+                from finalproject_1_perfilova.core.usecases import get_rate
+
+                rate, updated_at = get_rate(args.from_cur, args.to_cur)
             print(
                 f"Курс {args.from_cur.upper()}->{args.to_cur.upper()}: "
                 f"{rate:.8f} (обновлено: {updated_at})"
@@ -120,86 +257,56 @@ def main():
             )
 
         elif args.command == "update-rates":
-            cfg = get_config()
-            storage = RatesStorage(cfg.RATES_FILE_PATH, cfg.HISTORY_FILE_PATH)
-
-            clients = []
-            if args.source in ("coingecko", "all"):
-                clients.append(CoinGeckoClient(cfg=cfg))
-            if args.source in ("exchangerate", "all"):
-                clients.append(ExchangeRateApiClient(cfg=cfg))
-
-            updater = RatesUpdater(clients=clients, storage=storage)
-
+            updater = _rates_updater(args.source)
             total = updater.run_update()
-            print(f"Обновление завершено. Всего обновлено курсов: {total}.")
+            print(
+                f"Обновление завершено. Всего обновлено курсов: {total}, "
+                f"изменилось: {len(updater.last_changes)}."
+            )
 
         elif args.command == "scheduler":
-            cfg = get_config()
-            storage = RatesStorage(cfg.RATES_FILE_PATH, cfg.HISTORY_FILE_PATH)
+            from finalproject_1_perfilova.parser_service.config import get_config
+            from finalproject_1_perfilova.parser_service.scheduler import RatesScheduler
 
-            clients = []
-            if args.source in ("coingecko", "all"):
-                clients.append(CoinGeckoClient(cfg=cfg))
-            if args.source in ("exchangerate", "all"):
-                clients.append(ExchangeRateApiClient(cfg=cfg))
-
-            updater = RatesUpdater(clients=clients, storage=storage)
-            scheduler = RatesScheduler(updater)
+            scheduler = RatesScheduler.from_config(get_config(), source=args.source, interval=args.interval)
+            intervals = ", ".join(f"{job.source}={job.base_interval:.0f}" for job in scheduler.jobs)
 
             print(
-                f"Планировщик запущен (interval={args.interval} сек, source={args.source}). "
-                f"Ctrl+C для остановки."
+                f"Планировщик запущен (интервалы, сек: {intervals}). "
+                f"Остановка: Ctrl+C или SIGTERM."
             )
-            scheduler.run_forever(interval_seconds=args.interval)
+            scheduler.run_forever()
+            print("Планировщик остановлен.")
 
         elif args.command == "show-rates":
-            db = DatabaseManager()
-            snap = db.read("rates.json", None)
+            from finalproject_1_perfilova.core.usecases import get_rate_matrix
+
+            matrix = get_rate_matrix()
 
-            if not snap or not isinstance(snap, dict) or "pairs" not in snap:
+            if not matrix:
                 print("Локальный кэш курсов пуст. Выполните 'update-rates', чтобы загрузить данные.")
                 return
 
-            pairs = snap.get("pairs", {})
-            last_refresh = snap.get("last_refresh", "-")
-
-            base = (args.base or "USD").strip().upper()
+            last_refresh = matrix.last_refresh or "-"
+            base = (args.base or matrix.base).strip().upper()
 
-            if base != "USD":
-                base_pair = f"{base}_USD"
-                if base_pair not in pairs:
-                    print(f"База '{base}' недоступна: нет пары {base_pair} в кэше. Сначала обновите курсы.")
-                    return
-                base_usd = float(pairs[base_pair]["rate"])
-                if base_usd == 0:
-                    print(f"База '{base}' недоступна: некорректный курс {base_pair}.")
-                    return
+            if base != matrix.base and not matrix.has_currency(base):
+                print(f"База '{base}' недоступна: нет курса {base}_{matrix.base} в кэше. Сначала обновите курсы.")
+                return
 
             rows = []
-            for pair, info in pairs.items():
-                rate = float(info["rate"])
-                updated_at = info.get("updated_at", "-")
-                source = info.get("source", "-")
-
-                frm, to = pair.split("_", 1)
-
-                if to != "USD":
-                    continue
-
+            for frm in matrix.listed:
                 if args.currency:
                     cur = args.currency.strip().upper()
                     if frm != cur:
                         continue
 
-                if base == "USD":
-                    shown_pair = f"{frm}_USD"
-                    shown_rate = rate
-                else:
-                    shown_pair = f"{frm}_{base}"
-                    shown_rate = rate / base_usd
+                entry = matrix.lookup(frm, base)
+                if entry is None:
+                    continue
+                shown_rate, updated_at, _expires_at, source = entry
 
-                rows.append((shown_pair, shown_rate, source, updated_at))
+                rows.append((f"{frm}_{base}", shown_rate, source, updated_at))
 
             if not rows:
                 if args.currency:
@@ -218,6 +325,129 @@ def main():
             for pair, r, source, updated_at in rows:
                 print(f"- {pair}: {r:.6f} (source={source}, updated_at={updated_at})")
 
+        elif args.command == "rate-history":
+            from datetime import datetime, timedelta, timezone
+
+            from finalproject_1_perfilova.parser_service.config import get_config
+            from finalproject_1_perfilova.parser_service.storage import downsample_ohlc
+
+            storage = _rates_storage(get_config())
+
+            pair = f"{args.from_cur.strip().upper()}_{args.to_cur.strip().upper()}"
+            end = args.end or datetime.now(timezone.utc)
+            start = args.start or (datetime.now(timezone.utc) - timedelta(days=1))
+            records = storage.query_history(pair, start=start, end=end)
+
+            if not records:
+                print(f"В истории нет записей для {pair} за выбранный период.")
+                return
+
+            if args.bucket:
+                print(f"История {pair} ({args.bucket}, {len(records)} записей):")
+                for c in downsample_ohlc(records, args.bucket):
+                    print(
+                        f"- {c['start']}: open={c['open']:.6f} high={c['high']:.6f} "
+                        f"low={c['low']:.6f} close={c['close']:.6f} (n={c['count']})"
+                    )
+            else:
+                print(f"История {pair} ({len(records)} записей):")
+                for r in records:
+                    print(f"- {r['timestamp']}: {float(r['rate']):.6f} (source={r.get('source', '-')})")
+
+        elif args.command == "compact-history":
+            if args.older_than_days < 0:
+                raise ValueError("--older-than-days должен быть >= 0")
+            from datetime import date, timedelta
+
+            from finalproject_1_perfilova.parser_service.config import get_config
+
+            storage = _rates_storage(get_config())
+            before = date.today() - timedelta(days=args.older_than_days)
+            merged = storage.compact_history(before)
+            print(f"Сжатие истории завершено: слито дневных сегментов {merged} (старше {before.isoformat()}).")
+
+        elif args.command == "serve":
+            from finalproject_1_perfilova.infra.database import DatabaseManager
+            from finalproject_1_perfilova.infra.settings import SettingsLoader
+            from finalproject_1_perfilova.service.server import CoreService
+
+            socket_path = args.socket or str(DatabaseManager().path_for(SettingsLoader().get("SERVICE_SOCKET")))
+            print(f"Сервис запущен: {socket_path}. Ctrl+C для остановки.")
+            print(f"Клиент: project --socket {socket_path} get-rate --from BTC --to USD")
+            CoreService(socket_path).run()
+            print("Сервис остановлен.")
+
+        elif args.command == "trade-history":
+            if args.limit is not None and args.limit <= 0:
+                raise ValueError("--limit должен быть > 0")
+            from finalproject_1_perfilova.core.usecases import trade_history
+
+            events = trade_history(args.start, args.end, args.limit)
+            if not events:
+                print("Сделок за выбранный период нет.")
+                return
+
+            print(f"История сделок ({len(events)}):")
+            for e in events:
+                print(
+                    f"- {e['timestamp']}: {e['side'].upper()} {e['amount']} {e['currency']} "
+                    f"по курсу {float(e['rate']):.2f} {e['base']}/{e['currency']}"
+                )
+
+        elif args.command == "ledger-snapshot":
+            from finalproject_1_perfilova.core.usecases import snapshot_portfolios
+
+            print(f"Снимок портфелей записан: учтено событий журнала {snapshot_portfolios()}.")
+
+        elif args.command == "stats":
+            if args.reset:
+                metrics.reset()
+                print("Метрики обнулены.")
+                return
+
+            snapshot = metrics.load()
+            if args.fmt == "json":
+                import json
+
+                print(json.dumps(snapshot, ensure_ascii=False, indent=2))
+                return
+            if args.fmt == "prometheus":
+                print(metrics.to_prometheus(snapshot), end="")
+                return
+
+            if not snapshot["counters"] and not snapshot["histograms"]:
+                state = "включён" if metrics.enabled() else "выключен (METRICS_ENABLED = true в [tool.valutatrade])"
+                print(f"Метрик пока нет. Сбор метрик {state}.")
+                return
+
+            print(f"Метрики (обновлено {snapshot.get('updated_at', '-')}):")
+            for key in sorted(snapshot["histograms"]):
+                h = snapshot["histograms"][key]
+                errors = snapshot["counters"].get(metrics.series_key(f"{h['name']}_errors_total", h["labels"]))
+                print(
+                    f"- {key}: n={h['count']} avg={h['sum'] / h['count'] * 1e3:.2f} ms "
+                    f"p50={metrics.quantile(h, 0.5) * 1e3:.2f} ms p95={metrics.quantile(h, 0.95) * 1e3:.2f} ms "
+                    f"p99={metrics.quantile(h, 0.99) * 1e3:.2f} ms ошибок={int(errors['value']) if errors else 0}"
+                )
+            for key in sorted(snapshot["counters"]):
+                if not snapshot["counters"][key]["name"].endswith("_errors_total"):
+                    print(f"- {key}: {snapshot['counters'][key]['value']:g}")
+
+        elif args.command == "migrate-balances":
+            from finalproject_1_perfilova.core.usecases import migrate_balances
+
+            print(f"Балансы переведены в точный формат: портфелей {migrate_balances()}.")
+
+        elif args.command == "migrate-storage":
+            from finalproject_1_perfilova.infra.record_store import create_record_store, migrate_json
+
+            imported = migrate_json(create_record_store(args.backend))
+            print(
+                f"Миграция в {args.backend} завершена: "
+                f"пользователей {imported['users']}, портфелей {imported['portfolios']}."
+            )
+            print(f"Чтобы использовать новое хранилище, задайте STORAGE_BACKEND = \"{args.backend}\" в [tool.valutatrade].")
+
     except InsufficientFundsError as e:
         print(str(e))
 
@@ -3,9 +3,10 @@ from finalproject_1_perfilova.core.exceptions import CurrencyNotFoundError
 
 
 class Currency(ABC):
-    def __init__(self, name: str, code: str):
+    def __init__(self, name: str, code: str, decimals: int = 2):
         self.name = name
         self.code = code
+        self.decimals = decimals
 
     @property
     def name(self):
@@ -31,14 +32,25 @@ class Currency(ABC):
             raise ValueError("code должен быть 2-5 символов, верхний регистр, без пробелов.")
         self._code = code
 
+    @property
+    def decimals(self):
+        """Знаков после запятой в балансах (масштаб минимальной единицы)."""
+        return self._decimals
+
+    @decimals.setter
+    def decimals(self, value: int):
+        if not isinstance(value, int) or not (0 <= value <= 18):
+            raise ValueError("decimals должен быть целым от 0 до 18.")
+        self._decimals = value
+
     @abstractmethod
     def get_display_info(self):
         pass
 
 
 class FiatCurrency(Currency):
-    def __init__(self, name: str, code: str, issuing_country: str):
-        super().__init__(name=name, code=code)
+    def __init__(self, name: str, code: str, issuing_country: str, decimals: int = 2):
+        super().__init__(name=name, code=code, decimals=decimals)
         self.issuing_country = issuing_country
 
     @property
@@ -56,8 +68,8 @@ class FiatCurrency(Currency):
 
 
 class CryptoCurrency(Currency):
-    def __init__(self, name: str, code: str, algorithm: str, market_cap: float):
-        super().__init__(name=name, code=code)
+    def __init__(self, name: str, code: str, algorithm: str, market_cap: float, decimals: int = 8):
+        super().__init__(name=name, code=code, decimals=decimals)
         self.algorithm = algorithm
         self.market_cap = market_cap
 
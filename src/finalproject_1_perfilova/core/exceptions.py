@@ -13,6 +13,11 @@ class CurrencyNotFoundError(Exception):
     pass
 
 
+class StorageConflictError(Exception):
+    """Запись отклонена: данные изменены другим процессом после чтения."""
+    pass
+
+
 class ApiRequestError(Exception):
     """Сбой при обращении к внешнему API (Parser Service/заглушка)."""
 
@@ -1,10 +1,24 @@
 from __future__ import annotations
 
-import hashlib
 import secrets
+import sys
 from datetime import datetime
+from decimal import Decimal
+from types import MappingProxyType
+
+from finalproject_1_perfilova.core import money, passwords
 
 class User:
+    __slots__ = (
+        "_user_id",
+        "_username",
+        "_hashed_password",
+        "_salt",
+        "_registration_date",
+        "_hash_scheme",
+        "_hash_params",
+    )
+
     def __init__(
         self,
         user_id: int,
@@ -12,12 +26,16 @@ class User:
         hashed_password: str,
         salt: str,
         registration_date: datetime,
+        hash_scheme: str = passwords.LEGACY_SCHEME,
+        hash_params: dict | None = None,
     ):
         self._user_id = int(user_id)
         self.username = username
         self._hashed_password = hashed_password
         self._salt = salt
         self._registration_date = registration_date
+        self._hash_scheme = hash_scheme
+        self._hash_params = dict(hash_params or {})
 
     @property
     def user_id(self):
@@ -43,29 +61,41 @@ class User:
     def change_password(self, new_password: str):
         if not isinstance(new_password, str) or len(new_password) < 4:
             raise ValueError("Пароль должен быть не короче 4 символов.")
-        self._hashed_password = self._make_hash(new_password, self._salt)
+        self._set_password(new_password, *passwords.get_hash_policy())
 
     def verify_password(self, password: str):
-        return self._hashed_password == self._make_hash(password, self._salt)
+        return passwords.verify_password(
+            password, self._salt, self._hashed_password, self._hash_scheme, self._hash_params
+        )
+
+    def needs_rehash(self):
+        """True, если хеш посчитан не по текущей схеме/параметрам из настроек."""
+        return (self._hash_scheme, self._hash_params) != passwords.get_hash_policy()
 
-    @staticmethod
-    def _make_hash(password: str, salt: str):
-        raw = (password + salt).encode("utf-8")
-        return hashlib.sha256(raw).hexdigest()
+    def rehash(self, password: str):
+        """Пересчитывает хеш по текущей схеме (пароль уже проверен)."""
+        self._set_password(password, *passwords.get_hash_policy())
+
+    def _set_password(self, password: str, scheme: str, params: dict):
+        # новая соль при каждой смене схемы
+        self._salt = secrets.token_hex(16)
+        self._hash_scheme = scheme
+        self._hash_params = dict(params)
+        self._hashed_password = passwords.hash_password(password, self._salt, scheme, params)
 
     @classmethod
     def create_new(cls, user_id: int, username: str, password: str):
         if not isinstance(password, str) or len(password) < 4:
             raise ValueError("Пароль должен быть не короче 4 символов.")
-        salt = secrets.token_hex(8)
-        hashed = cls._make_hash(password, salt)
-        return cls(
+        user = cls(
             user_id=user_id,
             username=username,
-            hashed_password=hashed,
-            salt=salt,
+            hashed_password="",
+            salt="",
             registration_date=datetime.now(),
         )
+        user._set_password(password, *passwords.get_hash_policy())
+        return user
 
     def to_dict(self):
         return {
@@ -74,6 +104,8 @@ class User:
             "hashed_password": self._hashed_password,
             "salt": self._salt,
             "registration_date": self._registration_date.isoformat(timespec="seconds"),
+            "hash_scheme": self._hash_scheme,
+            "hash_params": self._hash_params,
         }
 
     @classmethod
@@ -84,13 +116,36 @@ class User:
             hashed_password=str(data["hashed_password"]),
             salt=str(data["salt"]),
             registration_date=datetime.fromisoformat(data["registration_date"]),
+            # записи без схемы — старый формат (один проход sha256)
+            hash_scheme=str(data.get("hash_scheme", passwords.LEGACY_SCHEME)),
+            hash_params=data.get("hash_params") or {},
         )
 
 class Wallet:
+    """
+    Кошелёк с точным балансом: целое число минимальных единиц валюты
+    (масштаб — Currency.decimals, например 8 знаков для BTC, 2 для USD).
+    balance — float для вывода и оценки, units — точное значение.
+    Хранится только units: масштаб и float-баланс вычисляются при обращении.
+    """
+
+    # без __dict__: в пачечной обработке кошельков тысячи, экономим память
+    __slots__ = ("_currency_code", "_units")
+
     def __init__(self, currency_code: str, balance: float = 0.0):
         self.currency_code = currency_code
         self.balance = balance
-    
+
+    @classmethod
+    def from_units(cls, currency_code: str, units: int):
+        """Кошелёк из уже проверенных минимальных единиц (без разбора суммы)."""
+        if not isinstance(units, int) or units < 0:
+            raise ValueError("Баланс не может быть отрицательным.")
+        wallet = cls.__new__(cls)
+        wallet.currency_code = currency_code
+        wallet._units = units
+        return wallet
+
     @property
     def currency_code(self):
         return self._currency_code
@@ -99,49 +154,91 @@ class Wallet:
     def currency_code(self, value: str):
         if not isinstance(value, str) or not value.strip():
             raise ValueError("currency_code не может быть пустым.")
-        self._currency_code = value.strip().upper()
+        # один объект строки на код валюты для всех кошельков
+        self._currency_code = sys.intern(value.strip().upper())
+
+    @property
+    def decimals(self):
+        return money.decimals_for(self._currency_code)
+
+    @property
+    def units(self):
+        return self._units
 
     @property
     def balance(self):
-        return self._balance
+        return money.from_minor(self._units, self.decimals)
 
     @balance.setter
     def balance(self, value: float):
-        if not isinstance(value, (int, float)):
+        if not isinstance(value, (int, float, Decimal)) or isinstance(value, bool):
             raise TypeError("Баланс должен быть числом.")
-        value = float(value)
-        if value < 0:
+        # баланс округляется до масштаба валюты (старые float-значения)
+        units = money.to_minor(value, self.decimals, strict=False)
+        if units < 0:
             raise ValueError("Баланс не может быть отрицательным.")
-        self._balance = value
+        self._units = units
 
+    # проверяется только amount: сумма/разность уже проверенного баланса
+    # и положительного amount не может стать отрицательной
     def deposit(self, amount: float):
-        if not isinstance(amount, (int, float)) or float(amount) <= 0:
-            raise ValueError("amount должен быть > 0.")
-        self.balance = self.balance + float(amount)
+        self._units += self._amount_units(amount)
 
     def withdraw(self, amount: float):
-        if not isinstance(amount, (int, float)) or float(amount) <= 0:
+        units = self._amount_units(amount)
+        if units > self._units:
+            raise ValueError("Недостаточно средств.")
+        self._units -= units
+
+    def deposit_units(self, units: int):
+        """Зачисление в минимальных единицах (повтор сделок из журнала)."""
+        if units <= 0:
             raise ValueError("amount должен быть > 0.")
-        amount = float(amount)
-        if amount > self.balance:
+        self._units += units
+
+    def withdraw_units(self, units: int):
+        if units <= 0:
+            raise ValueError("amount должен быть > 0.")
+        if units > self._units:
             raise ValueError("Недостаточно средств.")
-        self.balance = self.balance - amount
+        self._units -= units
+
+    def _amount_units(self, amount):
+        if not isinstance(amount, (int, float, Decimal)) or isinstance(amount, bool) or amount <= 0:
+            raise ValueError("amount должен быть > 0.")
+        # сумма с лишними знаками — ошибка, а не молчаливое округление
+        return money.to_minor(amount, self.decimals)
 
     def get_balance_info(self):
-        return f"{self._currency_code}: {self._balance:.4f}"
+        return f"{self._currency_code}: {money.format_minor(self._units, self.decimals)}"
 
 class Portfolio:
-    def __init__(self, user_id: int, wallets: dict[str, Wallet] | None = None):
+    __slots__ = ("_user_id", "_wallets", "_wallets_view", "version", "ledger_offset")
+
+    def __init__(
+        self,
+        user_id: int,
+        wallets: dict[str, Wallet] | None = None,
+        version: int = 0,
+        ledger_offset: int = 0,
+    ):
         self._user_id = int(user_id)
         self._wallets: dict[str, Wallet] = wallets or {}
+        # view живой: видит изменения _wallets, поэтому создаётся один раз
+        self._wallets_view = MappingProxyType(self._wallets)
+        # версия записи в хранилище, прочитанная вместе с портфелем (0 — новой записи)
+        self.version = int(version)
+        # до какого смещения журнала сделок (infra.ledger) портфель уже учтён
+        self.ledger_offset = int(ledger_offset)
 
     @property
     def user_id(self):
         return self._user_id
 
     @property
-    def wallets(self) -> dict[str, Wallet]:
-        return dict(self._wallets)
+    def wallets(self) -> MappingProxyType[str, Wallet]:
+        """Кошельки только для чтения — без копии словаря при каждом обращении."""
+        return self._wallets_view
 
     def add_currency(self, currency_code: str):
         code = currency_code.strip().upper()
@@ -160,11 +257,29 @@ class Portfolio:
     def to_dict(self) -> dict:
         return {
             "user_id": self._user_id,
-            "wallets": {code: {"balance": w.balance} for code, w in self._wallets.items()},
+            # баланс — точная десятичная строка ("0.75000000"), не float
+            "wallets": {
+                code: {"balance": money.format_minor(w.units, w.decimals)} for code, w in self._wallets.items()
+            },
+            "version": self.version,
+            "ledger_offset": self.ledger_offset,
         }
 
     @classmethod
     def from_dict(cls, data: dict):
         wallets_raw = data.get("wallets", {})
-        wallets = {code: Wallet(code, float(w.get("balance", 0.0))) for code, w in wallets_raw.items()}
-        return cls(user_id=int(data["user_id"]), wallets=wallets)
\ No newline at end of file
+        wallets = {}
+        for code, w in wallets_raw.items():
+            raw = w.get("balance", 0)
+            if isinstance(raw, str):
+                wallet = Wallet.from_units(code, money.parse_minor(raw, money.decimals_for(code)))
+            else:
+                # старый формат: float, округляется до масштаба валюты
+                wallet = Wallet(code, raw)
+            wallets[wallet.currency_code] = wallet
+        return cls(
+            user_id=int(data["user_id"]),
+            wallets=wallets,
+            version=int(data.get("version", 0)),
+            ledger_offset=int(data.get("ledger_offset", 0)),
+        )
\ No newline at end of file
@@ -0,0 +1,110 @@
+import math
+from decimal import Decimal, InvalidOperation, ROUND_HALF_EVEN
+
+from finalproject_1_perfilova.core.currencies import get_currency
+from finalproject_1_perfilova.core.exceptions import CurrencyNotFoundError
+
+
+# знаков после запятой для валют вне списка get_currency
+DEFAULT_DECIMALS = 8
+
+# 10 ** decimals без возведения в степень на каждой операции
+_SCALES = tuple(10 ** d for d in range(19))
+
+# до этого значения целое точно представимо во float
+_FLOAT_EXACT = 2 ** 53
+
+
+# код валюты -> число знаков: Wallet не хранит масштаб, а берёт его отсюда
+_DECIMALS: dict[str, int] = {}
+
+
+def decimals_for(code: str):
+    """Число знаков (масштаб) для валюты: из get_currency, иначе DEFAULT_DECIMALS."""
+    decimals = _DECIMALS.get(code)
+    if decimals is None:
+        try:
+            decimals = get_currency(code).decimals
+        except CurrencyNotFoundError:
+            decimals = DEFAULT_DECIMALS
+        _DECIMALS[code] = decimals
+    return decimals
+
+
+def to_minor(value, decimals: int, strict: bool = True):
+    """
+    Сумма -> целое число минимальных единиц (1 BTC = 100_000_000 при 8 знаках).
+
+    strict=True: сумма с лишними знаками — ValueError (ввод пользователя).
+    strict=False: округление до масштаба (чтение старых float-балансов).
+    """
+    scale = _SCALES[decimals]
+
+    if isinstance(value, bool):
+        raise TypeError("Сумма должна быть числом.")
+    if isinstance(value, int):
+        return value * scale
+
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise ValueError("Сумма должна быть конечным числом.")
+        # быстрый путь: float уже равен десятичному числу с decimals знаками
+        units = round(value * scale)
+        if abs(units) < _FLOAT_EXACT and units / scale == value:
+            return units
+        value = repr(value)
+
+    try:
+        exact = Decimal(value).scaleb(decimals)
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError(f"Некорректная сумма '{value}'")
+    if not exact.is_finite():
+        raise ValueError("Сумма должна быть конечным числом.")
+
+    units = exact.to_integral_value(rounding=ROUND_HALF_EVEN)
+    if strict and units != exact:
+        raise ValueError(f"Сумма {value} точнее допустимого: не более {decimals} знаков после запятой")
+    return int(units)
+
+
+def parse_minor(text: str, decimals: int):
+    """Строка из хранилища ('12.34000000') -> минимальные единицы, без Decimal в обычном случае."""
+    whole, dot, frac = text.partition(".")
+    if dot and len(frac) == decimals and frac.isdigit() and whole.lstrip("-").isdigit():
+        units = int(whole.lstrip("-")) * _SCALES[decimals] + int(frac)
+        return -units if whole.startswith("-") else units
+    return to_minor(text, decimals, strict=False)
+
+
+def balance_units(raw, decimals: int):
+    """
+    Баланс из записи portfolios -> минимальные единицы.
+    Строка ('12.34000000') читается точно, float (старый формат) округляется до масштаба.
+    """
+    if isinstance(raw, str):
+        return parse_minor(raw, decimals)
+    return to_minor(raw, decimals, strict=False)
+
+
+def balance_float(raw, decimals: int):
+    """Баланс из записи portfolios -> float, равный Wallet.balance (без объекта Wallet)."""
+    if isinstance(raw, str):
+        whole, dot, frac = raw.partition(".")
+        # строка не точнее масштаба: float() даёт то же ближайшее число, что units / 10**decimals
+        if whole.isdigit() and (not dot or (len(frac) <= decimals and frac.isdigit())):
+            return float(raw)
+    return from_minor(balance_units(raw, decimals), decimals)
+
+
+def format_minor(units: int, decimals: int):
+    """Минимальные единицы -> точная строка с decimals знаками ('0.75000000')."""
+    sign = "-" if units < 0 else ""
+    whole, frac = divmod(abs(units), _SCALES[decimals])
+    if decimals == 0:
+        return f"{sign}{whole}"
+    return f"{sign}{whole}.{frac:0{decimals}d}"
+
+
+def from_minor(units: int, decimals: int):
+    """Минимальные единицы -> float (для оценки в другой валюте и вывода)."""
+    return units / _SCALES[decimals]
@@ -0,0 +1,61 @@
+import hashlib
+import hmac
+
+from finalproject_1_perfilova.infra.settings import SettingsLoader
+
+
+# старая схема: один проход sha256(password + salt), без параметров
+LEGACY_SCHEME = "sha256"
+
+SCHEMES = (LEGACY_SCHEME, "pbkdf2_sha256", "scrypt")
+
+
+def hash_password(password: str, salt: str, scheme: str, params: dict):
+    """Хеш пароля (hex) по схеме и её параметрам."""
+    raw = password.encode("utf-8")
+
+    if scheme == LEGACY_SCHEME:
+        return hashlib.sha256(raw + salt.encode("utf-8")).hexdigest()
+
+    if scheme == "pbkdf2_sha256":
+        return hashlib.pbkdf2_hmac("sha256", raw, salt.encode("utf-8"), int(params["iterations"])).hex()
+
+    if scheme == "scrypt":
+        n, r, p = int(params["n"]), int(params["r"]), int(params["p"])
+        return hashlib.scrypt(
+            raw,
+            salt=salt.encode("utf-8"),
+            n=n,
+            r=r,
+            p=p,
+            # запас памяти: по умолчанию OpenSSL ограничивает 32 МБ
+            maxmem=256 * n * r + 1024 * 1024,
+            dklen=32,
+        ).hex()
+
+    raise ValueError(f"Неизвестная схема хеширования пароля '{scheme}'")
+
+
+def verify_password(password: str, salt: str, hashed: str, scheme: str, params: dict):
+    return hmac.compare_digest(hash_password(password, salt, scheme, params), hashed)
+
+
+def get_hash_policy():
+    """
+    Текущая схема и параметры из [tool.valutatrade]:
+    PASSWORD_HASH_SCHEME, PASSWORD_HASH_ITERATIONS (pbkdf2), PASSWORD_SCRYPT_N/R/P (scrypt).
+    """
+    s = SettingsLoader()
+    scheme = str(s.get("PASSWORD_HASH_SCHEME", "pbkdf2_sha256")).lower()
+
+    if scheme == LEGACY_SCHEME:
+        return scheme, {}
+    if scheme == "pbkdf2_sha256":
+        return scheme, {"iterations": int(s.get("PASSWORD_HASH_ITERATIONS", 100000))}
+    if scheme == "scrypt":
+        return scheme, {
+            "n": int(s.get("PASSWORD_SCRYPT_N", 16384)),
+            "r": int(s.get("PASSWORD_SCRYPT_R", 8)),
+            "p": int(s.get("PASSWORD_SCRYPT_P", 1)),
+        }
+    raise ValueError(f"Неизвестная схема хеширования пароля '{scheme}' (ожидается: {', '.join(SCHEMES)})")
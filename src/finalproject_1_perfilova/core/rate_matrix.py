@@ -0,0 +1,150 @@
+import time
+from datetime import datetime, timezone
+
+from finalproject_1_perfilova.core.exceptions import ApiRequestError
+
+
+def parse_timestamp(value: str):
+    """ISO-строка ('...Z' или с offset) -> unix-время в секундах."""
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+def format_timestamp(epoch: float):
+    """unix-время -> 'YYYY-MM-DDTHH:MM:SSZ'."""
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+
+class RateMatrix:
+    """
+    Матрица курсов по снимку rates.json, собранная один раз на снимок.
+
+    1. Прямые пары берутся как есть, обратные — как 1 / rate.
+    2. Остальные пары считаются через базовую валюту (EUR->RUB = EUR_USD / RUB_USD).
+       Хранится только курс каждой валюты к базовой, кросс-пара считается
+       при первом запросе и запоминается — N² пар заранее не строятся.
+    3. Пара устаревает через ttl после своего updated_at (кросс-пара — после самой старой «ноги»).
+
+    Запись пары: (rate, updated_at, expires_at, source).
+    """
+
+    def __init__(self, direct: dict, to_base: dict, base: str, ttl: int, listed: list[str], last_refresh=None):
+        # (from, to) -> (rate, updated_at, updated_epoch, source)
+        self._direct = direct
+        # валюта -> (курс к базовой, updated_at, updated_epoch, source)
+        self._to_base = to_base
+        self._entries = {}
+        self.base = base
+        self.ttl = ttl
+        self.listed = listed
+        self.last_refresh = last_refresh
+        self.codes = {code for pair in direct for code in pair}
+        if to_base:
+            self.codes.add(base)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict, base: str, ttl: int):
+        if not isinstance(snapshot, dict):
+            snapshot = {}
+        pairs = snapshot.get("pairs", snapshot)
+        if not isinstance(pairs, dict):
+            pairs = {}
+
+        direct = {}
+        for pair, info in pairs.items():
+            if not isinstance(info, dict) or "_" not in pair:
+                continue
+            frm, to = pair.split("_", 1)
+            updated_at = str(info["updated_at"])
+            direct[(frm, to)] = (
+                float(info["rate"]),
+                updated_at,
+                parse_timestamp(updated_at),
+                info.get("source", "-"),
+            )
+        return cls._build(direct, base, ttl, snapshot.get("last_refresh"))
+
+    @classmethod
+    def from_binary(cls, snapshot, base: str, ttl: int):
+        """Матрица по бинарному snapshot (infra.rates_binary) — без разбора json."""
+        direct = {}
+        for pair, (rate, epoch, source) in snapshot.items():
+            frm, to = pair.split("_", 1)
+            direct[(frm, to)] = (rate, format_timestamp(epoch), epoch, source)
+        last_refresh = format_timestamp(snapshot.last_refresh) if snapshot.last_refresh is not None else None
+        return cls._build(direct, base, ttl, last_refresh)
+
+    @classmethod
+    def _build(cls, direct: dict, base: str, ttl: int, last_refresh):
+        # курс каждой валюты к базовой
+        to_base = {}
+        for (frm, to), (rate, updated_at, epoch, source) in direct.items():
+            if to == base:
+                to_base[frm] = (rate, updated_at, epoch, source)
+        for (frm, to), (rate, updated_at, epoch, source) in direct.items():
+            if frm == base and to not in to_base and rate != 0:
+                to_base[to] = (1.0 / rate, updated_at, epoch, source)
+
+        listed = sorted(frm for (frm, to) in direct if to == base)
+        return cls(direct, to_base, base=base, ttl=ttl, listed=listed, last_refresh=last_refresh)
+
+    def __bool__(self):
+        return bool(self._direct)
+
+    def has_currency(self, code: str):
+        return code in self.codes
+
+    def _compute(self, frm: str, to: str):
+        if frm == to:
+            return None
+
+        direct = self._direct
+        if (frm, to) in direct:
+            rate, updated_at, epoch, source = direct[(frm, to)]
+        elif (to, frm) in direct and direct[(to, frm)][0] != 0:
+            rev_rate, updated_at, epoch, source = direct[(to, frm)]
+            rate = 1.0 / rev_rate
+        else:
+            base, to_base = self.base, self._to_base
+            if not ((frm in to_base or frm == base) and (to in to_base or to == base)):
+                return None
+            legs = [to_base[c] for c in (frm, to) if c != base]
+            frm_rate = to_base[frm][0] if frm != base else 1.0
+            to_rate = to_base[to][0] if to != base else 1.0
+            if to_rate == 0:
+                return None
+            rate = frm_rate / to_rate
+            # кросс-курс устаревает вместе с самой старой «ногой»
+            oldest = min(legs, key=lambda leg: leg[2])
+            updated_at, epoch = oldest[1], oldest[2]
+            source = "+".join(sorted({leg[3] for leg in legs}))
+
+        return rate, updated_at, epoch + self.ttl, source
+
+    def lookup(self, frm: str, to: str):
+        """Запись пары без проверки TTL (или None)."""
+        key = (frm, to)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._compute(frm, to)
+            if entry is not None:
+                self._entries[key] = entry
+        return entry
+
+    def get(self, frm: str, to: str, now: float | None = None):
+        """
+        Возвращает (rate, updated_at) для пары.
+        Бросает ApiRequestError, если пары нет или курс устарел.
+        """
+        entry = self.lookup(frm, to)
+        if entry is None:
+            raise ApiRequestError(f"Не удалось получить курс для {frm}-{to}")
+
+        rate, updated_at, expires_at, _source = entry
+        check_fresh(frm, to, expires_at, self.ttl, now)
+        return rate, updated_at
+
+
+def check_fresh(frm: str, to: str, expires_at: float, ttl: int, now: float | None = None):
+    """Бросает ApiRequestError, если курс пары устарел."""
+    if (time.time() if now is None else now) > expires_at:
+        raise ApiRequestError(f"курс {frm}-{to} устарел (старше {ttl} сек)")
@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+
+from finalproject_1_perfilova.core.rate_matrix import check_fresh
+from finalproject_1_perfilova.infra import metrics
+from finalproject_1_perfilova.infra.database import DatabaseManager
+
+
+class RateResolver:
+    """
+    Политика получения курса (stale-while-revalidate).
+
+    1. Свежий курс отдаётся как есть.
+    2. Курс, устаревший не больше чем на grace_seconds, тоже отдаётся,
+       а источник пары обновляется в фоне.
+    3. Устаревший сильнее: с blocking=True вызов ждёт обновления источника
+       и берёт курс заново; если курс всё ещё старый (или blocking=False) —
+       ApiRequestError, как раньше.
+    4. Обновление источника — одно на все запросы (single-flight): в процессе
+       параллельные запросы ждут один поток, между процессами — файловая
+       блокировка; второй процесс ждёт первого, а не идёт в API сам.
+       После обновления источник не трогается cooldown_seconds, даже если
+       обновить не удалось (API недоступно).
+
+    refresh(source) — обновление одного источника (имя как в snapshot),
+    ttl — RATES_TTL_SECONDS (для текста ошибки).
+    """
+
+    def __init__(
+        self,
+        refresh,
+        ttl: int,
+        grace_seconds: float = 0.0,
+        enabled: bool = True,
+        blocking: bool = True,
+        cooldown_seconds: float = 10.0,
+    ):
+        self.refresh = refresh
+        self.ttl = ttl
+        self.grace_seconds = grace_seconds
+        self.enabled = enabled
+        self.blocking = blocking
+        self.cooldown_seconds = cooldown_seconds
+        self._lock = threading.Lock()
+        # источник -> Event, который выставит поток обновления
+        self._inflight: dict[str, threading.Event] = {}
+        # источник -> monotonic-время последнего запуска обновления
+        self._started: dict[str, float] = {}
+
+    def resolve(self, frm: str, to: str, lookup, now: float | None = None):
+        """
+        lookup(frm, to) -> (rate, updated_at, expires_at, source).
+        Возвращает (rate, updated_at).
+        """
+        rate, updated_at, expires_at, source = lookup(frm, to)
+        now = time.time() if now is None else now
+        if now <= expires_at:
+            return rate, updated_at
+
+        # у кросс-курса источник вида "CoinGecko+ExchangeRate-API"
+        sources = [s for s in source.split("+") if s and s != "-"]
+
+        def still_stale():
+            return time.time() > lookup(frm, to)[2]
+
+        if now <= expires_at + self.grace_seconds:
+            metrics.inc("rates_served_stale_total", pair=f"{frm}_{to}")
+            logging.warning(f"Курс {frm}-{to} устарел ({updated_at}), отдаём его и обновляем {source} в фоне")
+            if self.enabled:
+                for s in sources:
+                    self._start(s, still_stale)
+            return rate, updated_at
+
+        if self.enabled:
+            events = [e for e in (self._start(s, still_stale) for s in sources) if e is not None]
+            if self.blocking and events:
+                for event in events:
+                    event.wait()
+                rate, updated_at, expires_at, source = lookup(frm, to)
+
+        check_fresh(frm, to, expires_at, self.ttl)
+        return rate, updated_at
+
+    def _start(self, source: str, still_stale):
+        """
+        Запускает обновление источника, если оно ещё не идёт.
+        Возвращает Event завершения (None — источник в cooldown).
+        """
+        with self._lock:
+            event = self._inflight.get(source)
+            if event is not None:
+                return event
+            started = self._started.get(source)
+            if started is not None and time.monotonic() - started < self.cooldown_seconds:
+                return None
+            event = self._inflight[source] = threading.Event()
+            self._started[source] = time.monotonic()
+
+        # daemon: CLI-процесс не ждёт фоновое обновление при выходе (snapshot
+        # пишется атомарно, прерванное обновление его не портит)
+        threading.Thread(
+            target=self._run, args=(source, still_stale, event), name=f"rates-refresh-{source}", daemon=True
+        ).start()
+        return event
+
+    def _run(self, source: str, still_stale, event: threading.Event):
+        db = DatabaseManager()
+        lock_name = f"rates_refresh_{source}"
+        try:
+            with db.try_lock(lock_name) as acquired:
+                if acquired:
+                    # другой процесс мог только что закончить обновление этого источника
+                    if still_stale():
+                        with metrics.timer("rates_refresh", source=source):
+                            self.refresh(source)
+                        metrics.inc("rates_refresh_total", source=source)
+            if not acquired:
+                # обновление уже идёт в другом процессе — ждём его результата
+                metrics.inc("rates_refresh_coalesced_total", source=source)
+                with db.lock(lock_name):
+                    pass
+        except Exception as e:
+            logging.error(f"Фоновое обновление курсов {source} не удалось: {e}")
+        finally:
+            with self._lock:
+                self._inflight.pop(source, None)
+            event.set()
@@ -1,59 +1,80 @@
-from datetime import datetime, timezone
+import csv
+import json
+import logging
+from datetime import datetime
+from functools import wraps
 
+from finalproject_1_perfilova.core import money
 from finalproject_1_perfilova.core.models import User, Portfolio
 from finalproject_1_perfilova.decorators import log_action
+from finalproject_1_perfilova.infra import metrics
 from finalproject_1_perfilova.infra.database import DatabaseManager
+from finalproject_1_perfilova.infra.ledger import TradeLedger
+from finalproject_1_perfilova.infra.record_store import get_record_store, USERS, PORTFOLIOS
 from finalproject_1_perfilova.core.currencies import get_currency
-from finalproject_1_perfilova.core.exceptions import WalletNotFoundError, InsufficientFundsError, ApiRequestError
+from finalproject_1_perfilova.core.rate_matrix import RateMatrix, format_timestamp
+from finalproject_1_perfilova.core.rate_resolver import RateResolver
+from finalproject_1_perfilova.core.utils import normalize_timestamp
+from finalproject_1_perfilova.core.valuation import PortfolioTable, valuate_columns
+from finalproject_1_perfilova.core.exceptions import (
+    ApiRequestError,
+    CurrencyNotFoundError,
+    WalletNotFoundError,
+    InsufficientFundsError,
+    StorageConflictError,
+)
 from finalproject_1_perfilova.infra.settings import SettingsLoader
 
 
-USERS_FILE = "users.json"
-PORTFOLIOS_FILE = "portfolios.json"
 SESSION_FILE = "session.json"
+RATES_FILE = "rates.json"
+RATES_BINARY_FILE = "rates.bin"
 
+# сколько раз повторять запись снимков портфелей при конфликте
+CONFLICT_RETRIES = 5
 
-db = DatabaseManager()
 
+db = DatabaseManager()
+ledger = TradeLedger()
 
-def _next_user_id(users: list[dict]):
-    if not users:
-        return 1
-    max_id = 0
-    for u in users:
-        if int(u["user_id"]) > max_id:
-            max_id = int(u["user_id"])
-    return max_id + 1
+# матрица строится заново только когда DatabaseManager отдал новый документ
+_matrix_cache = {"snapshot": None, "matrix": None}
 
 
 def register_user(username: str, password: str):
-    users = db.read(USERS_FILE, [])
-    for u in users:
-        if u["username"] == username:
+    store = get_record_store()
+    # проверка имени и выдача id — под блокировкой, чтобы два процесса не заняли одно и то же
+    with store.lock(USERS):
+        if store.find_key(USERS, "username", username) is not None:
             raise ValueError(f"Имя пользователя '{username}' уже занято")
-    
-    user_id = _next_user_id(users)
-    
-    user = User.create_new(user_id=user_id, username=username, password=password)
-    
-    users.append(user.to_dict())
-    db.write(USERS_FILE, users)
-
-    portfolios = db.read(PORTFOLIOS_FILE, [])
-    portfolios.append(Portfolio(user_id=user.user_id, wallets={}).to_dict())
-    db.write(PORTFOLIOS_FILE, portfolios)
+
+        user_id = store.next_key(USERS)
+
+        user = User.create_new(user_id=user_id, username=username, password=password)
+
+        store.put(USERS, user.user_id, user.to_dict(), expected_version=0)
+    store.put(PORTFOLIOS, user.user_id, Portfolio(user_id=user.user_id, wallets={}).to_dict())
 
     return user
 
 
-def login_user(username: str, password: str):
-    users = db.read(USERS_FILE, [])
+def _find_user(username: str):
+    """Запись пользователя по имени через индекс username -> user_id."""
+    store = get_record_store()
+    user_id = store.find_key(USERS, "username", username)
+    found = store.get(USERS, user_id) if user_id is not None else None
 
-    found = None
-    for u in users:
-        if u["username"] == username:
-            found = u
-            break
+    if user_id is not None and (found is None or found["username"] != username):
+        # индекс указывает не туда (данные правили вручную) — пересобираем и пробуем ещё раз
+        store.rebuild_indexes()
+        user_id = store.find_key(USERS, "username", username)
+        found = store.get(USERS, user_id) if user_id is not None else None
+
+    return found
+
+
+def login_user(username: str, password: str):
+    found = _find_user(username)
 
     if found is None:
         raise ValueError(f"Пользователь '{username}' не найден")
@@ -63,6 +84,16 @@ def login_user(username: str, password: str):
     if not user.verify_password(password):
         raise ValueError("Неверный пароль")
 
+    if user.needs_rehash():
+        # прозрачный переход на текущую схему хеширования при успешном входе
+        user.rehash(password)
+        try:
+            get_record_store().put(
+                USERS, user.user_id, user.to_dict(), expected_version=int(found.get("version", 0))
+            )
+        except StorageConflictError:
+            logging.info(f"Перехеширование пароля '{username}' отложено: запись изменена параллельно")
+
     session = {
         "user_id": user.user_id,
         "username": user.username,
@@ -99,79 +130,225 @@ def _validate_amount(amount):
     return amount
 
 
-def load_portfolio(user_id: int):
-    portfolios = db.read(PORTFOLIOS_FILE, [])
-    for p in portfolios:
-        if int(p["user_id"]) == int(user_id):
-            return Portfolio.from_dict(p)
+def _retry_on_conflict(func):
+    """
+    Повторяет usecase целиком, если между чтением и записью портфель
+    изменил другой процесс (optimistic lock). Блокировка держится
+    только на время самой записи, а не всей команды.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(CONFLICT_RETRIES):
+            try:
+                return func(*args, **kwargs)
+            except StorageConflictError:
+                if attempt + 1 == CONFLICT_RETRIES:
+                    raise
+                logging.info(f"{func.__name__}: конфликт записи, повтор {attempt + 2}/{CONFLICT_RETRIES}")
+    return wrapper
+
+
+def _snapshot(user_id: int):
+    data = get_record_store().get(PORTFOLIOS, user_id)
+    if data is not None:
+        return Portfolio.from_dict(data)
     return Portfolio(user_id=user_id, wallets={})
 
 
-def save_portfolio(portfolio: Portfolio):
-    portfolios = db.read(PORTFOLIOS_FILE, [])
-    updated = False
-    for i in range(len(portfolios)):
-        if int(portfolios[i]["user_id"]) == int(portfolio.user_id):
-            portfolios[i] = portfolio.to_dict()
-            updated = True
-            break
-    if not updated:
-        portfolios.append(portfolio.to_dict())
-    db.write(PORTFOLIOS_FILE, portfolios)
+def _replay(portfolios: dict[int, Portfolio], events):
+    """
+    Применяет к портфелям события журнала, которых в них ещё нет
+    (смещение события >= ledger_offset портфеля).
+    """
+    for offset, end, event in events:
+        portfolio = portfolios.get(int(event["user_id"]))
+        if portfolio is None or offset < portfolio.ledger_offset:
+            continue
+
+        cur = event["currency"]
+        try:
+            if cur not in portfolio.wallets:
+                portfolio.add_currency(cur)
+            wallet = portfolio.get_wallet(cur)
+            units = money.parse_minor(str(event["amount"]), wallet.decimals)
+            if event["side"] == "buy":
+                wallet.deposit_units(units)
+            else:
+                wallet.withdraw_units(units)
+        except ValueError as e:
+            # сделки проверяются при записи; сюда попадает только испорченный журнал
+            logging.error(f"Журнал сделок: событие на смещении {offset} не применено: {e}")
+        portfolio.ledger_offset = end
+
+
+def _load_portfolios(user_ids):
+    """
+    Текущие портфели = снимки из хранилища + хвост журнала.
+    Возвращает (портфели по user_id, число событий в хвосте).
+    """
+    tail = ledger.tail()
+    portfolios = {int(uid): _snapshot(int(uid)) for uid in user_ids}
+    _replay(portfolios, tail)
+    return portfolios, len(tail)
 
 
-@log_action("GET_RATE")
-def get_rate(from_currency: str, to_currency: str, _log=None):
-    frm = _validate_currency(from_currency)
-    to = _validate_currency(to_currency)
-
-    if _log is not None:
-        _log["currency"] = f"{frm}_{to}"
-        _log["amount"] = "-"
-        _log["rate"] = "-"
-        _log["base"] = "-"
+def load_portfolio(user_id: int):
+    return _load_portfolios([user_id])[0][int(user_id)]
+
+
+def _trade_event(user_id: int, side: str, cur: str, amount: float, rate: float, base_cur: str):
+    decimals = money.decimals_for(cur)
+    return {
+        "user_id": int(user_id),
+        "side": side,
+        "currency": cur,
+        "amount": money.format_minor(money.to_minor(amount, decimals), decimals),
+        "rate": rate,
+        "base": base_cur,
+        "timestamp": normalize_timestamp(),
+    }
 
-    rates_doc = db.read("rates.json", {})
-    rates = rates_doc.get("pairs", rates_doc)
 
-    pair = f"{frm}_{to}"
-    rev_pair = f"{to}_{frm}"
+def _record_trades(events: list[dict], tail_length: int):
+    """
+    Дописывает сделки в журнал (вызывается под ledger.lock()).
+    Когда хвост дорастает до LEDGER_SNAPSHOT_EVERY событий — снимок портфелей.
+    """
+    positions = ledger.append(events)
+
+    every = int(SettingsLoader().get("LEDGER_SNAPSHOT_EVERY", 500))
+    if tail_length + len(events) >= every:
+        try:
+            snapshot_portfolios()
+        except Exception as e:
+            # сделки уже в журнале; снимок повторится при следующей записи
+            logging.warning(f"Снимок портфелей не записан: {e}")
+    return positions
+
+
+@_retry_on_conflict
+def snapshot_portfolios():
+    """
+    Переносит хвост журнала в снимки портфелей и сдвигает начало хвоста.
+    Возвращает число учтённых событий.
+    """
+    with ledger.lock():
+        tail = ledger.tail()
+        if not tail:
+            return 0
+
+        portfolios = {int(e["user_id"]): None for _o, _e, e in tail}
+        portfolios = {uid: _snapshot(uid) for uid in portfolios}
+        _replay(portfolios, tail)
+
+        get_record_store().put_many(
+            PORTFOLIOS,
+            {uid: p.to_dict() for uid, p in portfolios.items()},
+            expected_versions={uid: p.version for uid, p in portfolios.items()},
+        )
+        # сбой до этой строки не страшен: ledger_offset в снимках не даст применить события дважды
+        ledger.mark_snapshot(tail[-1][1])
+        return len(tail)
+
+
+def _binary_snapshot():
+    """
+    Бинарный snapshot (RATES_BINARY_SNAPSHOT), если он не старше rates.json.
+    Иначе None — курсы читаются из rates.json.
+    """
+    if not SettingsLoader().get("RATES_BINARY_SNAPSHOT", False):
+        return None
+    from finalproject_1_perfilova.infra import rates_binary
+
+    binary_version = db.version(RATES_BINARY_FILE)
+    json_version = db.version(RATES_FILE)
+    # RatesStorage пишет rates.bin после rates.json; более новый json записан в обход
+    if binary_version is None or (json_version is not None and json_version[0] > binary_version[0]):
+        return None
+    return rates_binary.open_snapshot(RATES_BINARY_FILE)
+
+
+def get_rate_matrix():
+    """
+    Матрица курсов по текущему снимку rates.bin или rates.json.
+    Пока файл не менялся, возвращается один и тот же объект.
+    """
+    snapshot = _binary_snapshot()
+    if snapshot is None:
+        snapshot = db.read(RATES_FILE, {})
+    if _matrix_cache["snapshot"] is snapshot and _matrix_cache["matrix"] is not None:
+        return _matrix_cache["matrix"]
+
+    settings = SettingsLoader()
+    build = RateMatrix.from_snapshot if isinstance(snapshot, dict) else RateMatrix.from_binary
+    matrix = build(
+        snapshot,
+        base=str(settings.get("BASE_CURRENCY", "USD")).upper(),
+        ttl=int(settings.get("RATES_TTL_SECONDS", 300)),
+    )
+    _matrix_cache["snapshot"] = snapshot
+    _matrix_cache["matrix"] = matrix
+    return matrix
+
+
+def _rate_entry(frm: str, to: str):
+    """(rate, updated_at, expires_at, source) пары без проверки TTL."""
+    # прямая пара из бинарного snapshot — чтение из памяти, без матрицы
+    snapshot = _binary_snapshot()
+    entry = snapshot.get(f"{frm}_{to}") if snapshot is not None else None
+    if entry is not None:
+        rate, epoch, source = entry
+        return rate, format_timestamp(epoch), epoch + rate_resolver.ttl, source
+
+    entry = get_rate_matrix().lookup(frm, to)
+    if entry is None:
+        raise ApiRequestError(f"Не удалось получить курс для {frm}-{to}")
+    return entry
+
+
+def _refresh_source(source: str):
+    """Обновляет курсы одного источника через Parser Service (для rate_resolver)."""
+    from finalproject_1_perfilova.parser_service.updater import SOURCES, build_updater
+
+    keys = [key for key, name in SOURCES.items() if name == source]
+    if not keys:
+        logging.info(f"Источник '{source}' не обновляется по запросу")
+        return
+    build_updater(keys[0]).run_update()
+
+
+def _make_rate_resolver():
+    settings = SettingsLoader()
+    return RateResolver(
+        _refresh_source,
+        ttl=int(settings.get("RATES_TTL_SECONDS", 300)),
+        grace_seconds=float(settings.get("RATES_STALE_GRACE_SECONDS", 0)),
+        enabled=bool(settings.get("RATES_REFRESH_ON_STALE", True)),
+    )
 
-    # прямой курс
-    if pair in rates and isinstance(rates[pair], dict):
-        rate = float(rates[pair]["rate"])
-        updated_at = str(rates[pair]["updated_at"])
 
-        ttl = int(SettingsLoader().get("RATES_TTL_SECONDS", 300))
-        updated_dt = datetime.fromisoformat(updated_at.replace("Z", "+00:00"))
-        age = (datetime.now(timezone.utc) - updated_dt).total_seconds()
+# политика для устаревших курсов: grace, фоновое обновление, single-flight
+rate_resolver = _make_rate_resolver()
 
-        if age > ttl:
-            raise ApiRequestError(f"курс {frm}-{to} устарел (старше {ttl} сек)")
 
-        return rate, updated_at
+def resolve_rate(frm: str, to: str):
+    """Курс пары по политике rate_resolver. Возвращает (rate, updated_at)."""
+    return rate_resolver.resolve(frm, to, _rate_entry)
 
-    # обратный курс (если есть BTC_USD, то USD_BTC = 1 / BTC_USD)
-    if rev_pair in rates and isinstance(rates[rev_pair], dict):
-        rev_rate = float(rates[rev_pair]["rate"])
-        if rev_rate == 0:
-            raise ApiRequestError(f"Курс {frm}-{to} недоступен. Повторите попытку позже.")
-        
-        updated_at = str(rates[rev_pair]["updated_at"])
 
-        ttl = int(SettingsLoader().get("RATES_TTL_SECONDS", 300))
-        updated_dt = datetime.fromisoformat(updated_at.replace("Z", "+00:00"))
-        age = (datetime.now(timezone.utc) - updated_dt).total_seconds()
+@metrics.timed("usecase", op="get_rate")
+@log_action("GET_RATE")
+def get_rate(from_currency: str, to_currency: str, _log=None):
+    frm = _validate_currency(from_currency)
+    to = _validate_currency(to_currency)
 
-        if age > ttl:
-            raise ApiRequestError(f"курс {frm}-{to} устарел (старше {ttl} сек)")
-        
-        rate = 1.0 / rev_rate
-        return rate, updated_at
+    if _log is not None:
+        _log["currency"] = f"{frm}_{to}"
 
-    raise ApiRequestError(f"Не удалось получить курс для {frm}-{to}")
+    return resolve_rate(frm, to)
 
 
+@metrics.timed("usecase", op="show_portfolio")
 def show_portfolio(base: str = "USD"):
     session = require_login()
     base_cur = _validate_currency(base)
@@ -204,16 +381,90 @@ def show_portfolio(base: str = "USD"):
     return "\n".join(lines)
 
 
-@log_action("BUY")
-def buy(currency: str, amount: float, base: str = "USD", _log=None):
+def _current_records():
+    """Все портфели в формате to_dict: снимки + хвост журнала (только для затронутых)."""
+    records = {int(r["user_id"]): r for r in get_record_store().all(PORTFOLIOS)}
+    tail = ledger.tail()
+    if tail:
+        touched = {}
+        for _offset, _end, event in tail:
+            uid = int(event["user_id"])
+            if uid not in touched:
+                touched[uid] = Portfolio.from_dict(records[uid]) if uid in records else Portfolio(user_id=uid)
+        _replay(touched, tail)
+        for uid, portfolio in touched.items():
+            records[uid] = portfolio.to_dict()
+    return list(records.values())
+
+
+def trade_history(start=None, end=None, limit: int | None = None):
+    """
+    Сделки текущего пользователя из журнала (старые -> новые).
+    start/end — ISO-строки или datetime; limit — только последние N.
+
+    Журнал читается с начала: снимки портфелей хранят только балансы, а не
+    сделки, поэтому начать со смещения снимка нельзя — O(событий журнала).
+    """
     session = require_login()
-    cur = _validate_currency(currency)
+    user_id = int(session["user_id"])
+    # метки в журнале — "YYYY-MM-DDTHH:MM:SSZ", сравниваются как строки
+    start = normalize_timestamp(start) if start is not None else None
+    end = normalize_timestamp(end) if end is not None else None
+
+    events = []
+    for _offset, _end, event in ledger.read_from(0):
+        if int(event["user_id"]) != user_id:
+            continue
+        ts = event.get("timestamp", "")
+        if (start is not None and ts < start) or (end is not None and ts > end):
+            continue
+        events.append(event)
+    return events[-limit:] if limit else events
+
+
+def valuate_all(base: str = "USD"):
+    """
+    Переоценка всех портфелей в базовой валюте за один проход.
+    Возвращает список (user_id, username, total), упорядоченный по user_id.
+    """
     base_cur = _validate_currency(base)
-    amount = _validate_amount(amount)
+    store = get_record_store()
+
+    columns = PortfolioTable.from_records(_current_records())
+    totals = valuate_columns(columns, resolve_rate, base_cur)
+
+    usernames = {int(u["user_id"]): u["username"] for u in store.all(USERS)}
+    result = [
+        (user_id, usernames.get(user_id, "-"), total)
+        for user_id, total in zip(columns.user_ids, totals)
+    ]
+    result.sort(key=lambda row: row[0])
+    return result
+
+
+@_retry_on_conflict
+def migrate_balances():
+    """
+    Переписывает float-балансы старого формата в точные строки минимальных единиц.
+    Возвращает число переписанных портфелей.
+    """
+    store = get_record_store()
+    legacy = {}
+    for data in store.all(PORTFOLIOS):
+        if any(not isinstance(w.get("balance", 0), str) for w in data.get("wallets", {}).values()):
+            legacy[int(data["user_id"])] = Portfolio.from_dict(data)
+
+    if legacy:
+        store.put_many(
+            PORTFOLIOS,
+            {uid: p.to_dict() for uid, p in legacy.items()},
+            expected_versions={uid: p.version for uid, p in legacy.items()},
+        )
+    return len(legacy)
 
-    user_id = int(session["user_id"])
-    portfolio = load_portfolio(user_id)
 
+def _apply_buy(portfolio: Portfolio, cur: str, amount: float):
+    """Зачисляет amount в кошелёк cur. Возвращает (было, стало)."""
     # если кошелька нет — нужно создать
     if cur not in portfolio.wallets:
         portfolio.add_currency(cur)
@@ -221,71 +472,248 @@ def buy(currency: str, amount: float, base: str = "USD", _log=None):
     wallet = portfolio.get_wallet(cur)
     before = wallet.balance
     wallet.deposit(amount)
-    after = wallet.balance
+    return before, wallet.balance
 
-    rate, _ts = get_rate(cur, base_cur)
 
-    if _log is not None:
-        _log["username"] = session["username"]
-        _log["currency"] = cur
-        _log["amount"] = f"{amount:.4f}"
-        _log["rate"] = f"{rate:.2f}"
-        _log["base"] = base_cur
+def _apply_sell(portfolio: Portfolio, cur: str, amount: float):
+    """Списывает amount из кошелька cur. Возвращает (было, стало)."""
+    if cur not in portfolio.wallets:
+        raise WalletNotFoundError(
+            f"У вас нет кошелька '{cur}'. Добавьте валюту: она создаётся автоматически при первой покупке."
+        )
 
-    cost = amount * rate
+    wallet = portfolio.get_wallet(cur)
+    before = wallet.balance
+
+    # сравнение в минимальных единицах: без ошибок округления float
+    if money.to_minor(amount, wallet.decimals) > wallet.units:
+        raise InsufficientFundsError(
+            f"Недостаточно средств: доступно {before:.4f} {cur}, требуется {amount:.4f} {cur}"
+        )
+
+    wallet.withdraw(amount)
+    return before, wallet.balance
 
-    save_portfolio(portfolio)
 
+def trade_report(side: str, cur: str, amount: float, rate: float, base_cur: str, before: float, after: float):
+    """Текст результата buy/sell (общий для CLI и сервиса)."""
+    if side == "buy":
+        title, total = "Покупка выполнена", f"Оценочная стоимость покупки: {amount * rate:,.2f} {base_cur}"
+    else:
+        title, total = "Продажа выполнена", f"Оценочная выручка: {amount * rate:,.2f} {base_cur}"
     return (
-        f"Покупка выполнена: {amount:.4f} {cur} по курсу {rate:.2f} {base_cur}/{cur}\n"
+        f"{title}: {amount:.4f} {cur} по курсу {rate:.2f} {base_cur}/{cur}\n"
         f"Изменения в портфеле:\n"
         f"- {cur}: было {before:.4f} -> стало {after:.4f}\n"
-        f"Оценочная стоимость покупки: {cost:,.2f} {base_cur}"
+        f"{total}"
     )
 
 
-@log_action("SELL")
-def sell(currency: str, amount: float, base: str = "USD", _log=None):
+@metrics.timed("usecase", op="buy")
+@log_action("BUY")
+def buy(currency: str, amount: float, base: str = "USD", _log=None):
     session = require_login()
     cur = _validate_currency(currency)
     base_cur = _validate_currency(base)
     amount = _validate_amount(amount)
 
     user_id = int(session["user_id"])
-    portfolio = load_portfolio(user_id)
+    rate, _ts = get_rate(cur, base_cur)
 
-    if cur not in portfolio.wallets:
-        raise WalletNotFoundError(
-            f"У вас нет кошелька '{cur}'. Добавьте валюту: она создаётся автоматически при первой покупке."
-        )
+    # проверка баланса и запись в журнал — под одной блокировкой
+    with ledger.lock():
+        portfolios, tail_length = _load_portfolios([user_id])
+        before, after = _apply_buy(portfolios[user_id], cur, amount)
+        _record_trades([_trade_event(user_id, "buy", cur, amount, rate, base_cur)], tail_length)
 
-    wallet = portfolio.get_wallet(cur)
-    before = wallet.balance
+    if _log is not None:
+        _log["username"] = session["username"]
+        _log["currency"] = cur
+        _log["amount"] = amount
+        _log["rate"] = rate
+        _log["base"] = base_cur
 
-    if amount > before:
-        raise InsufficientFundsError(
-            f"Недостаточно средств: доступно {before:.4f} {cur}, требуется {amount:.4f} {cur}"
-        )
+    return trade_report("buy", cur, amount, rate, base_cur, before, after)
 
-    wallet.withdraw(amount)
-    after = wallet.balance
 
+@metrics.timed("usecase", op="sell")
+@log_action("SELL")
+def sell(currency: str, amount: float, base: str = "USD", _log=None):
+    session = require_login()
+    cur = _validate_currency(currency)
+    base_cur = _validate_currency(base)
+    amount = _validate_amount(amount)
+
+    user_id = int(session["user_id"])
     rate, _ts = get_rate(cur, base_cur)
 
+    # проверка баланса и запись в журнал — под одной блокировкой
+    with ledger.lock():
+        portfolios, tail_length = _load_portfolios([user_id])
+        before, after = _apply_sell(portfolios[user_id], cur, amount)
+        _record_trades([_trade_event(user_id, "sell", cur, amount, rate, base_cur)], tail_length)
+
     if _log is not None:
         _log["username"] = session["username"]
         _log["currency"] = cur
-        _log["amount"] = f"{amount:.4f}"
-        _log["rate"] = f"{rate:.2f}"
+        _log["amount"] = amount
+        _log["rate"] = rate
         _log["base"] = base_cur
 
-    revenue = amount * rate
+    return trade_report("sell", cur, amount, rate, base_cur, before, after)
+
+
+def read_orders(stream, fmt: str | None = None):
+    """
+    Читает заявки из CSV (заголовок user,side,currency,amount) или JSONL.
+    Формат определяется по первому непустому символу, если fmt не задан.
+    Возвращает список dict с ключами user, side, currency, amount, line
+    (line — номер строки во входных данных, с 1).
+    Строка JSONL, которая не разбирается как JSON, — ValueError с её номером.
+    """
+    # пустые строки пропускаются, но номера строк остаются как в файле
+    numbered = [(n, line) for n, line in enumerate(stream.read().splitlines(), start=1) if line.strip()]
+    if not numbered:
+        return []
+
+    if fmt is None:
+        fmt = "jsonl" if numbered[0][1].lstrip().startswith("{") else "csv"
+
+    orders = []
+    if fmt == "jsonl":
+        for n, line in numbered:
+            try:
+                raw = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Строка {n}: некорректный JSON ({e.msg}, позиция {e.pos + 1})") from e
+            orders.append({**(raw if isinstance(raw, dict) else {}), "line": n})
+    elif fmt == "csv":
+        reader = csv.DictReader(line for _n, line in numbered)
+        for row in reader:
+            # line_num — сколько непустых строк прочитано; номер в файле берём из numbered
+            n = numbered[reader.line_num - 1][0]
+            orders.append({**{k.strip(): (v or "").strip() for k, v in row.items() if k}, "line": n})
+    else:
+        raise ValueError(f"Неизвестный формат заявок '{fmt}' (ожидается csv или jsonl)")
+    return orders
+
+
+@metrics.timed("usecase", op="trade_batch")
+@log_action("TRADE_BATCH")
+def trade_batch(orders: list[dict], base: str = "USD", atomic: bool = False, _log=None):
+    """
+    Исполняет пачку заявок на одном снимке курсов и портфелей.
+
+    1. Курсы (по политике rate_resolver, до блокировки журнала: обновление
+       курсов не держит её), пользователи и нужные портфели читаются один раз.
+    2. Заявки применяются в памяти по порядку; каждая получает свой результат.
+    3. atomic=False: ошибочные заявки пропускаются, остальные сохраняются.
+       atomic=True: при любой ошибке не сохраняется ничего.
+    4. Сделки дописываются в журнал одной операцией в конце.
+
+    Результат: список dict (line, user, side, currency, amount, rate, status, message).
+    """
+    base_cur = _validate_currency(base)
+    rates = _resolve_rates(orders, base_cur)
 
-    save_portfolio(portfolio)
+    # только пользователи из заявок, через индекс username -> user_id
+    user_ids = {}
+    for username in {str(o.get("user", "")) for o in orders}:
+        user = _find_user(username)
+        if user is not None:
+            user_ids[username] = int(user["user_id"])
 
-    return (
-        f"Продажа выполнена: {amount:.4f} {cur} по курсу {rate:.2f} {base_cur}/{cur}\n"
-        f"Изменения в портфеле:\n"
-        f"- {cur}: было {before:.4f} -> стало {after:.4f}\n"
-        f"Оценочная выручка: {revenue:,.2f} {base_cur}"
-    )
\ No newline at end of file
+    with ledger.lock():
+        involved = {user_ids[str(o.get("user", ""))] for o in orders if str(o.get("user", "")) in user_ids}
+        portfolios, tail_length = _load_portfolios(involved)
+
+        results, events = _apply_orders(orders, base_cur, rates, user_ids, portfolios)
+        failed = sum(1 for r in results if r["status"] != "OK")
+
+        if atomic and failed:
+            for r in results:
+                if r["status"] == "OK":
+                    r["status"] = "ROLLED_BACK"
+        elif events:
+            _record_trades(events, tail_length)
+
+    if _log is not None:
+        _log["orders"] = len(results)
+        _log["failed"] = failed
+        _log["base"] = base_cur
+
+    return results
+
+
+def _resolve_rates(orders: list[dict], base_cur: str):
+    """Курс каждой валюты из заявок к base_cur; вместо недоступного курса — его ошибка."""
+    rates = {}
+    for order in orders:
+        try:
+            cur = _validate_currency(str(order.get("currency", "")))
+        except CurrencyNotFoundError:
+            # ошибку валюты покажет _apply_orders в результате заявки
+            continue
+        if cur not in rates:
+            try:
+                rates[cur] = resolve_rate(cur, base_cur)[0]
+            except ApiRequestError as e:
+                rates[cur] = e
+    return rates
+
+
+def _apply_orders(orders: list[dict], base_cur: str, rates: dict, user_ids: dict[str, int], portfolios: dict):
+    """
+    Применяет заявки к портфелям в памяти (rates — из _resolve_rates).
+    Возвращает (результаты, события для журнала).
+    """
+    events = []
+    results = []
+
+    for order in orders:
+        res = {
+            "line": order.get("line"),
+            "user": str(order.get("user", "")),
+            "side": str(order.get("side", "")).strip().lower(),
+            "currency": str(order.get("currency", "")).strip().upper(),
+            "amount": order.get("amount"),
+            "rate": None,
+            "status": "ERROR",
+            "message": "",
+        }
+        results.append(res)
+
+        try:
+            if res["user"] not in user_ids:
+                raise ValueError(f"Пользователь '{res['user']}' не найден")
+            if res["side"] not in ("buy", "sell"):
+                raise ValueError(f"Неизвестное направление '{res['side']}' (ожидается buy или sell)")
+
+            cur = _validate_currency(res["currency"])
+            try:
+                amount = _validate_amount(float(res["amount"]))
+            except (TypeError, ValueError):
+                raise ValueError("'amount' должен быть положительным числом")
+
+            # курс проверяем до изменения портфеля: ошибочная заявка ничего не трогает
+            rate = rates[cur]
+            if isinstance(rate, Exception):
+                raise rate
+
+            user_id = user_ids[res["user"]]
+            if res["side"] == "buy":
+                before, after = _apply_buy(portfolios[user_id], cur, amount)
+            else:
+                before, after = _apply_sell(portfolios[user_id], cur, amount)
+
+            events.append(_trade_event(user_id, res["side"], cur, amount, rate, base_cur))
+            res.update(
+                amount=amount,
+                rate=rate,
+                status="OK",
+                message=f"{cur}: было {before:.4f} -> стало {after:.4f}",
+            )
+        except (ValueError, InsufficientFundsError, WalletNotFoundError, CurrencyNotFoundError, ApiRequestError) as e:
+            res["message"] = str(e)
+
+    return results, events
@@ -1,4 +1,5 @@
 import json
+from datetime import datetime, timezone
 from pathlib import Path
 
 
@@ -25,4 +26,20 @@ def read_json(filename, default):
 def write_json(filename, data):
     path = data_dir() / filename
     with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def normalize_timestamp(value=None):
+    """datetime или ISO-строка -> 'YYYY-MM-DDTHH:MM:SSZ' (UTC); без аргумента — текущее время."""
+    if value is None:
+        value = datetime.now(timezone.utc)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (
+        value.astimezone(timezone.utc)
+        .replace(microsecond=0)
+        .isoformat()
+        .replace("+00:00", "Z")
+    )
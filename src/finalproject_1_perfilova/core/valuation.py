@@ -0,0 +1,151 @@
+from array import array
+from bisect import bisect_right
+from collections.abc import Mapping
+from operator import mul
+
+from finalproject_1_perfilova.core import money
+from finalproject_1_perfilova.core.exceptions import ApiRequestError
+
+
+class PortfolioTable:
+    """
+    Все портфели в колоночном виде (параллельные массивы).
+
+    1. user_ids[i] — id i-го пользователя, его кошельки лежат в строках
+       offsets[i]..offsets[i + 1].
+    2. currency_index[j] — индекс валюты j-й строки в currencies.
+    3. balances[j] — баланс j-й строки.
+
+    Балансы проверяются один раз в from_records; дальше с массивами
+    работают напрямую, без объектов Wallet.
+    """
+
+    __slots__ = ("user_ids", "offsets", "currency_index", "balances", "currencies", "_rows")
+
+    def __init__(self, user_ids: array, offsets: array, currency_index: array, balances: array, currencies: list[str]):
+        self.user_ids = user_ids
+        self.offsets = offsets
+        self.currency_index = currency_index
+        self.balances = balances
+        self.currencies = currencies
+        self._rows = None
+
+    @classmethod
+    def from_records(cls, records: list[dict]):
+        """
+        Строит таблицу из записей portfolios (формат Portfolio.to_dict).
+        Балансы округляются до масштаба валюты так же, как в Portfolio.from_dict,
+        поэтому valuate-all и show-portfolio дают одинаковые суммы.
+        """
+        user_ids = array("q")
+        offsets = array("q", [0])
+        currency_index = array("l")
+        balances = array("d")
+        currencies: list[str] = []
+        decimals: list[int] = []
+        positions: dict[str, int] = {}
+
+        for p in records:
+            user_ids.append(int(p["user_id"]))
+            for code, w in p.get("wallets", {}).items():
+                code = code.upper()
+                idx = positions.get(code)
+                if idx is None:
+                    idx = positions[code] = len(currencies)
+                    currencies.append(code)
+                    decimals.append(money.decimals_for(code))
+                currency_index.append(idx)
+                balances.append(money.balance_float(w.get("balance", 0), decimals[idx]))
+            offsets.append(len(balances))
+
+        # проверка на входе — одна на всю таблицу, а не на каждое изменение
+        if balances and not min(balances) >= 0:
+            bad = next(j for j, b in enumerate(balances) if not b >= 0)
+            user = user_ids[bisect_right(offsets, bad) - 1]
+            raise ValueError(f"Некорректный баланс {balances[bad]} в портфеле user_id={user}")
+
+        return cls(user_ids, offsets, currency_index, balances, currencies)
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def row_of(self, user_id: int):
+        """Номер строки пользователя (индекс строится при первом вызове)."""
+        if self._rows is None:
+            self._rows = {uid: i for i, uid in enumerate(self.user_ids)}
+        row = self._rows.get(int(user_id))
+        if row is None:
+            raise KeyError(f"Портфель user_id={user_id} не найден")
+        return row
+
+    def wallets(self, row: int):
+        """Кошельки строки как mapping валюта -> баланс, без копирования массивов."""
+        return WalletsView(self, self.offsets[row], self.offsets[row + 1])
+
+
+class WalletsView(Mapping):
+    """
+    Только-чтение окно на кошельки одного портфеля в PortfolioTable:
+    memoryview на срезы массивов, значения читаются из таблицы напрямую.
+    Пока окно живо, массивы таблицы нельзя расширять (BufferError).
+    """
+
+    __slots__ = ("_currencies", "_codes", "_balances")
+
+    def __init__(self, table: PortfolioTable, start: int, end: int):
+        self._currencies = table.currencies
+        self._codes = memoryview(table.currency_index)[start:end]
+        self._balances = memoryview(table.balances)[start:end]
+
+    def __getitem__(self, code: str):
+        code = code.upper()
+        for j, idx in enumerate(self._codes):
+            if self._currencies[idx] == code:
+                return self._balances[j]
+        raise KeyError(code)
+
+    def __iter__(self):
+        return (self._currencies[idx] for idx in self._codes)
+
+    def __len__(self):
+        return len(self._codes)
+
+
+def rate_vector(currencies: list[str], resolve, base: str):
+    """
+    Курс каждой валюты из списка к base.
+    resolve(frm, to) -> (rate, updated_at): RateMatrix.get или usecases.resolve_rate
+    (с политикой для устаревших курсов).
+    Если каких-то курсов нет — одна ошибка со списком всех недостающих пар.
+    """
+    rates = array("d")
+    missing = []
+    for code in currencies:
+        if code == base:
+            rates.append(1.0)
+            continue
+        try:
+            rate, _updated_at = resolve(code, base)
+        except ApiRequestError:
+            missing.append(f"{code}-{base}")
+            rates.append(0.0)
+            continue
+        rates.append(rate)
+
+    if missing:
+        raise ApiRequestError(f"нет актуального курса для {', '.join(missing)}")
+    return rates
+
+
+def valuate_columns(columns: PortfolioTable, resolve, base: str):
+    """
+    Стоимость каждого портфеля в base (resolve — как в rate_vector).
+    Возвращает array('d') той же длины, что columns.user_ids.
+    """
+    rates = rate_vector(columns.currencies, resolve, base)
+
+    # один проход по колонкам: balance * rate[currency] без объектов Wallet
+    values = array("d", map(mul, columns.balances, map(rates.__getitem__, columns.currency_index)))
+
+    offsets = columns.offsets
+    return array("d", (sum(values[offsets[i]:offsets[i + 1]]) for i in range(len(columns))))
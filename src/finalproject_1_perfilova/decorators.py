@@ -1,37 +1,44 @@
 import logging
 from functools import wraps
 
+from finalproject_1_perfilova import logging_config
+
+
+_logger = logging.getLogger("valutatrade.actions")
+
+
+def log_event(action_name: str, fields: dict, error: Exception | None = None):
+    """
+    Запись о действии: поля уходят в очередь логов как есть (сообщение — имя действия),
+    JSON или текст из них собирает фоновый писатель (см. logging_config).
+    """
+    if not _logger.isEnabledFor(logging.INFO):
+        return
+    fields = {"action": action_name, **fields, "result": "OK" if error is None else "ERROR"}
+    if error is not None:
+        fields["error"] = str(error)
+    if not logging_config.enqueue_action(_logger.name, fields):
+        _logger.info(action_name, extra={"fields": fields})
+
 
 def log_action(action_name: str):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            log_ctx = {
-                "username": "-",
-                "currency": "-",
-                "amount": "-",
-                "rate": "-",
-                "base": "-",
-            }
+            # INFO выключен — usecase не собирает поля для лога (_log=None)
+            if not _logger.isEnabledFor(logging.INFO):
+                return func(*args, _log=None, **kwargs)
 
+            log_ctx = {}
             try:
                 result = func(*args, _log=log_ctx, **kwargs)
-
-                logging.info(
-                    f"{action_name} user='{log_ctx['username']}' "
-                    f"currency='{log_ctx['currency']}' amount={log_ctx['amount']} "
-                    f"rate={log_ctx['rate']} base='{log_ctx['base']}' result=OK"
-                )
-                return result
-
             except Exception as e:
-                logging.info(
-                    f"{action_name} user='{log_ctx['username']}' "
-                    f"currency='{log_ctx['currency']}' amount={log_ctx['amount']} "
-                    f"rate={log_ctx['rate']} base='{log_ctx['base']}' result=ERROR error='{e}'"
-                )
+                log_event(action_name, log_ctx, error=e)
                 raise
 
+            log_event(action_name, log_ctx)
+            return result
+
         return wrapper
 
-    return decorator
\ No newline at end of file
+    return decorator
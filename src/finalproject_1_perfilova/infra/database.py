@@ -1,31 +1,343 @@
 import json
+import os
+import stat
+import tempfile
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
+from finalproject_1_perfilova.infra import metrics
 from finalproject_1_perfilova.infra.settings import SettingsLoader
 
+# umask процесса (os.umask только меняет его, поэтому читаем один раз при импорте)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+try:
+    import fcntl
+except ImportError:  # Windows: остаётся только блокировка внутри процесса
+    fcntl = None
+
 
 class DatabaseManager:
+    """
+    Доступ к json-файлам в DATA_DIR.
+
+    Прочитанные документы кешируются в памяти по пути файла.
+    Запись кеша считается актуальной, пока совпадают mtime/size файла
+    и счётчик поколений (generation), который увеличивает write.
+    Возвращаемые документы общие для всех читателей — их нельзя менять на месте.
+
+    Запись атомарна: временный файл + fsync + rename, поэтому упавший
+    процесс не оставляет обрезанный json. Для read-modify-write есть
+    lock(filename) (fcntl-блокировка на время блока); версии записей
+    проверяет уровень выше (infra.record_store).
+    """
+
     _instance = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._instance._settings = SettingsLoader()
+            cls._instance._cache = {}
+            cls._instance._generations = {}
+            cls._instance._hits = 0
+            cls._instance._misses = 0
+            cls._instance._locks = {}
+            cls._instance._locks_guard = threading.Lock()
         return cls._instance
 
     def _data_dir(self):
         data_dir = self._settings.get("DATA_DIR", "data")
         return Path.cwd() / data_dir
 
+    def path_for(self, filename: str):
+        return self._data_dir() / filename
+
+    @staticmethod
+    def _stamp(path: Path):
+        # inode меняется при каждом rename, поэтому stamp = версия файла
+        st = path.stat()
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def version(self, filename: str):
+        """Текущая версия файла (None, если файла нет)."""
+        try:
+            return self._stamp(self.path_for(filename))
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def lock(self, filename: str):
+        """
+        Эксклюзивная блокировка файла на время блока (между процессами — fcntl).
+        Повторный вход из того же потока не блокируется.
+        """
+        path = self.path_for(filename)
+        entry = self._lock_entry(path)
+        with entry["rlock"]:
+            if entry["depth"] == 0 and fcntl is not None:
+                fd = self._open_lock_file(path)
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                entry["fd"] = fd
+            with self._held(entry):
+                yield
+
+    @contextmanager
+    def try_lock(self, filename: str):
+        """
+        Как lock, но без ожидания: блок получает False, если блокировку
+        держит другой поток или процесс.
+        """
+        path = self.path_for(filename)
+        entry = self._lock_entry(path)
+        if not entry["rlock"].acquire(blocking=False):
+            yield False
+            return
+        try:
+            if entry["depth"] == 0 and fcntl is not None:
+                fd = self._open_lock_file(path)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    yield False
+                    return
+                entry["fd"] = fd
+            with self._held(entry):
+                yield True
+        finally:
+            entry["rlock"].release()
+
+    def _lock_entry(self, path: Path):
+        with self._locks_guard:
+            entry = self._locks.get(path)
+            if entry is None:
+                entry = self._locks[path] = {"rlock": threading.RLock(), "depth": 0, "fd": None}
+        return entry
+
+    @staticmethod
+    def _open_lock_file(path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+
+    @staticmethod
+    @contextmanager
+    def _held(entry: dict):
+        """Счётчик повторного входа; последний выход снимает fcntl-блокировку."""
+        entry["depth"] += 1
+        try:
+            yield
+        finally:
+            entry["depth"] -= 1
+            if entry["depth"] == 0 and entry["fd"] is not None:
+                fcntl.flock(entry["fd"], fcntl.LOCK_UN)
+                os.close(entry["fd"])
+                entry["fd"] = None
+
+    @staticmethod
+    def _atomic_replace(path: Path, write_body, binary: bool = False):
+        """
+        Пишет во временный файл рядом с path, делает fsync и rename.
+        Права файла сохраняются (у нового — как у open(): 0o666 без umask),
+        а не остаются 0o600 от mkstemp: данные читают несколько процессов.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            mode = stat.S_IMODE(path.stat().st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+        try:
+            os.fchmod(fd, mode)
+            with (os.fdopen(fd, "wb") if binary else os.fdopen(fd, "w", encoding="utf-8")) as f:
+                write_body(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    @metrics.timed("db_read", labels_from=lambda self, filename, *a, **kw: {"file": filename})
     def read(self, filename: str, default):
-        path = self._data_dir() / filename
-        if not path.exists():
+        path = self.path_for(filename)
+        try:
+            stamp = self._stamp(path)
+        except FileNotFoundError:
+            self._cache.pop(path, None)
             return default
+
+        generation = self._generations.get(path, 0)
+        cached = self._cache.get(path)
+        if cached is not None and cached[0] == stamp and cached[1] == generation:
+            self._hits += 1
+            metrics.inc("db_cache_total", file=filename, result="hit")
+            return cached[2]
+
+        self._misses += 1
+        metrics.inc("db_cache_total", file=filename, result="miss")
         with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+            data = json.load(f)
+        self._cache[path] = (stamp, generation, data)
+        return data
 
+    @metrics.timed("db_write", labels_from=lambda self, filename, *a, **kw: {"file": filename})
     def write(self, filename: str, data):
-        path = self._data_dir() / filename
-        path.parent.mkdir(exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+        """Атомарно записывает документ."""
+        path = self.path_for(filename)
+        with self.lock(filename):
+            self._atomic_replace(path, lambda f: json.dump(data, f, ensure_ascii=False, indent=2))
+
+            generation = self._generations.get(path, 0) + 1
+            self._generations[path] = generation
+            self._cache[path] = (self._stamp(path), generation, data)
+
+    def append_lines(self, filename: str, lines: list[str], durable: bool = False):
+        """
+        Дописывает строки в конец текстового файла (jsonl), не читая его.
+        Возвращает байтовые смещения записанных строк.
+        durable=True — fsync перед возвратом (журнал, который нельзя потерять).
+        """
+        path = self.path_for(filename)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        offsets = []
+        with open(path, "ab") as f:
+            offset = f.tell()
+            for line in lines:
+                raw = (line + "\n").encode("utf-8")
+                f.write(raw)
+                offsets.append(offset)
+                offset += len(raw)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        return offsets
+
+    def read_lines_from(self, filename: str, start: int = 0):
+        """
+        Строки, начиная с байтового смещения start: тройки (смещение, конец, строка).
+        Последняя строка без перевода строки (недописанная при сбое) не отдаётся.
+        """
+        path = self.path_for(filename)
+        if not path.exists():
+            return
+        with open(path, "rb") as f:
+            f.seek(start)
+            offset = start
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    return
+                end = offset + len(raw)
+                line = raw.decode("utf-8").strip()
+                if line:
+                    yield offset, end, line
+                offset = end
+
+    def count_lines_from(self, filename: str, start: int = 0):
+        """Число полных строк после смещения start — без разбора самих строк."""
+        path = self.path_for(filename)
+        if not path.exists():
+            return 0
+        count = 0
+        with open(path, "rb") as f:
+            f.seek(start)
+            while block := f.read(1 << 16):
+                count += block.count(b"\n")
+        return count
+
+    def size(self, filename: str):
+        """Размер файла в байтах (0, если файла нет)."""
+        try:
+            return self.path_for(filename).stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def truncate_torn_tail(self, filename: str):
+        """
+        Отрезает недописанную последнюю строку (сбой посреди append_lines),
+        чтобы следующая запись не склеилась с ней. Возвращает новый размер.
+        """
+        path = self.path_for(filename)
+        size = self.size(filename)
+        if size == 0:
+            return 0
+        with open(path, "r+b") as f:
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return size
+            # ищем последний перевод строки блоками с конца
+            pos = size
+            while pos > 0:
+                step = min(4096, pos)
+                f.seek(pos - step)
+                block = f.read(step)
+                idx = block.rfind(b"\n")
+                if idx != -1:
+                    pos = pos - step + idx + 1
+                    break
+                pos -= step
+            f.truncate(pos)
+            f.flush()
+            os.fsync(f.fileno())
+        return pos
+
+    def read_lines_with_offsets(self, filename: str):
+        """Как read_lines, но отдаёт пары (смещение, строка)."""
+        path = self.path_for(filename)
+        if not path.exists():
+            return
+        with open(path, "rb") as f:
+            offset = 0
+            for raw in f:
+                line = raw.decode("utf-8").strip()
+                if line:
+                    yield offset, line
+                offset += len(raw)
+
+    def read_lines_at(self, filename: str, offsets: list[int]):
+        """Читает строки по заранее известным смещениям (без чтения всего файла)."""
+        path = self.path_for(filename)
+        with open(path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                yield f.readline().decode("utf-8").strip()
+
+    def read_lines(self, filename: str):
+        """Построчно читает текстовый файл; пустые строки пропускаются."""
+        path = self.path_for(filename)
+        if not path.exists():
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line
+
+    def write_lines(self, filename: str, lines):
+        self._atomic_replace(self.path_for(filename), lambda f: f.writelines(line + "\n" for line in lines))
+
+    def write_bytes(self, filename: str, data: bytes):
+        """Атомарно заменяет двоичный файл (читатели с mmap видят старый или новый целиком)."""
+        self._atomic_replace(self.path_for(filename), lambda f: f.write(data), binary=True)
+
+    def remove(self, filename: str):
+        self.path_for(filename).unlink(missing_ok=True)
+        self.invalidate(filename)
+
+    def invalidate(self, filename: str | None = None):
+        """Сбрасывает кеш одного файла или весь кеш."""
+        if filename is None:
+            self._cache.clear()
+            return
+        path = self.path_for(filename)
+        self._cache.pop(path, None)
+        self._generations[path] = self._generations.get(path, 0) + 1
+
+    def cache_stats(self):
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "entries": len(self._cache),
+        }
@@ -0,0 +1,78 @@
+import json
+import logging
+
+from finalproject_1_perfilova.core.utils import normalize_timestamp
+from finalproject_1_perfilova.infra.database import DatabaseManager
+
+
+LEDGER_FILE = "ledger.jsonl"
+SNAPSHOT_FILE = "ledger_snapshot.json"
+
+
+class TradeLedger:
+    """
+    Журнал сделок (append-only jsonl) — источник истины для балансов.
+
+    1. Каждая сделка — одна строка: user_id, side, currency, amount, rate, base, timestamp.
+       Позиция события — его байтовое смещение в файле.
+    2. Портфели в хранилище — снимки: у каждого записано ledger_offset, до какого
+       места журнала он уже учтён. Текущее состояние = снимок + хвост журнала.
+    3. ledger_snapshot.json помнит, с какого смещения начинается хвост,
+       поэтому восстановление после сбоя — чтение только хвоста.
+    """
+
+    def __init__(self, filename: str = LEDGER_FILE, snapshot_file: str = SNAPSHOT_FILE):
+        self.filename = filename
+        self.snapshot_file = snapshot_file
+        self.db = DatabaseManager()
+
+    def lock(self):
+        """Блокировка журнала: чтение состояния + проверка + запись сделки — под ней."""
+        return self.db.lock(self.filename)
+
+    def head(self):
+        """Смещение конца журнала (позиция следующего события)."""
+        return self.db.size(self.filename)
+
+    def append(self, events: list[dict]):
+        """
+        Дописывает события с fsync. Возвращает пары (смещение, конец) для каждого.
+        Недописанная при сбое строка в конце журнала отрезается.
+        """
+        with self.lock():
+            self.db.truncate_torn_tail(self.filename)
+            lines = [json.dumps(e, ensure_ascii=False, separators=(",", ":")) for e in events]
+            offsets = self.db.append_lines(self.filename, lines, durable=True)
+        return [(offset, offset + len(line.encode("utf-8")) + 1) for offset, line in zip(offsets, lines)]
+
+    def read_from(self, offset: int = 0):
+        """События начиная со смещения: тройки (смещение, конец, событие)."""
+        for start, end, line in self.db.read_lines_from(self.filename, offset):
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning(f"Журнал сделок: пропущена повреждённая строка на смещении {start}")
+                continue
+            yield start, end, event
+
+    def snapshot_offset(self):
+        """Начало хвоста: всё до этого смещения уже есть в снимках портфелей."""
+        offset = int(self.db.read(self.snapshot_file, {}).get("offset", 0))
+        # журнал могли удалить или обрезать — тогда читаем его целиком
+        return offset if offset <= self.head() else 0
+
+    def tail(self):
+        return list(self.read_from(self.snapshot_offset()))
+
+    def tail_length(self):
+        """Число событий в хвосте без разбора JSON (для решения о снимке)."""
+        return self.db.count_lines_from(self.filename, self.snapshot_offset())
+
+    def mark_snapshot(self, offset: int):
+        self.db.write(
+            self.snapshot_file,
+            {
+                "offset": offset,
+                "updated_at": normalize_timestamp(),
+            },
+        )
@@ -0,0 +1,278 @@
+import atexit
+import bisect
+import json
+import threading
+import time
+from functools import wraps
+
+from finalproject_1_perfilova.infra.settings import SettingsLoader
+
+
+METRICS_FILE = "metrics.json"
+PROMETHEUS_FILE = "metrics.prom"
+PREFIX = "valutatrade_"
+
+# верхние границы корзин гистограмм, секунды (последняя корзина — +Inf)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# пока False, timed/timer/inc/observe почти ничего не стоят
+_enabled = False
+_atexit_registered = False
+
+
+class MetricsRegistry:
+    """
+    Счётчики и гистограммы времени текущего процесса.
+    Ключ серии — (имя, метки); метки — кортеж пар (ключ, значение).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: dict[tuple, float] = {}
+        # (имя, метки) -> [счётчики корзин..., сумма, количество]
+        self.histograms: dict[tuple, list] = {}
+
+    def inc(self, name: str, value: float = 1, labels: tuple = ()):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, labels: tuple = ()):
+        key = (name, labels)
+        index = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            series = self.histograms.get(key)
+            if series is None:
+                series = self.histograms[key] = [0] * (len(BUCKETS) + 3)
+            series[index] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def drain(self):
+        """Снимок в формате файла метрик; локальные значения обнуляются."""
+        with self._lock:
+            counters, self.counters = self.counters, {}
+            histograms, self.histograms = self.histograms, {}
+
+        snapshot = {"counters": {}, "histograms": {}}
+        for (name, labels), value in counters.items():
+            snapshot["counters"][series_key(name, labels)] = {"name": name, "labels": dict(labels), "value": value}
+        for (name, labels), series in histograms.items():
+            snapshot["histograms"][series_key(name, labels)] = {
+                "name": name,
+                "labels": dict(labels),
+                "buckets": series[:-2],
+                "sum": series[-2],
+                "count": series[-1],
+            }
+        return snapshot
+
+
+registry = MetricsRegistry()
+
+
+def series_key(name: str, labels) -> str:
+    items = labels.items() if isinstance(labels, dict) else labels
+    if not items:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def enabled():
+    return _enabled
+
+
+def configure(enabled: bool | None = None):
+    """
+    Включает сбор метрик (по умолчанию — по METRICS_ENABLED).
+    При включении накопленное дописывается в файл метрик при выходе из процесса.
+    """
+    global _enabled, _atexit_registered
+    if enabled is None:
+        enabled = bool(SettingsLoader().get("METRICS_ENABLED", False))
+    _enabled = bool(enabled)
+    if _enabled and not _atexit_registered:
+        atexit.register(flush)
+        _atexit_registered = True
+
+
+def inc(name: str, value: float = 1, **labels):
+    if _enabled:
+        registry.inc(name, value, _labels(labels))
+
+
+def observe(name: str, seconds: float, **labels):
+    if _enabled:
+        registry.observe(name, seconds, _labels(labels))
+
+
+class _Timer:
+    __slots__ = ("name", "labels", "started_at")
+
+    def __init__(self, name: str, labels: tuple):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        registry.observe(self.name, time.perf_counter() - self.started_at, self.labels)
+        if exc_type is not None:
+            registry.inc(f"{self.name}_errors_total", 1, self.labels)
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopTimer()
+
+
+def timer(name: str, **labels):
+    """with timer("fetch_rates", source="CoinGecko"): ... — время блока и число ошибок."""
+    if not _enabled:
+        return _NOOP
+    return _Timer(name, _labels(labels))
+
+
+def timed(name: str, labels_from=None, **labels):
+    """
+    Декоратор: гистограмма времени вызова `name` и счётчик `name`_errors_total.
+    labels_from(*args, **kwargs) -> dict — метки, зависящие от аргументов вызова.
+    """
+    static = _labels(labels)
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+
+            series = static if labels_from is None else _labels({**labels, **labels_from(*args, **kwargs)})
+            started_at = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                registry.inc(f"{name}_errors_total", 1, series)
+                raise
+            finally:
+                registry.observe(name, time.perf_counter() - started_at, series)
+
+        return wrapper
+
+    return decorator
+
+
+def load():
+    """Накопленные метрики всех процессов (из файла метрик)."""
+    # database сам импортирует metrics (timed на read/write)
+    from finalproject_1_perfilova.infra.database import DatabaseManager
+
+    for line in DatabaseManager().read_lines(METRICS_FILE):
+        return json.loads(line)
+    return {"counters": {}, "histograms": {}}
+
+
+def _merge(total: dict, part: dict):
+    for key, entry in part["counters"].items():
+        if key in total["counters"]:
+            total["counters"][key]["value"] += entry["value"]
+        else:
+            total["counters"][key] = entry
+    for key, entry in part["histograms"].items():
+        current = total["histograms"].get(key)
+        if current is None or len(current["buckets"]) != len(entry["buckets"]):
+            total["histograms"][key] = entry
+            continue
+        current["buckets"] = [a + b for a, b in zip(current["buckets"], entry["buckets"])]
+        current["sum"] += entry["sum"]
+        current["count"] += entry["count"]
+
+
+def flush():
+    """
+    Добавляет метрики процесса к накопленным в файле и обновляет
+    Prometheus-файл. Файлы пишутся через read_lines/write_lines, чтобы
+    сама запись метрик не попадала в db_read/db_write.
+    """
+    from finalproject_1_perfilova.infra.database import DatabaseManager
+
+    part = registry.drain()
+    if not part["counters"] and not part["histograms"]:
+        return
+
+    db = DatabaseManager()
+    with db.lock(METRICS_FILE):
+        total = load()
+        _merge(total, part)
+        total["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        db.write_lines(METRICS_FILE, [json.dumps(total, ensure_ascii=False)])
+        db.write_lines(PROMETHEUS_FILE, to_prometheus(total).splitlines())
+
+
+def reset():
+    from finalproject_1_perfilova.infra.database import DatabaseManager
+
+    db = DatabaseManager()
+    with db.lock(METRICS_FILE):
+        db.remove(METRICS_FILE)
+        db.remove(PROMETHEUS_FILE)
+    registry.drain()
+
+
+def to_prometheus(snapshot: dict) -> str:
+    """Текстовый формат Prometheus (для node_exporter textfile collector)."""
+    lines = []
+    seen = set()
+
+    for key in sorted(snapshot["counters"]):
+        entry = snapshot["counters"][key]
+        name = PREFIX + entry["name"]
+        if name not in seen:
+            lines.append(f"# TYPE {name} counter")
+            seen.add(name)
+        lines.append(f"{series_key(name, entry['labels'])} {entry['value']}")
+
+    for key in sorted(snapshot["histograms"]):
+        entry = snapshot["histograms"][key]
+        name = f"{PREFIX}{entry['name']}_seconds"
+        if name not in seen:
+            lines.append(f"# TYPE {name} histogram")
+            seen.add(name)
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), entry["buckets"]):
+            cumulative += count
+            lines.append(f"{series_key(name + '_bucket', {**entry['labels'], 'le': bound})} {cumulative}")
+        lines.append(f"{series_key(name + '_sum', entry['labels'])} {entry['sum']:.6f}")
+        lines.append(f"{series_key(name + '_count', entry['labels'])} {entry['count']}")
+
+    return "\n".join(lines) + "\n"
+
+
+def quantile(entry: dict, q: float):
+    """Оценка квантиля по корзинам гистограммы (линейно внутри корзины), секунды."""
+    count = entry["count"]
+    if not count:
+        return 0.0
+    rank = q * count
+    cumulative = 0
+    lower = 0.0
+    for bound, n in zip(BUCKETS + (BUCKETS[-1],), entry["buckets"]):
+        if n and cumulative + n >= rank:
+            return lower + (bound - lower) * (rank - cumulative) / n
+        cumulative += n
+        lower = bound
+    return BUCKETS[-1]
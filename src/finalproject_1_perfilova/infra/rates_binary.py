@@ -0,0 +1,166 @@
+import logging
+import math
+import mmap
+import struct
+import threading
+
+from finalproject_1_perfilova.core.rate_matrix import parse_timestamp
+from finalproject_1_perfilova.infra.database import DatabaseManager
+
+
+MAGIC = b"VTRB"
+FORMAT_VERSION = 1
+
+# magic, версия формата, число пар, число источников, generation, last_refresh (epoch, NaN — нет)
+HEADER = struct.Struct("<4sHIHQd")
+# имя пары ("BTC_USD"), дополненное нулями (длиннее — pack_snapshot отказывается писать)
+PAIR_NAME = struct.Struct("<16s")
+# имя источника, дополненное нулями (длиннее — обрезается)
+SOURCE_NAME = struct.Struct("<32s")
+# индекс пары, rate, updated_at (epoch), индекс источника
+RECORD = struct.Struct("<IddH6x")
+
+
+def _name(raw: bytes):
+    return raw.rstrip(b"\0").decode("utf-8", errors="replace")
+
+
+def pack_snapshot(pairs: dict, last_refresh=None, generation: int | None = None):
+    """
+    Snapshot курсов в бинарном виде:
+    заголовок, таблица имён пар, таблица источников, записи фиксированной длины.
+    Запись i относится к паре i из таблицы имён.
+    ValueError, если имя пары не помещается в PAIR_NAME: обрезанное имя
+    читалось бы как другая пара.
+    """
+    names = []
+    records = []
+    sources: dict[str, int] = {}
+    for pair, info in pairs.items():
+        if not isinstance(info, dict) or "_" not in pair:
+            continue
+        if len(pair.encode("utf-8")) > PAIR_NAME.size:
+            raise ValueError(f"Имя пары '{pair}' длиннее {PAIR_NAME.size} байт")
+        source = str(info.get("source", "-"))
+        source_id = sources.setdefault(source, len(sources))
+        records.append((len(names), float(info["rate"]), parse_timestamp(info["updated_at"]), source_id))
+        names.append(pair)
+
+    refreshed = parse_timestamp(last_refresh) if last_refresh else float("nan")
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, len(names), len(sources), generation or 0, refreshed)]
+    parts.extend(PAIR_NAME.pack(name.encode("utf-8")) for name in names)
+    parts.extend(SOURCE_NAME.pack(source.encode("utf-8")[: SOURCE_NAME.size]) for source in sources)
+    parts.extend(RECORD.pack(*record) for record in records)
+    return b"".join(parts)
+
+
+class RatesBinarySnapshot:
+    """
+    Snapshot курсов, отображённый в память (mmap).
+
+    Файл не разбирается целиком: значения читаются struct.unpack_from
+    прямо из отображения по смещению записи. Разбирается только таблица
+    имён пар (один раз — для поиска по имени).
+
+    Файл заменяется атомарно (rename), поэтому отображение всегда видит
+    целый snapshot: старый файл живёт, пока открыт.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        if len(self._view) < HEADER.size:
+            raise ValueError(f"{path}: файл короче заголовка")
+        magic, version, count, sources, generation, refreshed = HEADER.unpack_from(self._view, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path}: неизвестный формат snapshot ({magic!r}, версия {version})")
+
+        self.count = count
+        self.generation = generation
+        self.last_refresh = None if math.isnan(refreshed) else refreshed
+
+        self._names_at = HEADER.size
+        self._sources_at = self._names_at + count * PAIR_NAME.size
+        self._records_at = self._sources_at + sources * SOURCE_NAME.size
+        if len(self._view) < self._records_at + count * RECORD.size:
+            raise ValueError(f"{path}: файл обрезан")
+
+        self._sources = [
+            _name(SOURCE_NAME.unpack_from(self._view, self._sources_at + i * SOURCE_NAME.size)[0])
+            for i in range(sources)
+        ]
+        self._index = None
+
+    def _pair_index(self):
+        if self._index is None:
+            self._index = {
+                _name(PAIR_NAME.unpack_from(self._view, self._names_at + i * PAIR_NAME.size)[0]): i
+                for i in range(self.count)
+            }
+        return self._index
+
+    def names(self):
+        return list(self._pair_index())
+
+    def record(self, i: int):
+        """(rate, updated_at epoch, source) записи i."""
+        _pair, rate, updated, source_id = RECORD.unpack_from(self._view, self._records_at + i * RECORD.size)
+        return rate, updated, self._sources[source_id]
+
+    def get(self, pair: str):
+        """(rate, updated_at epoch, source) пары или None."""
+        i = self._pair_index().get(pair)
+        return None if i is None else self.record(i)
+
+    def items(self):
+        for pair, i in self._pair_index().items():
+            yield pair, self.record(i)
+
+    def close(self):
+        """Снимает отображение; читать snapshot после этого нельзя."""
+        self._view.release()
+        self._mmap.close()
+
+
+_cache_lock = threading.Lock()
+# имя файла -> (версия файла, RatesBinarySnapshot)
+_cache: dict[str, tuple] = {}
+
+
+def write(filename: str, pairs: dict, last_refresh=None, generation: int | None = None):
+    """Атомарно заменяет бинарный snapshot (временный файл + rename)."""
+    DatabaseManager().write_bytes(filename, pack_snapshot(pairs, last_refresh, generation))
+
+
+def open_snapshot(filename: str):
+    """
+    Отображённый snapshot из DATA_DIR (None, если файла нет или он
+    повреждён — тогда курсы читаются из rates.json).
+    Пока файл не заменён, возвращается один и тот же объект; после замены
+    прежний объект закрывается (отображение старого файла снимается).
+    """
+    db = DatabaseManager()
+    version = db.version(filename)
+    if version is None:
+        return None
+
+    cached = _cache.get(filename)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with _cache_lock:
+        cached = _cache.get(filename)
+        if cached is None or cached[0] != version:
+            try:
+                snapshot = RatesBinarySnapshot(db.path_for(filename))
+            except (OSError, ValueError) as e:
+                # пустой, обрезанный или чужой файл; запоминаем, чтобы не разбирать его снова
+                logging.warning(f"Бинарный snapshot {filename} не прочитан ({e}), используется rates.json")
+                snapshot = None
+            if cached is not None and cached[1] is not None:
+                cached[1].close()
+            cached = (version, snapshot)
+            _cache[filename] = cached
+    return cached[1]
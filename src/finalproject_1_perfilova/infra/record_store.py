@@ -0,0 +1,419 @@
+import json
+import threading
+from abc import ABC, abstractmethod
+
+from finalproject_1_perfilova.core.exceptions import StorageConflictError
+from finalproject_1_perfilova.infra.database import DatabaseManager
+from finalproject_1_perfilova.infra.settings import SettingsLoader
+
+
+USERS = "users"
+PORTFOLIOS = "portfolios"
+
+# коллекция -> json-файл (для json-бэкенда и миграции)
+COLLECTION_FILES = {
+    USERS: "users.json",
+    PORTFOLIOS: "portfolios.json",
+}
+
+# вторичные индексы: коллекция -> поля, по которым ищем запись
+INDEXED_FIELDS = {
+    USERS: ("username",),
+}
+
+
+class RecordStore(ABC):
+    """
+    Хранилище записей, адресуемых по ключу (user_id).
+
+    Usecases читают и обновляют по одной записи,
+    не зная, как именно данные лежат на диске.
+
+    У каждой записи есть поле version, которое увеличивает запись.
+    put/put_many с expected_versions работают как optimistic lock:
+    если запись успели изменить после чтения — StorageConflictError.
+    """
+
+    @abstractmethod
+    def get(self, collection: str, key: int):
+        """Возвращает запись (dict) или None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def all(self, collection: str) -> list[dict]:
+        """Возвращает все записи коллекции."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _write_many(self, collection: str, records: dict[int, dict]):
+        """Записывает готовые записи (под блокировкой коллекции)."""
+        raise NotImplementedError
+
+    def find_key(self, collection: str, field: str, value):
+        """Ключ записи с record[field] == value или None."""
+        for r in self.all(collection):
+            if r.get(field) == value:
+                return int(r["user_id"])
+        return None
+
+    def next_key(self, collection: str):
+        """Следующий свободный ключ (max + 1)."""
+        return max((int(r["user_id"]) for r in self.all(collection)), default=0) + 1
+
+    def rebuild_indexes(self):
+        """Пересобирает вторичные индексы из самих записей."""
+        pass
+
+    def _get_many(self, collection: str, keys):
+        """Ключ -> текущая запись (только для существующих записей)."""
+        found = {}
+        for key in keys:
+            record = self.get(collection, key)
+            if record is not None:
+                found[int(key)] = record
+        return found
+
+    def lock(self, collection: str):
+        """Блокировка коллекции на время read-modify-write (между процессами)."""
+        return DatabaseManager().lock(COLLECTION_FILES[collection])
+
+    def put(self, collection: str, key: int, record: dict, expected_version: int | None = None):
+        """Вставляет или заменяет запись."""
+        expected = None if expected_version is None else {key: expected_version}
+        self.put_many(collection, {key: record}, expected_versions=expected)
+
+    def put_many(self, collection: str, records: dict[int, dict], expected_versions: dict[int, int] | None = None):
+        """
+        Вставляет или заменяет несколько записей (ключ -> запись) одной операцией.
+        expected_versions: ключ -> версия, прочитанная вызывающим (0 — записи не было).
+        """
+        with self.lock(collection):
+            existing = self._get_many(collection, records.keys())
+            prepared = {}
+            for key, record in records.items():
+                current = existing.get(int(key))
+                current_version = int(current.get("version", 0)) if current else 0
+
+                if expected_versions and key in expected_versions and expected_versions[key] != current_version:
+                    raise StorageConflictError(
+                        f"Запись {collection}/{key} изменена другим процессом, повторите операцию"
+                    )
+                prepared[int(key)] = {**record, "version": current_version + 1}
+
+            self._write_many(collection, prepared)
+
+
+class JsonRecordStore(RecordStore):
+    """
+    Старый формат: одна коллекция = один json-файл со списком записей.
+    Любая запись переписывает весь файл.
+
+    Для индексируемых коллекций рядом лежит {collection}_index.json:
+    значение поля -> ключ и следующий свободный ключ. Индекс помнит версию
+    файла коллекции, по которой построен, и пересобирается, если она не совпала.
+
+    Индекс убирает перебор записей, но не чтение файла: get читает весь
+    json-файл коллекции (в процессе — один раз, дальше из кеша
+    DatabaseManager), поэтому первый get в новом процессе — O(N).
+    Чтение одной записи с диска даёт только sqlite-бэкенд.
+    """
+
+    def __init__(self, key_field: str = "user_id"):
+        self.key_field = key_field
+        self.db = DatabaseManager()
+        # коллекция -> (список записей из кеша DatabaseManager, {key: позиция})
+        self._positions = {}
+
+    @staticmethod
+    def _index_file(collection: str):
+        return f"{collection}_index.json"
+
+    def _position_map(self, collection: str):
+        records = self.all(collection)
+        cached = self._positions.get(collection)
+        if cached is not None and cached[0] is records:
+            return cached[1]
+        positions = {int(r[self.key_field]): i for i, r in enumerate(records)}
+        self._positions[collection] = (records, positions)
+        return positions
+
+    def get(self, collection: str, key: int):
+        pos = self._position_map(collection).get(int(key))
+        if pos is None:
+            return None
+        return self.all(collection)[pos]
+
+    def _build_index(self, collection: str):
+        records = self.all(collection)
+        return {
+            "source_version": list(self.db.version(COLLECTION_FILES[collection]) or []),
+            "next_key": max((int(r[self.key_field]) for r in records), default=0) + 1,
+            "fields": {
+                field: {str(r[field]): int(r[self.key_field]) for r in records if field in r}
+                for field in INDEXED_FIELDS[collection]
+            },
+        }
+
+    def _index(self, collection: str):
+        index = self.db.read(self._index_file(collection), None)
+        version = list(self.db.version(COLLECTION_FILES[collection]) or [])
+        if (
+            isinstance(index, dict)
+            and index.get("source_version") == version
+            and isinstance(index.get("fields"), dict)
+            and isinstance(index.get("next_key"), int)
+        ):
+            return index
+
+        # индекса нет, он битый или отстал от файла коллекции
+        with self.lock(collection):
+            index = self._build_index(collection)
+            self.db.write(self._index_file(collection), index)
+        return index
+
+    def find_key(self, collection: str, field: str, value):
+        if field not in INDEXED_FIELDS.get(collection, ()):
+            return super().find_key(collection, field, value)
+        key = self._index(collection)["fields"].get(field, {}).get(str(value))
+        return None if key is None else int(key)
+
+    def next_key(self, collection: str):
+        if collection not in INDEXED_FIELDS:
+            return super().next_key(collection)
+        return int(self._index(collection)["next_key"])
+
+    def rebuild_indexes(self):
+        for collection in INDEXED_FIELDS:
+            self.db.remove(self._index_file(collection))
+
+    def _get_many(self, collection: str, keys):
+        wanted = {int(k) for k in keys}
+        return {int(r[self.key_field]): r for r in self.all(collection) if int(r[self.key_field]) in wanted}
+
+    def _write_many(self, collection: str, records: dict[int, dict]):
+        index = None
+        if collection in INDEXED_FIELDS:
+            # документ индекса из кеша DatabaseManager общий — меняем копию
+            index = self._index(collection)
+            index = {**index, "fields": {f: dict(m) for f, m in index["fields"].items()}}
+
+        pending = dict(records)
+        result = []
+        for r in self.all(collection):
+            key = int(r[self.key_field])
+            new = pending.pop(key, None)
+            if new is not None and index is not None:
+                # значение индексируемого поля могло поменяться
+                for field in INDEXED_FIELDS[collection]:
+                    index["fields"][field].pop(str(r.get(field)), None)
+            result.append(r if new is None else new)
+        result.extend(pending.values())
+        self.db.write(COLLECTION_FILES[collection], result)
+
+        if index is not None:
+            for key, r in records.items():
+                for field in INDEXED_FIELDS[collection]:
+                    if field in r:
+                        index["fields"][field][str(r[field])] = int(key)
+                index["next_key"] = max(index["next_key"], int(key) + 1)
+            index["source_version"] = list(self.db.version(COLLECTION_FILES[collection]))
+            self.db.write(self._index_file(collection), index)
+
+    def all(self, collection: str) -> list[dict]:
+        records = self.db.read(COLLECTION_FILES[collection], [])
+        if not isinstance(records, list):
+            return []
+        return records
+
+
+class SqliteRecordStore(RecordStore):
+    """
+    Записи лежат в одной таблице SQLite: (collection, key) -> json.
+    Чтение и запись затрагивают только одну строку;
+    атомарность и crash-safety обеспечивает сам SQLite.
+    Вторичные индексы — таблица record_index (collection, field, value) -> key,
+    она обновляется в той же транзакции, что и записи.
+
+    Хранилище общее на процесс, а соединение sqlite3 нельзя использовать
+    из другого потока — поэтому у каждого потока своё соединение
+    (потоки serve, фонового обновления курсов, пула запросов к API).
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # импорт здесь: json-хранилищу и коротким командам CLI sqlite3 не нужен
+            import sqlite3
+
+            path = DatabaseManager().path_for(self.filename)
+            path.parent.mkdir(exist_ok=True)
+            # timeout: ждём, пока другой процесс (или поток) допишет свою транзакцию
+            conn = self._local.conn = sqlite3.connect(path, timeout=30)
+            with self._schema_lock:
+                if not self._schema_ready:
+                    self._create_schema(conn)
+                    self._schema_ready = True
+        return conn
+
+    def _create_schema(self, conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            "collection TEXT NOT NULL, "
+            "key INTEGER NOT NULL, "
+            "data TEXT NOT NULL, "
+            "PRIMARY KEY (collection, key))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS record_index ("
+            "collection TEXT NOT NULL, "
+            "field TEXT NOT NULL, "
+            "value TEXT NOT NULL, "
+            "key INTEGER NOT NULL, "
+            "PRIMARY KEY (collection, field, value))"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS record_index_by_key ON record_index (collection, key)"
+        )
+        conn.commit()
+        self._check_indexes(conn)
+
+    def _check_indexes(self, conn):
+        """Индекс пересобирается, если число строк в нём не сходится с записями."""
+        for collection, fields in INDEXED_FIELDS.items():
+            records = conn.execute(
+                "SELECT COUNT(*) FROM records WHERE collection = ?", (collection,)
+            ).fetchone()[0]
+            for field in fields:
+                indexed = conn.execute(
+                    "SELECT COUNT(*) FROM record_index WHERE collection = ? AND field = ?",
+                    (collection, field),
+                ).fetchone()[0]
+                if indexed != records:
+                    self._rebuild_indexes(conn)
+                    return
+
+    @staticmethod
+    def _index_rows(collection: str, records: dict[int, dict]):
+        return [
+            (collection, field, str(r[field]), int(key))
+            for key, r in records.items()
+            for field in INDEXED_FIELDS.get(collection, ())
+            if field in r
+        ]
+
+    def rebuild_indexes(self):
+        self._rebuild_indexes(self._connect())
+
+    def _rebuild_indexes(self, conn):
+        with conn:
+            conn.execute("DELETE FROM record_index")
+            for collection in INDEXED_FIELDS:
+                rows = conn.execute(
+                    "SELECT key, data FROM records WHERE collection = ?", (collection,)
+                ).fetchall()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO record_index (collection, field, value, key) VALUES (?, ?, ?, ?)",
+                    self._index_rows(collection, {key: json.loads(data) for key, data in rows}),
+                )
+
+    def find_key(self, collection: str, field: str, value):
+        if field not in INDEXED_FIELDS.get(collection, ()):
+            return super().find_key(collection, field, value)
+        row = self._connect().execute(
+            "SELECT key FROM record_index WHERE collection = ? AND field = ? AND value = ?",
+            (collection, field, str(value)),
+        ).fetchone()
+        return None if row is None else int(row[0])
+
+    def next_key(self, collection: str):
+        row = self._connect().execute(
+            "SELECT MAX(key) FROM records WHERE collection = ?", (collection,)
+        ).fetchone()
+        return (row[0] or 0) + 1
+
+    def get(self, collection: str, key: int):
+        row = self._connect().execute(
+            "SELECT data FROM records WHERE collection = ? AND key = ?",
+            (collection, int(key)),
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def lock(self, collection: str):
+        return DatabaseManager().lock(f"{self.filename}.{collection}")
+
+    def _write_many(self, collection: str, records: dict[int, dict]):
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO records (collection, key, data) VALUES (?, ?, ?)",
+                [
+                    (collection, int(key), json.dumps(record, ensure_ascii=False))
+                    for key, record in records.items()
+                ],
+            )
+            if collection in INDEXED_FIELDS:
+                conn.executemany(
+                    "DELETE FROM record_index WHERE collection = ? AND key = ?",
+                    [(collection, int(key)) for key in records],
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO record_index (collection, field, value, key) VALUES (?, ?, ?, ?)",
+                    self._index_rows(collection, records),
+                )
+
+    def all(self, collection: str) -> list[dict]:
+        rows = self._connect().execute(
+            "SELECT data FROM records WHERE collection = ? ORDER BY key",
+            (collection,),
+        ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+
+_stores: dict[str, RecordStore] = {}
+
+
+def create_record_store(backend: str):
+    backend = (backend or "json").strip().lower()
+    if backend == "json":
+        return JsonRecordStore()
+    if backend == "sqlite":
+        return SqliteRecordStore(SettingsLoader().get("SQLITE_FILE", "valutatrade.db"))
+    raise ValueError(f"Неизвестный STORAGE_BACKEND '{backend}' (ожидается json или sqlite)")
+
+
+def get_record_store():
+    """
+    Возвращает хранилище, выбранное в [tool.valutatrade] STORAGE_BACKEND.
+    """
+    backend = str(SettingsLoader().get("STORAGE_BACKEND", "json")).strip().lower()
+    if backend not in _stores:
+        _stores[backend] = create_record_store(backend)
+    return _stores[backend]
+
+
+def migrate_json(target: RecordStore):
+    """
+    Импортирует users.json и portfolios.json в указанное хранилище.
+    Возвращает словарь: коллекция -> сколько записей перенесено.
+    """
+    db = DatabaseManager()
+    imported = {}
+    for collection, filename in COLLECTION_FILES.items():
+        records = db.read(filename, [])
+        if not isinstance(records, list):
+            records = []
+
+        batch = {int(r["user_id"]): r for r in records if isinstance(r, dict) and "user_id" in r}
+        target.put_many(collection, batch)
+        imported[collection] = len(batch)
+
+    target.rebuild_indexes()
+    return imported
@@ -19,9 +19,29 @@ class SettingsLoader:
         self._settings = {
             "DATA_DIR": data_dir,
             "RATES_TTL_SECONDS": 300,
+            "RATES_CHANGE_EPSILON": 0.000001,
+            # None — половина RATES_TTL_SECONDS
+            "RATES_HEARTBEAT_SECONDS": None,
+            "RATES_BINARY_SNAPSHOT": False,
+            "RATES_STALE_GRACE_SECONDS": 60.0,
+            "RATES_REFRESH_ON_STALE": True,
             "BASE_CURRENCY": "USD",
             "LOG_DIR": logs_dir,
             "LOG_FILE": str(Path(logs_dir) / "app.log"),
+            "LOG_FORMAT": "json",
+            "LOG_LEVEL": "INFO",
+            "STORAGE_BACKEND": "json",
+            "SQLITE_FILE": "valutatrade.db",
+            "PASSWORD_HASH_SCHEME": "pbkdf2_sha256",
+            "PASSWORD_HASH_ITERATIONS": 100000,
+            "PASSWORD_SCRYPT_N": 16384,
+            "PASSWORD_SCRYPT_R": 8,
+            "PASSWORD_SCRYPT_P": 1,
+            "SERVICE_SOCKET": "valutatrade.sock",
+            "SERVICE_COMMIT_INTERVAL": 0.002,
+            "LEDGER_SNAPSHOT_EVERY": 500,
+            "METRICS_ENABLED": False,
+            "METRICS_FLUSH_SECONDS": 10.0,
         }
 
         pyproject_path = Path.cwd() / "pyproject.toml"
@@ -37,11 +57,44 @@ class SettingsLoader:
                     self._settings["DATA_DIR"] = str(valutatrade_cfg["DATA_DIR"])
                 if "RATES_TTL_SECONDS" in valutatrade_cfg:
                     self._settings["RATES_TTL_SECONDS"] = int(valutatrade_cfg["RATES_TTL_SECONDS"])
+                if "RATES_CHANGE_EPSILON" in valutatrade_cfg:
+                    self._settings["RATES_CHANGE_EPSILON"] = float(valutatrade_cfg["RATES_CHANGE_EPSILON"])
+                if "RATES_HEARTBEAT_SECONDS" in valutatrade_cfg:
+                    self._settings["RATES_HEARTBEAT_SECONDS"] = float(valutatrade_cfg["RATES_HEARTBEAT_SECONDS"])
+                if "RATES_BINARY_SNAPSHOT" in valutatrade_cfg:
+                    self._settings["RATES_BINARY_SNAPSHOT"] = bool(valutatrade_cfg["RATES_BINARY_SNAPSHOT"])
+                if "RATES_STALE_GRACE_SECONDS" in valutatrade_cfg:
+                    self._settings["RATES_STALE_GRACE_SECONDS"] = float(valutatrade_cfg["RATES_STALE_GRACE_SECONDS"])
+                if "RATES_REFRESH_ON_STALE" in valutatrade_cfg:
+                    self._settings["RATES_REFRESH_ON_STALE"] = bool(valutatrade_cfg["RATES_REFRESH_ON_STALE"])
                 if "BASE_CURRENCY" in valutatrade_cfg:
                     self._settings["BASE_CURRENCY"] = str(valutatrade_cfg["BASE_CURRENCY"]).upper()
                 if "LOG_DIR" in valutatrade_cfg:
                     self._settings["LOG_DIR"] = str(valutatrade_cfg["LOG_DIR"])
                     self._settings["LOG_FILE"] = str(Path(self._settings["LOG_DIR"]) / "app.log")
+                if "LOG_FORMAT" in valutatrade_cfg:
+                    self._settings["LOG_FORMAT"] = str(valutatrade_cfg["LOG_FORMAT"]).lower()
+                if "LOG_LEVEL" in valutatrade_cfg:
+                    self._settings["LOG_LEVEL"] = str(valutatrade_cfg["LOG_LEVEL"]).upper()
+                if "STORAGE_BACKEND" in valutatrade_cfg:
+                    self._settings["STORAGE_BACKEND"] = str(valutatrade_cfg["STORAGE_BACKEND"]).lower()
+                if "SQLITE_FILE" in valutatrade_cfg:
+                    self._settings["SQLITE_FILE"] = str(valutatrade_cfg["SQLITE_FILE"])
+                if "PASSWORD_HASH_SCHEME" in valutatrade_cfg:
+                    self._settings["PASSWORD_HASH_SCHEME"] = str(valutatrade_cfg["PASSWORD_HASH_SCHEME"]).lower()
+                if "SERVICE_SOCKET" in valutatrade_cfg:
+                    self._settings["SERVICE_SOCKET"] = str(valutatrade_cfg["SERVICE_SOCKET"])
+                if "SERVICE_COMMIT_INTERVAL" in valutatrade_cfg:
+                    self._settings["SERVICE_COMMIT_INTERVAL"] = float(valutatrade_cfg["SERVICE_COMMIT_INTERVAL"])
+                if "METRICS_ENABLED" in valutatrade_cfg:
+                    self._settings["METRICS_ENABLED"] = bool(valutatrade_cfg["METRICS_ENABLED"])
+                if "METRICS_FLUSH_SECONDS" in valutatrade_cfg:
+                    self._settings["METRICS_FLUSH_SECONDS"] = float(valutatrade_cfg["METRICS_FLUSH_SECONDS"])
+                if "LEDGER_SNAPSHOT_EVERY" in valutatrade_cfg:
+                    self._settings["LEDGER_SNAPSHOT_EVERY"] = int(valutatrade_cfg["LEDGER_SNAPSHOT_EVERY"])
+                for key in ("PASSWORD_HASH_ITERATIONS", "PASSWORD_SCRYPT_N", "PASSWORD_SCRYPT_R", "PASSWORD_SCRYPT_P"):
+                    if key in valutatrade_cfg:
+                        self._settings[key] = int(valutatrade_cfg[key])
 
             except Exception:
                 pass
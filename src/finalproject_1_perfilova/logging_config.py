@@ -1,11 +1,175 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import threading
+import time
 from pathlib import Path
 
 
 from finalproject_1_perfilova.infra.settings import SettingsLoader
 
 
+TEXT_FORMAT = "%(levelname)s %(asctime)s %(message)s"
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+# поля, которые текстовый формат выводит всегда (остальные — в конце строки)
+_LINE_FIELDS = ("action", "username", "currency", "amount", "rate", "base", "result", "error")
+
+# фоновый писатель: один на процесс
+_listener = None
+
+
+def action_line(fields: dict):
+    """Текст записи log_action для LOG_FORMAT = "text"."""
+    f = fields
+    amount, rate = f.get("amount", "-"), f.get("rate", "-")
+    line = (
+        f"{f['action']} user='{f.get('username', '-')}' "
+        f"currency='{f.get('currency', '-')}' "
+        f"amount={f'{amount:.4f}' if isinstance(amount, float) else amount} "
+        f"rate={f'{rate:.2f}' if isinstance(rate, float) else rate} "
+        f"base='{f.get('base', '-')}' result={f['result']}"
+    )
+    extra = " ".join(f"{k}={v}" for k, v in f.items() if k not in _LINE_FIELDS)
+    if extra:
+        line += f" {extra}"
+    if "error" in f:
+        line += f" error='{f['error']}'"
+    return line
+
+
+class TextFormatter(logging.Formatter):
+    """TEXT_FORMAT; у записей log_action сообщение собирается из полей действия."""
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+    def formatMessage(self, record):
+        fields = getattr(record, "fields", None)
+        if fields is not None:
+            record.message = action_line(fields)
+        return super().formatMessage(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Одна JSON-строка на запись: ts (UTC, мс), level, logger и message.
+    У записей log_action вместо текста — поля действия (action, user, currency, ...).
+    """
+
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str)
+
+    def __init__(self):
+        super().__init__()
+        # (секунда, строка) — strftime один раз в секунду, а не на каждую запись
+        self._second = (None, "")
+
+    def _timestamp(self, record):
+        second = int(record.created)
+        cached, text = self._second
+        if cached != second:
+            text = time.strftime(DATE_FORMAT, time.gmtime(second))
+            self._second = (second, text)
+        return f"{text}.{int(record.msecs):03d}Z"
+
+    def format(self, record):
+        entry = {
+            "ts": self._timestamp(record),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        fields = getattr(record, "fields", None)
+        if fields is not None:
+            entry.update(fields)
+        else:
+            entry["message"] = record.getMessage()
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return self._encoder.encode(entry)
+
+
+class _LogFileHandler(logging.handlers.WatchedFileHandler):
+    """
+    app.log пишут несколько процессов (CLI, serve, scheduler), поэтому сами они
+    файл не ротируют: при ротации внутри процесса остальные продолжили бы писать
+    в переименованный файл. WatchedFileHandler переоткрывает app.log, когда его
+    переместил внешний logrotate.
+
+    emit не сбрасывает буфер файла на каждую запись — это делает _LogListener,
+    когда очередь опустела.
+    """
+
+    def emit(self, record):
+        try:
+            self.reopenIfNeeded()
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class _LogListener(logging.handlers.QueueListener):
+    """
+    QueueListener, который пишет пачками. Проснувшись на первой записи, он ждёт
+    BATCH_DELAY и забирает всё, что успело накопиться: вызывающий поток не делит
+    GIL с писателем на каждой записи. Буфер файла сбрасывается, когда очередь пуста.
+    """
+
+    BATCH_DELAY = 0.005
+
+    def __init__(self, log_queue, *handlers):
+        super().__init__(log_queue, *handlers)
+        self._stopping = threading.Event()
+
+    def start(self):
+        self._stopping.clear()
+        super().start()
+
+    def dequeue(self, block):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            if not block:
+                raise
+        self.flush()
+        record = self.queue.get()
+        self._stopping.wait(self.BATCH_DELAY)
+        return record
+
+    def prepare(self, record):
+        # действие из enqueue_action: LogRecord собирается уже в фоновом потоке
+        if isinstance(record, tuple):
+            name, created, fields = record
+            record = logging.makeLogRecord({
+                "name": name,
+                "levelno": logging.INFO,
+                "levelname": "INFO",
+                "msg": fields["action"],
+                "created": created,
+                "msecs": (created - int(created)) * 1000,
+                "fields": fields,
+            })
+        return record
+
+    def enqueue_sentinel(self):
+        self._stopping.set()
+        super().enqueue_sentinel()
+
+    def flush(self):
+        for handler in self.handlers:
+            handler.flush()
+
+
 def setup_logging():
+    """
+    Логи в файл через очередь: вызывающий код только кладёт запись в очередь,
+    форматирование и запись на диск делает фоновый QueueListener.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
     s = SettingsLoader()
 
     log_dir = Path(s.get("LOG_DIR", "logs"))
@@ -13,11 +177,44 @@ def setup_logging():
 
     log_file = log_dir / "app.log"
 
+    handler = _LogFileHandler(log_file, encoding="utf-8")
+    if str(s.get("LOG_FORMAT", "json")).lower() == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(TextFormatter())
+
+    # обычный QueueHandler: prepare подставляет args в сообщение и убирает
+    # exc_info в вызывающем потоке, JSON или текст собирает фоновый писатель
+    queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+
+    _listener = _LogListener(queue_handler.queue, handler)
+    _listener.start()
+    # при выходе дописываем всё, что осталось в очереди
+    atexit.register(shutdown_logging)
+
     logging.basicConfig(
-        level=logging.INFO,
-        format="%(levelname)s %(asctime)s %(message)s",
-        datefmt="%Y-%m-%dT%H:%M:%S",
-        handlers=[
-            logging.FileHandler(log_file, encoding="utf-8"),
-        ],
-    )
\ No newline at end of file
+        level=str(s.get("LOG_LEVEL", "INFO")).upper(),
+        handlers=[queue_handler],
+    )
+
+
+def enqueue_action(logger_name: str, fields: dict):
+    """
+    Кладёт запись log_action в очередь фонового писателя как есть:
+    на пути сделки остаётся один put, без LogRecord и обработчиков.
+    False — setup_logging не вызывался, запись нужно отправить обычным логгером.
+    """
+    listener = _listener
+    if listener is None:
+        return False
+    listener.queue.put((logger_name, time.time(), fields))
+    return True
+
+
+def shutdown_logging():
+    """Дописывает очередь и останавливает фоновый писатель."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener.flush()
+        _listener = None
@@ -1,11 +1,19 @@
-import requests
 from abc import ABC, abstractmethod
 
 from finalproject_1_perfilova.core.exceptions import ApiRequestError
+from finalproject_1_perfilova.infra import metrics
 from finalproject_1_perfilova.parser_service.config import get_config
+from finalproject_1_perfilova.parser_service.http_session import get_http_session
 
 
 class BaseApiClient(ABC):
+    SOURCE_NAME = None
+
+    def _get_json(self, url: str, params: dict | None = None):
+        """GET через общий пул соединений (повторы, ETag/If-Modified-Since)."""
+        source = self.SOURCE_NAME or self.__class__.__name__
+        return get_http_session(self.cfg).get_json(url, source=source, params=params)
+
     @abstractmethod
     def fetch_rates(self):
         """
@@ -20,9 +28,12 @@ class BaseApiClient(ABC):
 
 
 class CoinGeckoClient(BaseApiClient):
+    SOURCE_NAME = "CoinGecko"
+
     def __init__(self, cfg=None):
         self.cfg = cfg or get_config()
 
+    @metrics.timed("fetch_rates", source="CoinGecko")
     def fetch_rates(self):
         ids = []
         for code in self.cfg.CRYPTO_CURRENCIES:
@@ -37,21 +48,8 @@ class CoinGeckoClient(BaseApiClient):
             "vs_currencies": self.cfg.BASE_FIAT_CURRENCY.lower(),
         }
 
-        try:
-            resp = requests.get(
-                self.cfg.COINGECKO_URL,
-                params=params,
-                timeout=self.cfg.REQUEST_TIMEOUT,
-            )
-        except requests.exceptions.RequestException as e:
-            raise ApiRequestError(f"Ошибка сети при запросе CoinGecko: {e}")
-
-        if resp.status_code != 200:
-            raise ApiRequestError(f"CoinGecko вернул статус {resp.status_code}")
-
-        try:
-            data = resp.json()
-        except Exception:
+        data = self._get_json(self.cfg.COINGECKO_URL, params=params)
+        if not isinstance(data, dict):
             raise ApiRequestError("CoinGecko вернул некорректный JSON")
 
         result = {}
@@ -65,28 +63,22 @@ class CoinGeckoClient(BaseApiClient):
 
 
 class ExchangeRateApiClient(BaseApiClient):
+    SOURCE_NAME = "ExchangeRate-API"
+
     def __init__(self, cfg=None):
         self.cfg = cfg or get_config()
         if not self.cfg.EXCHANGERATE_API_KEY:
             raise ApiRequestError("Не задан EXCHANGERATE_API_KEY (проверьте .env)")
 
+    @metrics.timed("fetch_rates", source="ExchangeRate-API")
     def fetch_rates(self):
         url = (
             f"{self.cfg.EXCHANGERATE_API_URL}/"
             f"{self.cfg.EXCHANGERATE_API_KEY}/latest/{self.cfg.BASE_FIAT_CURRENCY}"
         )
 
-        try:
-            resp = requests.get(url, timeout=self.cfg.REQUEST_TIMEOUT)
-        except requests.exceptions.RequestException as e:
-            raise ApiRequestError(f"Ошибка сети при запросе ExchangeRate-API: {e}")
-
-        if resp.status_code != 200:
-            raise ApiRequestError(f"ExchangeRate-API вернул статус {resp.status_code}")
-
-        try:
-            data = resp.json()
-        except Exception:
+        data = self._get_json(url)
+        if not isinstance(data, dict):
             raise ApiRequestError("ExchangeRate-API вернул некорректный JSON")
 
         rates = data.get("conversion_rates")
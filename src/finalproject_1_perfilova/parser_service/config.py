@@ -1,3 +1,4 @@
+import logging
 import os
 from dataclasses import dataclass
 from pathlib import Path
@@ -46,17 +47,63 @@ class ParserConfig:
     CRYPTO_ID_MAP: dict[str, str] = None
 
     RATES_FILE_PATH: str = "rates.json"
-    HISTORY_FILE_PATH: str = "exchange_rates.json"
+    HISTORY_DIR: str = "exchange_rates"
+    # старый формат истории: один json-файл, переносится в HISTORY_DIR при первом обновлении
+    LEGACY_HISTORY_FILE_PATH: str = "exchange_rates.json"
 
     REQUEST_TIMEOUT: int = 10
+    # пул соединений и повторы (общие для всех клиентов)
+    HTTP_POOL_SIZE: int = 4
+    RETRY_ATTEMPTS: int = 3
+    RETRY_BACKOFF_BASE: float = 0.5
+    RETRY_BACKOFF_MAX: float = 8.0
+
+    # общий лимит на цикл обновления (все источники опрашиваются параллельно);
+    # None — худшее время одного запроса со всеми повторами (retry_budget)
+    UPDATE_DEADLINE: float | None = None
+
+    # scheduler: интервал опроса по источникам (--source CLI -> сек).
+    # Интервал больше RATES_TTL_SECONDS Core сделает курсы источника устаревшими.
+    SCHEDULER_INTERVALS: dict[str, float] = None
+    # случайное отклонение интервала, доля (0.1 = ±10%)
+    SCHEDULER_JITTER: float = 0.1
+    # потолок экспоненциальной паузы после ошибок источника
+    SCHEDULER_BACKOFF_MAX: float = 1800.0
+    # если курс источника сдвинулся за цикл больше чем на эту долю — опрос чаще
+    SCHEDULER_VOLATILITY_THRESHOLD: float = 0.005
+    # интервал при высокой волатильности не опускается ниже этого
+    SCHEDULER_MIN_INTERVAL: float = 10.0
 
     def __post_init__(self):
+        if self.SCHEDULER_INTERVALS is None:
+            # фиат меняется медленно — опрашиваем реже крипты
+            self.SCHEDULER_INTERVALS = {
+                "coingecko": 60.0,
+                "exchangerate": 240.0,
+            }
         if self.CRYPTO_ID_MAP is None:
             self.CRYPTO_ID_MAP = {
                 "BTC": "bitcoin",
                 "ETH": "ethereum",
                 "SOL": "solana",
             }
+        budget = self.retry_budget()
+        if self.UPDATE_DEADLINE is None:
+            self.UPDATE_DEADLINE = budget
+        elif self.UPDATE_DEADLINE < budget:
+            logging.warning(
+                f"UPDATE_DEADLINE={self.UPDATE_DEADLINE} сек меньше времени запроса с повторами "
+                f"({budget:.1f} сек): медленный источник будет пропущен до исчерпания повторов"
+            )
+
+    def retry_budget(self):
+        """
+        Худшее время одного запроса HttpSession: RETRY_ATTEMPTS попыток по
+        REQUEST_TIMEOUT и паузы между ними (не больше RETRY_BACKOFF_MAX —
+        столько же может попросить Retry-After).
+        """
+        attempts = max(1, int(self.RETRY_ATTEMPTS))
+        return self.REQUEST_TIMEOUT * attempts + self.RETRY_BACKOFF_MAX * (attempts - 1)
 
 
 def get_config():
@@ -0,0 +1,125 @@
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from finalproject_1_perfilova.core.exceptions import ApiRequestError
+
+
+# статусы, после которых имеет смысл повторить запрос
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HttpSession:
+    """
+    Общий HTTP-слой для клиентов Parser Service.
+
+    1. Один requests.Session с пулом keep-alive соединений на все клиенты.
+    2. Ограниченное число повторов с экспоненциальной задержкой и jitter
+       (сетевые ошибки, 429 и 5xx).
+    3. Условные запросы: ETag / Last-Modified запоминаются по URL,
+       на 304 возвращается ранее полученный ответ.
+    """
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=cfg.HTTP_POOL_SIZE, pool_maxsize=cfg.HTTP_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # ключ запроса -> (etag, last_modified, data)
+        self._validators = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cache_key(url: str, params: dict | None):
+        if not params:
+            return url
+        return url + "?" + "&".join(f"{k}={params[k]}" for k in sorted(params))
+
+    def _backoff(self, attempt: int, retry_after=None):
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.cfg.RETRY_BACKOFF_MAX)
+            except ValueError:
+                pass
+        cap = min(self.cfg.RETRY_BACKOFF_MAX, self.cfg.RETRY_BACKOFF_BASE * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    def get_json(self, url: str, source: str, params: dict | None = None):
+        key = self._cache_key(url, params)
+        attempts = max(1, int(self.cfg.RETRY_ATTEMPTS))
+
+        for attempt in range(attempts):
+            with self._lock:
+                cached = self._validators.get(key)
+
+            headers = {}
+            if cached is not None:
+                etag, last_modified, _data = cached
+                if etag:
+                    headers["If-None-Match"] = etag
+                if last_modified:
+                    headers["If-Modified-Since"] = last_modified
+
+            retry_after = None
+            try:
+                resp = self.session.get(url, params=params, headers=headers, timeout=self.cfg.REQUEST_TIMEOUT)
+            except requests.exceptions.RequestException as e:
+                error = ApiRequestError(f"Ошибка сети при запросе {source}: {e}")
+            else:
+                if resp.status_code == 304 and cached is not None:
+                    return cached[2]
+
+                if resp.status_code == 200:
+                    try:
+                        data = resp.json()
+                    except Exception:
+                        raise ApiRequestError(f"{source} вернул некорректный JSON")
+
+                    etag = resp.headers.get("ETag")
+                    last_modified = resp.headers.get("Last-Modified")
+                    if etag or last_modified:
+                        with self._lock:
+                            self._validators[key] = (etag, last_modified, data)
+                    return data
+
+                error = ApiRequestError(f"{source} вернул статус {resp.status_code}")
+                if resp.status_code not in RETRY_STATUSES:
+                    raise error
+                retry_after = resp.headers.get("Retry-After")
+
+            if attempt + 1 < attempts:
+                delay = self._backoff(attempt, retry_after)
+                logging.warning(
+                    f"{source}: попытка {attempt + 1}/{attempts} не удалась ({error.reason}), "
+                    f"повтор через {delay:.2f} сек"
+                )
+                time.sleep(delay)
+
+        raise error
+
+
+# настройки HTTP-слоя: сессии с одинаковыми значениями взаимозаменяемы
+SESSION_SETTINGS = ("REQUEST_TIMEOUT", "HTTP_POOL_SIZE", "RETRY_ATTEMPTS", "RETRY_BACKOFF_BASE", "RETRY_BACKOFF_MAX")
+
+_sessions: dict[tuple, HttpSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_http_session(cfg):
+    """
+    Одна сессия на набор HTTP-настроек, а не на объект cfg: get_config()
+    создаёт новый ParserConfig на каждое обновление, а пул соединений
+    и ETag-и должны переживать обновления в долгоживущем процессе.
+    """
+    key = tuple(getattr(cfg, name) for name in SESSION_SETTINGS)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = HttpSession(cfg)
+        return session
@@ -1,41 +1,175 @@
+import heapq
 import logging
+import random
+import signal
+import threading
 import time
+from dataclasses import dataclass
 
 from finalproject_1_perfilova.core.exceptions import ApiRequestError
-from finalproject_1_perfilova.parser_service.updater import RatesUpdater
+from finalproject_1_perfilova.infra import metrics
+from finalproject_1_perfilova.parser_service.updater import SOURCES, RatesUpdater, build_updater
+
+
+@dataclass
+class _Job:
+    source: str
+    updater: RatesUpdater
+    # интервал из настроек и текущий (меньше при высокой волатильности)
+    base_interval: float
+    interval: float
+    failures: int = 0
 
 
 class RatesScheduler:
     """
     Планировщик (scheduler) для Parser Service.
 
-    1. Раз в N секунд вызывает обновление курсов через RatesUpdater.
-    2. Останавливается по Ctrl+C.
+    1. У каждого источника своё расписание: интервал, случайный сдвиг
+       (jitter, чтобы запросы не шли ровными пачками), экспоненциальная
+       пауза после ошибок (backoff) и ускорение опроса, когда курсы
+       источника двигаются сильнее volatility_threshold за цикл.
+    2. Расписание — куча по времени следующего запуска на монотонных часах
+       (перевод системных часов его не ломает). Ожидание прерывается сразу
+       при остановке.
+    3. Останавливается по SIGINT (Ctrl+C) и SIGTERM: текущее обновление
+       доделывается, новые не начинаются.
     """
 
-    def __init__(self, updater: RatesUpdater):
-        self.updater = updater
+    def __init__(
+        self,
+        updaters: dict[str, RatesUpdater],
+        intervals: dict[str, float],
+        jitter: float = 0.1,
+        backoff_max: float = 1800.0,
+        volatility_threshold: float = 0.005,
+        min_interval: float = 10.0,
+    ):
+        for source, interval in intervals.items():
+            if interval <= 0:
+                raise ValueError(f"Интервал источника '{source}' должен быть > 0")
+        self.jobs = [
+            _Job(source, updater, float(intervals[source]), float(intervals[source]))
+            for source, updater in updaters.items()
+        ]
+        self.jitter = jitter
+        self.backoff_max = backoff_max
+        self.volatility_threshold = volatility_threshold
+        self.min_interval = min_interval
+        self._rnd = random.Random()
+        self._stop = threading.Event()
 
-    def run_forever(self, interval_seconds: int = 300):
-        if not isinstance(interval_seconds, int) or interval_seconds <= 0:
-            raise ValueError("interval_seconds должен быть целым числом > 0")
-
-        logging.info(f"Планировщик запущен. Интервал: {interval_seconds} сек.")
-        try:
-            while True:
-                started_at = time.time()
+    @classmethod
+    def from_config(cls, cfg, source: str = "all", interval: float | None = None):
+        """
+        Планировщик с настоящими клиентами; source — coingecko, exchangerate или all.
+        interval — один интервал для всех источников вместо SCHEDULER_INTERVALS.
+        """
+        updaters = {}
+        if source != "all":
+            updaters[source] = build_updater(source)
+        else:
+            # с all источник без настроек (нет ключа API) пропускается, остальные работают
+            for s in SOURCES:
                 try:
-                    updated = self.updater.run_update()
-                    logging.info(f"Обновление выполнено. Обновлено курсов: {updated}.")
+                    updaters[s] = build_updater(s)
                 except ApiRequestError as e:
-                    logging.error(f"Ошибка при обновлении курсов: {e}")
-                except Exception as e:
-                    logging.exception(f"Непредвиденная ошибка планировщика: {e}")
-
-                elapsed = time.time() - started_at
-                sleep_for = interval_seconds - elapsed
-                if sleep_for > 0:
-                    time.sleep(sleep_for)
-        except KeyboardInterrupt:
-            logging.info("Планировщик остановлен пользователем (Ctrl+C).")
-            print("Планировщик остановлен.")
\ No newline at end of file
+                    logging.warning(f"Планировщик: источник {s} пропущен: {e}")
+            if not updaters:
+                raise ApiRequestError("ни один источник курсов не настроен")
+
+        return cls(
+            updaters=updaters,
+            intervals={s: float(interval or cfg.SCHEDULER_INTERVALS.get(s, 300.0)) for s in updaters},
+            jitter=cfg.SCHEDULER_JITTER,
+            backoff_max=cfg.SCHEDULER_BACKOFF_MAX,
+            volatility_threshold=cfg.SCHEDULER_VOLATILITY_THRESHOLD,
+            min_interval=cfg.SCHEDULER_MIN_INTERVAL,
+        )
+
+    def stop(self):
+        self._stop.set()
+
+    @staticmethod
+    def volatility(changes: dict):
+        """Наибольшее относительное изменение курса за цикл (0 — ничего не сдвинулось)."""
+        moves = [abs(c["new"] - c["old"]) / abs(c["old"]) for c in changes.values() if c.get("old")]
+        return max(moves, default=0.0)
+
+    def next_delay(self, job: _Job, failed: bool):
+        """Пауза до следующего опроса источника после цикла (с jitter)."""
+        if failed:
+            job.failures += 1
+            delay = min(job.interval * 2 ** job.failures, max(self.backoff_max, job.interval))
+            logging.warning(f"Планировщик: {job.source} — ошибка #{job.failures} подряд, пауза {delay:.0f} сек")
+        else:
+            job.failures = 0
+            volatility = self.volatility(job.updater.last_changes)
+            if volatility > self.volatility_threshold:
+                job.interval = max(self.min_interval, job.interval / 2)
+                logging.info(
+                    f"Планировщик: {job.source} — курс сдвинулся на {volatility:.2%}, интервал {job.interval:.0f} сек"
+                )
+            else:
+                # спокойный рынок — постепенно возвращаемся к интервалу из настроек
+                job.interval = min(job.base_interval, job.interval * 1.5)
+            delay = job.interval
+        return delay * (1 + self._rnd.uniform(-self.jitter, self.jitter))
+
+    def _run_job(self, job: _Job):
+        failed = False
+        try:
+            updated = job.updater.run_update()
+            failed = job.updater.last_errors > 0
+            logging.info(f"Обновление {job.source} выполнено. Обновлено курсов: {updated}.")
+        except ApiRequestError as e:
+            failed = True
+            logging.error(f"Ошибка при обновлении курсов {job.source}: {e}")
+        except Exception as e:
+            failed = True
+            logging.exception(f"Непредвиденная ошибка планировщика ({job.source}): {e}")
+        metrics.inc("scheduler_runs_total", source=job.source, result="error" if failed else "ok")
+
+        # процесс живёт долго — метрики пишем после каждого цикла, а не только при выходе
+        if metrics.enabled():
+            try:
+                metrics.flush()
+            except OSError as e:
+                logging.warning(f"Метрики не записаны: {e}")
+        return self.next_delay(job, failed)
+
+    def _on_signal(self, signum, _frame):
+        logging.info(f"Планировщик: сигнал {signal.Signals(signum).name}, остановка после текущего обновления")
+        self._stop.set()
+
+    def _install_signal_handlers(self):
+        # обработчики сигналов ставятся только из главного потока
+        if threading.current_thread() is not threading.main_thread():
+            return {}
+        return {sig: signal.signal(sig, self._on_signal) for sig in (signal.SIGINT, signal.SIGTERM)}
+
+    def run_forever(self):
+        logging.info(
+            "Планировщик запущен. Интервалы: "
+            + ", ".join(f"{job.source}={job.base_interval:.0f} сек" for job in self.jobs)
+        )
+        previous = self._install_signal_handlers()
+        # (время запуска, порядковый номер, задача): все источники — сразу при старте
+        timetable = [(time.monotonic(), i, job) for i, job in enumerate(self.jobs)]
+        heapq.heapify(timetable)
+        try:
+            while timetable and not self._stop.is_set():
+                due, seq, job = timetable[0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._stop.wait(wait)
+                    continue
+
+                heapq.heappop(timetable)
+                delay = self._run_job(job)
+                # отсчёт от конца цикла: долгий опрос не вызывает серию запусков подряд
+                heapq.heappush(timetable, (time.monotonic() + delay, seq, job))
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+            logging.info("Планировщик остановлен.")
@@ -1,45 +1,436 @@
+import json
+import logging
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timezone
+from pathlib import PurePosixPath
+
+from finalproject_1_perfilova.core.utils import normalize_timestamp
+from finalproject_1_perfilova.infra import rates_binary
 from finalproject_1_perfilova.infra.database import DatabaseManager
+from finalproject_1_perfilova.infra.settings import SettingsLoader
+
+
+# размер корзины для OHLC, сек
+OHLC_BUCKETS = {
+    "1m": 60,
+    "1h": 3600,
+    "1d": 86400,
+}
+
+
+def downsample_ohlc(records: list[dict], bucket: str):
+    """
+    Сворачивает записи одной пары (по возрастанию времени) в OHLC-корзины.
+    Возвращает список dict: start, open, high, low, close, count.
+    """
+    if bucket not in OHLC_BUCKETS:
+        raise ValueError(f"Неизвестный размер корзины '{bucket}' (ожидается: {', '.join(OHLC_BUCKETS)})")
+    size = OHLC_BUCKETS[bucket]
+
+    candles = []
+    current_key = None
+    for r in records:
+        ts = datetime.fromisoformat(str(r["timestamp"]).replace("Z", "+00:00")).timestamp()
+        key = int(ts // size)
+        rate = float(r["rate"])
+
+        if key != current_key:
+            current_key = key
+            start = datetime.fromtimestamp(key * size, tz=timezone.utc)
+            candles.append({
+                "start": normalize_timestamp(start),
+                "open": rate,
+                "high": rate,
+                "low": rate,
+                "close": rate,
+                "count": 1,
+            })
+            continue
+
+        c = candles[-1]
+        c["high"] = max(c["high"], rate)
+        c["low"] = min(c["low"], rate)
+        c["close"] = rate
+        c["count"] += 1
+
+    return candles
 
 
 class RatesStorage:
     """
     Хранятся:
-    - history: data/exchange_rates.json (исттория записей)
+    - history: data/exchange_rates/ (история записей, сегменты jsonl)
     - snapshot: data/rates.json (последние курсы для Core)
+    - изменения: data/rates_changes.json (пары, изменившиеся в последнем обновлении)
+    - бинарный snapshot: data/rates.bin (RATES_BINARY_SNAPSHOT, читается через mmap)
+
+    История только дописывается:
+    1. Сегмент = один день (YYYY-MM-DD.jsonl) по timestamp записи.
+    2. Id записи содержит timestamp, поэтому дубли возможны только внутри
+       одного сегмента — множество id держится в памяти по сегментам
+       и пополняется инкрементально.
+    3. compact_history сливает старые дневные сегменты в месячные (YYYY-MM.jsonl).
+    4. Рядом с сегментом лежит индекс (.idx): пара, timestamp, смещение строки.
+       query_history читает только нужные сегменты и только строки своей пары.
     """
 
-    def __init__(self, rates_path: str, history_path: str):
+    def __init__(
+        self,
+        rates_path: str,
+        history_dir: str,
+        legacy_history_path: str | None = None,
+        changes_path: str = "rates_changes.json",
+        binary_path: str | None = None,
+    ):
         self.rates_path = rates_path
-        self.history_path = history_path
+        self.changes_path = changes_path
+        # rates.bin рядом с rates.json, если включён RATES_BINARY_SNAPSHOT
+        if binary_path is None and SettingsLoader().get("RATES_BINARY_SNAPSHOT", False):
+            binary_path = str(PurePosixPath(rates_path).with_suffix(".bin"))
+        self.binary_path = binary_path
+        self.history_dir = history_dir
+        self.legacy_history_path = legacy_history_path
         self.db = DatabaseManager()
+        # сегмент -> множество id, уже записанных в него (только последний сегмент,
+        # в который шла запись: старые дни больше не дописываются)
+        self._segment_ids: dict[str, set] = {}
+        # сегмент -> (stamp сегмента, {pair: [(timestamp, offset), ...]})
+        self._indexes: dict[str, tuple] = {}
+
+    # ---------- history ----------
+
+    def _segment_file(self, segment: str):
+        return f"{self.history_dir}/{segment}.jsonl"
+
+    def _index_file(self, segment: str):
+        return f"{self.history_dir}/{segment}.idx"
+
+    @staticmethod
+    def _pair_of(record: dict):
+        return f"{record.get('from_currency')}_{record.get('to_currency')}"
+
+    @staticmethod
+    def _segment_for(record: dict):
+        # timestamp вида 2026-10-17T12:00:00Z -> 2026-10-17
+        return str(record.get("timestamp", ""))[:10] or "unknown"
+
+    @staticmethod
+    def _segment_sort_key(segment: str):
+        # месячный сегмент идёт перед дневными того же месяца
+        return segment[:7], len(segment), segment
+
+    def list_segments(self):
+        seg_dir = self.db.path_for(self.history_dir)
+        if not seg_dir.is_dir():
+            return []
+        return sorted((p.stem for p in seg_dir.glob("*.jsonl")), key=self._segment_sort_key)
+
+    def _read_segment(self, segment: str):
+        for line in self.db.read_lines(self._segment_file(segment)):
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning(f"Повреждённая строка в сегменте истории {segment} пропущена")
+
+    def _ids_for(self, segment: str):
+        ids = self._segment_ids.get(segment)
+        if ids is None:
+            ids = {r["id"] for r in self._read_segment(segment) if isinstance(r, dict) and "id" in r}
+            self._segment_ids[segment] = ids
+        return ids
 
     def append_history(self, records: list[dict]):
-        history = self.db.read(self.history_path, [])
+        """Дописывает новые записи в сегменты; стоимость O(новых записей)."""
+        with self.db.lock(self.history_dir):
+            self._append_history(records)
 
-        if not isinstance(history, list):
-            history = []
+    def _append_history(self, records: list[dict]):
+        self._migrate_legacy_history()
 
-        existing_ids = set()
-        for item in history:
-            if isinstance(item, dict) and "id" in item:
-                existing_ids.add(item["id"])
+        lines_by_segment: dict[str, list[str]] = {}
+        records_by_segment: dict[str, list[dict]] = {}
 
         for r in records:
             if not isinstance(r, dict):
                 continue
             rid = r.get("id")
-            if rid and rid not in existing_ids:
-                history.append(r)
-                existing_ids.add(rid)
+            if not rid:
+                continue
+
+            segment = self._segment_for(r)
+            ids = self._ids_for(segment)
+            if rid in ids:
+                continue
+
+            ids.add(rid)
+            lines_by_segment.setdefault(segment, []).append(json.dumps(r, ensure_ascii=False))
+            records_by_segment.setdefault(segment, []).append(r)
+
+        for segment, lines in lines_by_segment.items():
+            offsets = self.db.append_lines(self._segment_file(segment), lines)
+            # индекс пишется после сегмента: если он старше сегмента — его пересоберут
+            self.db.append_lines(
+                self._index_file(segment),
+                [
+                    f"{self._pair_of(r)}\t{r.get('timestamp', '')}\t{offset}"
+                    for r, offset in zip(records_by_segment[segment], offsets)
+                ],
+            )
+            self._indexes.pop(segment, None)
+
+        # долго живущий процесс (планировщик) не копит id всех прошедших дней
+        if len(self._segment_ids) > 1:
+            latest = max(self._segment_ids, key=self._segment_sort_key)
+            for segment in [s for s in self._segment_ids if s != latest]:
+                del self._segment_ids[segment]
+
+    def iter_history(self):
+        """Все записи истории в порядке сегментов."""
+        for segment in self.list_segments():
+            yield from self._read_segment(segment)
+
+    def compact_history(self, before: date):
+        """
+        Сливает дневные сегменты старше before в месячные (с дедупликацией).
+        Возвращает количество слитых дневных сегментов.
+        """
+        # та же блокировка, что у append_history: запись в сливаемый сегмент не потеряется
+        with self.db.lock(self.history_dir):
+            return self._compact_history(before)
+
+    def _compact_history(self, before: date):
+        cutoff = before.isoformat()
+        by_month: dict[str, list[str]] = {}
+        for segment in self.list_segments():
+            if len(segment) == 10 and segment < cutoff:
+                by_month.setdefault(segment[:7], []).append(segment)
 
-        self.db.write(self.history_path, history)
+        merged = 0
+        for month, days in by_month.items():
+            seen = set()
+            records = []
+            for segment in [month, *days]:
+                for r in self._read_segment(segment):
+                    rid = r.get("id") if isinstance(r, dict) else None
+                    if rid and rid not in seen:
+                        seen.add(rid)
+                        records.append(r)
 
-    def write_snapshot(self, pairs: dict, last_refresh: str):
+            records.sort(key=lambda r: str(r.get("timestamp", "")))
+            self.db.write_lines(
+                self._segment_file(month),
+                (json.dumps(r, ensure_ascii=False) for r in records),
+            )
+            self._segment_ids.pop(month, None)
+
+            self.db.remove(self._index_file(month))
+            self._indexes.pop(month, None)
+
+            for segment in days:
+                self.db.remove(self._segment_file(segment))
+                self.db.remove(self._index_file(segment))
+                self._segment_ids.pop(segment, None)
+                self._indexes.pop(segment, None)
+                merged += 1
+
+        return merged
+
+    def _load_index(self, segment: str):
+        """{pair: [(timestamp, offset), ...]} для сегмента; индекс пересобирается, если устарел."""
+        seg_path = self.db.path_for(self._segment_file(segment))
+        st = seg_path.stat()
+        stamp = (st.st_mtime_ns, st.st_size)
+
+        cached = self._indexes.get(segment)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        index: dict[str, list] = {}
+        idx_path = self.db.path_for(self._index_file(segment))
+        if idx_path.exists() and idx_path.stat().st_mtime_ns >= st.st_mtime_ns:
+            for line in self.db.read_lines(self._index_file(segment)):
+                pair, ts, offset = line.split("\t")
+                index.setdefault(pair, []).append((ts, int(offset)))
+        else:
+            lines = []
+            for offset, line in self.db.read_lines_with_offsets(self._segment_file(segment)):
+                try:
+                    r = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                pair, ts = self._pair_of(r), str(r.get("timestamp", ""))
+                index.setdefault(pair, []).append((ts, offset))
+                lines.append(f"{pair}\t{ts}\t{offset}")
+            self.db.write_lines(self._index_file(segment), lines)
+
+        for entries in index.values():
+            entries.sort()
+        self._indexes[segment] = (stamp, index)
+        return index
+
+    def query_history(self, pair: str, start=None, end=None):
+        """
+        Записи пары с start <= timestamp <= end по возрастанию времени.
+        start/end — datetime или ISO-строки; None означает «без границы».
+        """
+        pair = pair.strip().upper()
+        start_ts = normalize_timestamp(start) if start is not None else ""
+        end_ts = normalize_timestamp(end) if end is not None else "~"
+
+        records = []
+        for segment in self.list_segments():
+            # сегмент целиком вне диапазона — не открываем
+            if segment < start_ts[: len(segment)] or segment > end_ts[: len(segment)]:
+                continue
+
+            entries = self._load_index(segment).get(pair)
+            if not entries:
+                continue
+
+            lo = bisect_left(entries, (start_ts, -1))
+            hi = bisect_right(entries, (end_ts, float("inf")))
+            offsets = [offset for _ts, offset in entries[lo:hi]]
+            for line in self.db.read_lines_at(self._segment_file(segment), offsets):
+                records.append(json.loads(line))
+
+        records.sort(key=lambda r: str(r.get("timestamp", "")))
+        return records
+
+    def _migrate_legacy_history(self):
+        """Однократно переносит старый exchange_rates.json в сегменты."""
+        if not self.legacy_history_path:
+            return
+        legacy_path = self.db.path_for(self.legacy_history_path)
+        if not legacy_path.exists():
+            return
+
+        history = self.db.read(self.legacy_history_path, [])
+        # legacy-файл убираем до append_history, чтобы перенос не повторился
+        legacy_path.rename(legacy_path.with_name(legacy_path.name + ".migrated"))
+        self.db.invalidate(self.legacy_history_path)
+
+        if isinstance(history, list):
+            logging.info(f"Перенос {len(history)} записей из {self.legacy_history_path} в {self.history_dir}/")
+            self.append_history(history)
+
+    # ---------- snapshot ----------
+
+    def write_snapshot(self, pairs: dict, last_refresh: str, generation: int | None = None):
         obj = {
             "pairs": pairs,
             "last_refresh": last_refresh,
         }
+        if generation is not None:
+            obj["generation"] = generation
         self.db.write(self.rates_path, obj)
+        # бинарная копия для Core пишется после json: читатели сверяют их mtime
+        if self.binary_path is not None:
+            try:
+                rates_binary.write(self.binary_path, pairs, last_refresh=last_refresh, generation=generation)
+            except ValueError as e:
+                # снимок не ложится в бинарный формат: убираем rates.bin, Core читает rates.json
+                logging.warning(f"Бинарный snapshot не записан ({e}), используется {self.rates_path}")
+                self.db.remove(self.binary_path)
+
+    @staticmethod
+    def diff_pairs(current: dict, pairs: dict, epsilon: float = 0.0):
+        """
+        Пары, курс которых сдвинулся относительно current больше чем на epsilon
+        (относительное изменение), и новые пары.
+        Возвращает pair -> {"old", "new", "source", "updated_at"}; old у новой пары — None.
+        """
+        changes = {}
+        for pair, entry in pairs.items():
+            rate = float(entry["rate"])
+            prev = current.get(pair)
+            old = None
+            if isinstance(prev, dict) and "rate" in prev:
+                old = float(prev["rate"])
+                if abs(rate - old) <= epsilon * abs(old):
+                    continue
+            changes[pair] = {
+                "old": old,
+                "new": rate,
+                "source": entry.get("source"),
+                "updated_at": entry.get("updated_at"),
+            }
+        return changes
+
+    @staticmethod
+    def _age_seconds(updated_at, now: datetime):
+        try:
+            ts = datetime.fromisoformat(str(updated_at).replace("Z", "+00:00"))
+        except ValueError:
+            return float("inf")
+        return (now - ts).total_seconds()
+
+    def apply_changes(self, pairs: dict, last_refresh: str, epsilon: float = 0.0, heartbeat_seconds: float | None = None):
+        """
+        Обновляет в snapshot полученные пары (read-modify-write под блокировкой
+        rates_path; пары, которых нет в pairs, не трогаются). Snapshot
+        переписывается, только когда есть что писать.
+
+        1. Пары сравниваются с текущим snapshot (diff_pairs): изменившиеся
+           и новые пары записываются с новым курсом.
+        2. У остальных полученных пар остаётся прежний курс (сдвиг в пределах
+           epsilon не публикуется), обновляется только updated_at.
+        3. Если ничего не изменилось, snapshot не переписывается — пока
+           updated_at полученных пар не старше heartbeat_seconds (иначе Core
+           посчитает их устаревшими по RATES_TTL_SECONDS).
+        4. Изменения пишутся в файл изменений (changes_path) с номером
+           поколения; тот же номер попадает в snapshot.
+
+        Возвращает изменившиеся пары (пустой dict — изменений нет).
+        """
+        now = datetime.fromisoformat(last_refresh.replace("Z", "+00:00"))
+        with self.db.lock(self.rates_path):
+            current = self.read_pairs()
+            changes = self.diff_pairs(current, pairs, epsilon)
+
+            if not changes:
+                if heartbeat_seconds is None or all(
+                    self._age_seconds(current[pair].get("updated_at"), now) < heartbeat_seconds
+                    for pair in pairs
+                ):
+                    return {}
+
+            merged = dict(current)
+            for pair, entry in pairs.items():
+                if pair in changes:
+                    merged[pair] = entry
+                else:
+                    merged[pair] = {**current[pair], "updated_at": entry["updated_at"]}
+
+            generation = self.read_generation() + (1 if changes else 0)
+            self.write_snapshot(merged, last_refresh=last_refresh, generation=generation)
+            # уведомление — после snapshot: подписчик, увидевший поколение, читает уже новые курсы
+            if changes:
+                self.db.write(
+                    self.changes_path,
+                    {"generation": generation, "timestamp": last_refresh, "changes": changes},
+                )
+        return changes
+
+    def read_generation(self):
+        """Номер последнего поколения изменений (0 — изменений ещё не было)."""
+        return int(self.read_changes().get("generation", 0))
+
+    def read_changes(self):
+        """
+        Последнее изменение курсов: {"generation", "timestamp", "changes"}.
+        Файл заменяется атомарно (rename), поэтому за ним удобно следить
+        через inotify (IN_MOVED_TO). Если generation выросло больше чем на 1,
+        промежуточные изменения пропущены — нужно перечитать snapshot целиком.
+        """
+        changes = self.db.read(self.changes_path, {})
+        return changes if isinstance(changes, dict) else {}
+
+    def read_pairs(self):
+        """Пары из текущего snapshot (пустой dict, если его ещё нет)."""
+        snap = self.db.read(self.rates_path, {})
+        if not isinstance(snap, dict) or not isinstance(snap.get("pairs"), dict):
+            return {}
+        return snap["pairs"]
 
     @staticmethod
     def make_id(pair: str, ts: str):
@@ -1,47 +1,219 @@
 import logging
+import queue
+import threading
+import time
 from datetime import datetime, timezone
 
 from finalproject_1_perfilova.core.exceptions import ApiRequestError
+from finalproject_1_perfilova.infra import metrics
+from finalproject_1_perfilova.infra.settings import SettingsLoader
 from finalproject_1_perfilova.parser_service.storage import RatesStorage
 
 
+# --source CLI -> имя источника в snapshot (RatesUpdater.source_name)
+SOURCES = {
+    "coingecko": "CoinGecko",
+    "exchangerate": "ExchangeRate-API",
+}
+
+
+def build_storage(cfg):
+    return RatesStorage(cfg.RATES_FILE_PATH, cfg.HISTORY_DIR, cfg.LEGACY_HISTORY_FILE_PATH)
+
+
+def build_updater(source: str = "all"):
+    """RatesUpdater с настоящими клиентами: source — coingecko, exchangerate или all."""
+    from finalproject_1_perfilova.parser_service.api_clients import CoinGeckoClient, ExchangeRateApiClient
+    from finalproject_1_perfilova.parser_service.config import get_config
+
+    cfg = get_config()
+    clients = []
+    if source in ("coingecko", "all"):
+        clients.append(CoinGeckoClient(cfg=cfg))
+    if source in ("exchangerate", "all"):
+        clients.append(ExchangeRateApiClient(cfg=cfg))
+
+    return RatesUpdater(clients=clients, storage=build_storage(cfg), deadline_seconds=cfg.UPDATE_DEADLINE)
+
+
 class RatesUpdater:
-    def __init__(self, clients: list, storage: RatesStorage):
+    """
+    Обновление курсов из нескольких источников.
+
+    1. Клиенты опрашиваются параллельно (daemon-потоки), общее время цикла
+       ограничено deadline_seconds.
+    2. Источник, не уложившийся в deadline или вернувший ошибку, пропускается;
+       его пары остаются в snapshot с прошлого обновления.
+    3. Время ответа каждого источника пишется в лог.
+    4. Snapshot переписывается, только если курсы сдвинулись больше чем на
+       epsilon (RATES_CHANGE_EPSILON) или подошло время heartbeat
+       (RATES_HEARTBEAT_SECONDS, по умолчанию половина RATES_TTL_SECONDS).
+       Изменившиеся пары передаются подписчикам (subscribe) и пишутся
+       в файл изменений RatesStorage.
+    """
+
+    def __init__(
+        self,
+        clients: list,
+        storage: RatesStorage,
+        deadline_seconds: float | None = None,
+        epsilon: float | None = None,
+        heartbeat_seconds: float | None = None,
+    ):
         self.clients = clients
         self.storage = storage
+        self.deadline_seconds = deadline_seconds
 
-    def run_update(self):
+        settings = SettingsLoader()
+        if epsilon is None:
+            epsilon = float(settings.get("RATES_CHANGE_EPSILON", 0.0))
+        if heartbeat_seconds is None:
+            heartbeat_seconds = settings.get("RATES_HEARTBEAT_SECONDS")
+        if heartbeat_seconds is None:
+            heartbeat_seconds = float(settings.get("RATES_TTL_SECONDS", 300)) / 2
+        self.epsilon = epsilon
+        self.heartbeat_seconds = heartbeat_seconds
+
+        self._subscribers = []
+        # изменения последнего run_update: pair -> {"old", "new", "source", "updated_at"}
+        self.last_changes: dict = {}
+        # источников, не ответивших в последнем run_update
+        self.last_errors = 0
+
+    def subscribe(self, callback):
         """
-        Возвращает количество курсов (пар), которые записали в snapshot.
+        callback(changes) вызывается после каждого обновления, в котором
+        изменился хотя бы один курс; changes — как RatesStorage.diff_pairs.
+        Возвращает функцию отписки.
         """
-        logging.info("Старт обновления курсов...")
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    def _publish(self, changes: dict):
+        for callback in list(self._subscribers):
+            try:
+                callback(changes)
+            except Exception as e:
+                # ошибка подписчика не должна ломать цикл обновления
+                logging.exception(f"Ошибка подписчика изменений курсов {callback!r}: {e}")
+
+    @staticmethod
+    def source_name(client):
+        if getattr(client, "SOURCE_NAME", None):
+            return client.SOURCE_NAME
+
+        name = client.__class__.__name__
+
+        if "CoinGecko" in name:
+            return "CoinGecko"
+        if "ExchangeRate" in name:
+            return "ExchangeRate-API"
+        return name
+
+    @staticmethod
+    def _timed_fetch(client):
+        started_at = time.monotonic()
+        try:
+            return client.fetch_rates(), time.monotonic() - started_at
+        except Exception as e:
+            e.elapsed = time.monotonic() - started_at
+            raise
+
+    def _fetch_within_deadline(self):
+        """
+        Запускает клиентов в daemon-потоках и ждёт ответы не дольше deadline_seconds.
+        Возвращает index клиента -> (результат _timed_fetch, ошибка); не успевших нет.
+        Зависший запрос не держит ни цикл, ни выход процесса: daemon-поток
+        не ждут при завершении (в отличие от потоков ThreadPoolExecutor).
+        """
+        results = queue.SimpleQueue()
+
+        def worker(index, client):
+            try:
+                results.put((index, self._timed_fetch(client), None))
+            except Exception as e:
+                results.put((index, None, e))
+
+        for index, client in enumerate(self.clients):
+            threading.Thread(target=worker, args=(index, client), name=f"rates-fetch-{index}", daemon=True).start()
 
+        deadline = None if self.deadline_seconds is None else time.monotonic() + self.deadline_seconds
+        outcomes = {}
+        while len(outcomes) < len(self.clients):
+            timeout = None if deadline is None else deadline - time.monotonic()
+            if timeout is not None and timeout <= 0:
+                break
+            try:
+                index, result, error = results.get(timeout=timeout)
+            except queue.Empty:
+                break
+            outcomes[index] = (result, error)
+        return outcomes
+
+    def fetch_all(self):
+        """
+        Опрашивает всех клиентов параллельно.
+        Возвращает (all_rates, errors), где all_rates: pair -> (rate, source).
+        """
         all_rates: dict[str, tuple[float, str]] = {}
         errors = 0
 
-        for client in self.clients:
-            name = client.__class__.__name__
+        if not self.clients:
+            return all_rates, errors
 
-            if "CoinGecko" in name:
-                src = "CoinGecko"
-            elif "ExchangeRate" in name:
-                src = "ExchangeRate-API"
-            else:
-                src = name
+        outcomes = self._fetch_within_deadline()
+
+        # порядок клиентов сохраняем: при совпадении пар побеждает последний
+        for index, client in enumerate(self.clients):
+            src = self.source_name(client)
+            if index not in outcomes:
+                errors += 1
+                metrics.inc("fetch_rates_timeouts_total", source=src)
+                logging.error(
+                    f"Ошибка получения из {src}: не уложился в {self.deadline_seconds} сек, "
+                    f"результат пропущен"
+                )
+                continue
 
+            result, error = outcomes[index]
             try:
-                rates = client.fetch_rates()
+                if error is not None:
+                    raise error
+                rates, elapsed = result
+                # разбираем ответ целиком до слияния: ошибка не оставит половину пар
+                parsed = {pair: (float(rate), src) for pair, rate in rates.items()}
+            except Exception as e:
+                # любая ошибка клиента (не только ApiRequestError) выбывает только этот источник
+                errors += 1
+                metrics.inc("fetch_rates_failed_total", source=src)
+                elapsed = getattr(e, "elapsed", 0.0)
+                if isinstance(e, ApiRequestError):
+                    logging.error(f"Ошибка получения из {src} ({elapsed * 1000:.0f} мс): {e}")
+                else:
+                    logging.error(
+                        f"Непредвиденная ошибка получения из {src} ({elapsed * 1000:.0f} мс): "
+                        f"{e.__class__.__name__}: {e}"
+                    )
+                continue
 
-                count = 0
-                for pair, rate in rates.items():
-                    all_rates[pair] = (float(rate), src)
-                    count += 1
+            all_rates.update(parsed)
+            count = len(parsed)
 
-                logging.info(f"Получение из {src}... OK ({count} курсов)")
-            
-            except ApiRequestError as e:
-                errors += 1
-                logging.error(f"Ошибка получения из {src}: {e}")
+            logging.info(f"Получение из {src}... OK ({count} курсов, {elapsed * 1000:.0f} мс)")
+
+        return all_rates, errors
+
+    @metrics.timed("rates_update")
+    def run_update(self):
+        """
+        Возвращает количество полученных курсов (пар).
+        Изменившиеся из них — в last_changes, число ошибок источников — в last_errors.
+        """
+        logging.info("Старт обновления курсов...")
+        cycle_started_at = time.monotonic()
+
+        all_rates, errors = self.fetch_all()
+        self.last_errors = errors
 
         now = (
             datetime.now(timezone.utc)
@@ -69,12 +241,28 @@ class RatesUpdater:
         for pair, (rate, src) in all_rates.items():
             pairs[pair] = {"rate": rate, "updated_at": now, "source": src}
 
-        self.storage.append_history(history_records)
-        self.storage.write_snapshot(pairs, last_refresh=now)
+        changes = {}
+        if pairs:
+            metrics.inc("rates_pairs_updated_total", len(pairs))
+            self.storage.append_history(history_records)
+            # частичный результат: пары недоступных источников остаются прежними
+            changes = self.storage.apply_changes(
+                pairs,
+                last_refresh=now,
+                epsilon=self.epsilon,
+                heartbeat_seconds=self.heartbeat_seconds,
+            )
+            metrics.inc("rates_pairs_changed_total", len(changes))
+            logging.info(f"Изменилось курсов: {len(changes)} из {len(pairs)}")
+
+        self.last_changes = changes
+        if changes:
+            self._publish(changes)
 
+        elapsed_ms = (time.monotonic() - cycle_started_at) * 1000
         if errors:
-            logging.info("Обновление завершено с ошибками. Подробности в логах.")
+            logging.info(f"Обновление завершено с ошибками за {elapsed_ms:.0f} мс. Подробности в логах.")
         else:
-            logging.info("Обновление завершено успешно.")
+            logging.info(f"Обновление завершено успешно за {elapsed_ms:.0f} мс.")
 
-        return len(pairs)
\ No newline at end of file
+        return len(pairs)
@@ -0,0 +1,66 @@
+import json
+import socket
+
+from finalproject_1_perfilova.core import exceptions
+
+
+class ServiceClient:
+    """
+    Тонкий клиент к project serve: одно постоянное соединение,
+    запрос/ответ — по одной JSON-строке. Ошибки сервера поднимаются
+    как исключения того же типа (из core.exceptions) либо ValueError.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+
+    def _connect(self):
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError as e:
+                sock.close()
+                raise ConnectionError(f"Сервис недоступен ({self.socket_path}): {e}")
+            self._sock = sock
+            self._file = sock.makefile("rwb")
+        return self._file
+
+    def call(self, method: str, **params):
+        f = self._connect()
+        f.write(json.dumps({"method": method, "params": params}, ensure_ascii=False).encode("utf-8") + b"\n")
+        f.flush()
+
+        raw = f.readline()
+        if not raw:
+            self.close()
+            raise ConnectionError("Сервис закрыл соединение")
+
+        response = json.loads(raw)
+        if response.get("ok"):
+            return response.get("result")
+
+        error_type = getattr(exceptions, str(response.get("type")), None)
+        if isinstance(error_type, type) and issubclass(error_type, Exception):
+            if error_type is exceptions.ApiRequestError:
+                raise exceptions.ApiRequestError(_strip_api_prefix(response.get("error", "")))
+            raise error_type(response.get("error"))
+        raise ValueError(response.get("error"))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        if self._sock is not None:
+            self._sock.close()
+        self._sock = None
+        self._file = None
+
+
+def _strip_api_prefix(message: str):
+    # ApiRequestError сам добавляет префикс — не дублируем его
+    prefix = "Ошибка при обращении к внешнему API: "
+    return message[len(prefix):] if message.startswith(prefix) else message
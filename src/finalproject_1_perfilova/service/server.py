@@ -0,0 +1,147 @@
+import asyncio
+import json
+import logging
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+
+from finalproject_1_perfilova.core import usecases
+from finalproject_1_perfilova.infra import metrics
+from finalproject_1_perfilova.infra.settings import SettingsLoader
+from finalproject_1_perfilova.service.trades import TradeExecutor
+
+
+class CoreService:
+    """
+    Долгоживущий процесс с Core usecases (project serve).
+
+    1. DatabaseManager, настройки и матрица курсов остаются «тёплыми» в памяти
+       между запросами; изменения файлов другими процессами видны по mtime.
+    2. Протокол — Unix socket, одна JSON-строка на запрос и на ответ:
+       {"method": "get_rate", "params": {...}} -> {"ok": true, "result": ...}
+       или {"ok": false, "error": "...", "type": "ApiRequestError"}.
+    3. buy/sell идут через TradeExecutor: по очереди для одного пользователя,
+       параллельно для разных, с group commit портфелей.
+       Все обращения к хранилищу и usecases выполняются в одном потоке-executor:
+       цикл событий не блокируется, а хранилище не видит параллельных потоков.
+    4. SIGINT/SIGTERM останавливают сервер, дописывают портфели и удаляют файл сокета.
+    5. Метрики (если включены) сбрасываются в файл раз в METRICS_FLUSH_SECONDS.
+    """
+
+    def __init__(self, socket_path: str, commit_interval: float | None = None):
+        self.socket_path = socket_path
+        if commit_interval is None:
+            commit_interval = float(SettingsLoader().get("SERVICE_COMMIT_INTERVAL", 0.002))
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="core-service")
+        self.trades = TradeExecutor(commit_interval, self.executor)
+        self.methods = {
+            "ping": lambda: "pong",
+            "get_rate": lambda from_currency, to_currency: self._call(
+                lambda: list(usecases.get_rate(from_currency, to_currency))
+            ),
+            "show_portfolio": lambda base="USD": self._call(usecases.show_portfolio, base),
+            "buy": lambda currency, amount, base="USD", username=None: self._trade(
+                "buy", currency, amount, base, username
+            ),
+            "sell": lambda currency, amount, base="USD", username=None: self._trade(
+                "sell", currency, amount, base, username
+            ),
+        }
+
+    async def dispatch(self, method: str, params: dict):
+        handler = self.methods.get(method)
+        if handler is None:
+            raise ValueError(f"Неизвестный метод '{method}'")
+        # время ответа клиенту, включая ожидание group commit
+        with metrics.timer("service_request", method=method):
+            result = handler(**params)
+            if asyncio.iscoroutine(result):
+                result = await result
+        return result
+
+    async def _call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def _trade(self, side: str, currency: str, amount: float, base: str, username: str | None):
+        # без username — пользователь текущей сессии, как у CLI
+        if username is None:
+            user_id = int((await self._call(usecases.require_login))["user_id"])
+        else:
+            found = await self._call(usecases._find_user, username)
+            if found is None:
+                raise ValueError(f"Пользователь '{username}' не найден")
+            user_id = int(found["user_id"])
+        return await self.trades.trade(user_id, side, currency, amount, base)
+
+    async def _respond(self, raw: bytes):
+        try:
+            request = json.loads(raw)
+            result = await self.dispatch(str(request.get("method")), dict(request.get("params") or {}))
+            return {"ok": True, "result": result}
+        except Exception as e:
+            return {"ok": False, "error": str(e), "type": e.__class__.__name__}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                response = await self._respond(raw)
+                writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        if os.path.exists(self.socket_path):
+            # сокет от упавшего процесса
+            os.unlink(self.socket_path)
+
+        # прогрев: настройки, кеш файлов и матрица курсов
+        await self._call(usecases.get_rate_matrix)
+        # цикл событий не ждёт обновления курсов: устаревший сверх grace курс — ошибка,
+        # обновление идёт в фоне
+        usecases.rate_resolver.blocking = False
+
+        self.trades.start()
+        flusher = asyncio.get_running_loop().create_task(self._flush_metrics()) if metrics.enabled() else None
+
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        logging.info(f"Сервис запущен: {self.socket_path}")
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            if flusher is not None:
+                flusher.cancel()
+            await self.shutdown()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            logging.info("Сервис остановлен.")
+
+    async def _flush_metrics(self):
+        interval = float(SettingsLoader().get("METRICS_FLUSH_SECONDS", 10))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(metrics.flush)
+            except OSError as e:
+                logging.warning(f"Метрики не записаны: {e}")
+
+    async def shutdown(self):
+        """Дописывает отложенные портфели перед выходом."""
+        await self.trades.stop()
+        self.executor.shutdown(wait=True)
+
+    def run(self):
+        asyncio.run(self.serve())
@@ -0,0 +1,246 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from finalproject_1_perfilova.core import usecases
+from finalproject_1_perfilova.decorators import log_event
+
+
+class TradeExecutor:
+    """
+    Исполнение buy/sell внутри project serve.
+
+    1. Операции одного user_id идут строго по очереди (FIFO-блокировка на ключ),
+       операции разных пользователей — параллельно.
+    2. Портфели держатся в памяти; сделка меняет только их и ждёт коммита.
+    3. Сделки пишутся в журнал одним дописыванием (group commit): коммит
+       начинается, как только есть незаписанные сделки, подождав commit_interval,
+       чтобы набрать пачку; пока идёт запись, копится следующая пачка.
+       Ответ клиенту уходит после записи.
+    4. Если в журнал писал другой процесс и затронул пользователей из кэша —
+       их портфели перечитываются, и ещё не записанные сделки применяются
+       к ним заново в том же порядке.
+    5. Чтение курсов, портфелей и запись журнала идут в executor (тот же, что
+       у остальных запросов сервиса), а не в цикле событий.
+    """
+
+    def __init__(self, commit_interval: float = 0.002, executor=None):
+        self.commit_interval = commit_interval
+        self._executor = executor
+        # user_id -> [блокировка, сколько операций её держат или ждут]
+        self._locks: dict[int, list] = {}
+        self._portfolios = {}
+        # user_id -> незаписанные сделки по порядку
+        self._pending: dict[int, list[dict]] = {}
+        self._commit_lock = asyncio.Lock()
+        self._has_pending = asyncio.Event()
+        # до этого смещения чужие записи журнала уже проверены
+        self._scanned = None
+        self._task = None
+        self.stats = {"trades": 0, "commits": 0, "conflicts": 0}
+
+    def start(self):
+        if self._scanned is None:
+            self._scanned = usecases.ledger.head()
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._commit_loop())
+
+    async def stop(self):
+        """Останавливает фоновый коммит и дописывает всё, что осталось."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.commit()
+
+    async def trade(self, user_id: int, side: str, currency: str, amount: float, base: str = "USD"):
+        cur = usecases._validate_currency(currency)
+        base_cur = usecases._validate_currency(base)
+        amount = usecases._validate_amount(amount)
+        if side not in ("buy", "sell"):
+            raise ValueError(f"Неизвестное направление '{side}' (ожидается buy или sell)")
+
+        # курс проверяем до изменения портфеля: ошибочная сделка ничего не трогает
+        rate, _ts = await self._call(usecases.resolve_rate, cur, base_cur)
+
+        entry = {
+            "side": side,
+            "cur": cur,
+            "amount": amount,
+            "event": usecases._trade_event(user_id, side, cur, amount, rate, base_cur),
+            "future": asyncio.get_running_loop().create_future(),
+        }
+
+        async with self._user_lock(user_id):
+            portfolio = self._portfolios.get(user_id)
+            if portfolio is None:
+                portfolio = await self._call(usecases.load_portfolio, user_id)
+                self._portfolios[user_id] = portfolio
+            try:
+                entry["before"], entry["after"] = _apply(portfolio, entry)
+            except Exception as e:
+                _log_trade(user_id, entry, error=e)
+                raise
+            self._pending.setdefault(user_id, []).append(entry)
+            self._has_pending.set()
+
+        await entry["future"]
+        return usecases.trade_report(side, cur, amount, rate, base_cur, entry["before"], entry["after"])
+
+    async def _call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    @asynccontextmanager
+    async def _user_lock(self, user_id: int):
+        """FIFO-блокировка пользователя; убирается, когда её никто не держит и не ждёт."""
+        entry = self._locks.get(user_id)
+        if entry is None:
+            entry = self._locks[user_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[user_id]
+
+    async def _commit_loop(self):
+        while True:
+            await self._has_pending.wait()
+            if self.commit_interval > 0:
+                await asyncio.sleep(self.commit_interval)
+            self._has_pending.clear()
+            try:
+                await self.commit()
+            except Exception as e:
+                logging.error(f"Сервис: ошибка group commit: {e}")
+
+    async def commit(self):
+        """Дописывает все незаписанные сделки в журнал одной операцией."""
+        async with self._commit_lock:
+            if not self._pending:
+                return
+            if self._scanned is None:
+                self._scanned = await self._call(usecases.ledger.head)
+
+            batch, self._pending = self._pending, {}
+            events = [entry["event"] for entries in batch.values() for entry in entries]
+            known = {uid: p.ledger_offset for uid, p in self._portfolios.items()}
+
+            try:
+                positions, stale, self._scanned = await self._call(self._append, events, set(batch), known)
+            except Exception as e:
+                # состояние в памяти больше не совпадает с журналом — забываем его
+                for uid in batch:
+                    self._portfolios.pop(uid, None)
+                    for entry in batch[uid] + self._pending.pop(uid, []):
+                        _fail(entry, e)
+                raise
+
+            if positions is None:
+                self.stats["conflicts"] += 1
+                self._pending = _merge(batch, self._pending)
+                await self._refresh(stale)
+                if self._pending:
+                    self._has_pending.set()
+                return
+
+            ends = iter(end for _offset, end in positions)
+            for uid, entries in batch.items():
+                for entry in entries:
+                    self._portfolios[uid].ledger_offset = next(ends)
+                    if not entry["future"].done():
+                        entry["future"].set_result(None)
+                    _log_trade(uid, entry)
+
+            self.stats["trades"] += len(events)
+            self.stats["commits"] += 1
+            await self._refresh(stale)
+
+    def _append(self, events: list[dict], batch_ids: set[int], known: dict[int, int]):
+        """
+        Под блокировкой журнала: ищет чужие события для портфелей из кэша и,
+        если пачку они не затрагивают, дописывает её.
+        Возвращает (позиции или None, устаревшие user_id, новое смещение проверки).
+        """
+        ledger = usecases.ledger
+        with ledger.lock():
+            stale = set()
+            scanned = self._scanned
+            for offset, end, event in ledger.read_from(self._scanned):
+                uid = int(event["user_id"])
+                if uid in known and offset >= known[uid]:
+                    stale.add(uid)
+                scanned = end
+            if stale & batch_ids:
+                return None, stale, scanned
+
+            positions = usecases._record_trades(events, ledger.tail_length())
+            return positions, stale, positions[-1][1]
+
+    async def _refresh(self, user_ids: set[int]):
+        """
+        Перечитывает портфели, изменённые другим процессом, и заново
+        применяет к ним незаписанные сделки. Без сделок — просто убирает из кэша.
+        """
+        for uid in user_ids:
+            if uid not in self._pending:
+                self._portfolios.pop(uid, None)
+                continue
+
+            fresh = await self._call(usecases.load_portfolio, uid)
+
+            survivors = []
+            for entry in self._pending[uid]:
+                try:
+                    entry["before"], entry["after"] = _apply(fresh, entry)
+                except Exception as e:
+                    _fail(entry, e)
+                    _log_trade(uid, entry, error=e)
+                    continue
+                survivors.append(entry)
+
+            self._portfolios[uid] = fresh
+            if survivors:
+                self._pending[uid] = survivors
+            else:
+                self._pending.pop(uid, None)
+
+
+def _merge(first: dict[int, list[dict]], second: dict[int, list[dict]]):
+    """Очереди сделок: сначала first, затем пришедшие позже second."""
+    merged = {uid: list(entries) for uid, entries in first.items()}
+    for uid, entries in second.items():
+        merged.setdefault(uid, []).extend(entries)
+    return merged
+
+
+def _apply(portfolio, entry: dict):
+    if entry["side"] == "buy":
+        return usecases._apply_buy(portfolio, entry["cur"], entry["amount"])
+    return usecases._apply_sell(portfolio, entry["cur"], entry["amount"])
+
+
+def _fail(entry: dict, error: Exception):
+    if not entry["future"].done():
+        entry["future"].set_exception(error)
+
+
+def _log_trade(user_id: int, entry: dict, error: Exception | None = None):
+    event = entry["event"]
+    log_event(
+        entry["side"].upper(),
+        {
+            "user_id": user_id,
+            "currency": entry["cur"],
+            "amount": entry["amount"],
+            "rate": event["rate"],
+            "base": event["base"],
+            "source": "service",
+        },
+        error=error,
+    )
@@ -0,0 +1,35 @@
+import pytest
+
+from finalproject_1_perfilova.infra import record_store
+from finalproject_1_perfilova.infra.database import DatabaseManager
+from finalproject_1_perfilova.infra.settings import SettingsLoader
+
+
+@pytest.fixture
+def configure(tmp_path, monkeypatch):
+    """
+    Рабочая папка теста с [tool.valutatrade] из аргументов:
+    configure(STORAGE_BACKEND="sqlite") -> путь к папке (данные — в data/).
+    Настройки и кеши, общие на процесс, перечитываются под эту папку.
+    """
+    monkeypatch.chdir(tmp_path)
+
+    def make(**settings):
+        lines = ["[tool.valutatrade]", 'DATA_DIR = "data"', 'PASSWORD_HASH_SCHEME = "sha256"']
+        for key, value in settings.items():
+            if isinstance(value, bool):
+                value = "true" if value else "false"
+            elif isinstance(value, str):
+                value = f'"{value}"'
+            lines.append(f"{key} = {value}")
+        (tmp_path / "pyproject.toml").write_text("\n".join(lines) + "\n", encoding="utf-8")
+        (tmp_path / "data").mkdir(exist_ok=True)
+
+        SettingsLoader().reload()
+        DatabaseManager().invalidate()
+        record_store._stores.clear()
+        return tmp_path
+
+    yield make
+    record_store._stores.clear()
+    DatabaseManager().invalidate()
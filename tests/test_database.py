@@ -0,0 +1,87 @@
+import json
+import multiprocessing
+import os
+import stat
+import threading
+
+import pytest
+
+from finalproject_1_perfilova.infra.database import DatabaseManager
+
+INCREMENTS = 50
+
+
+def _increment(times: int):
+    """read-modify-write счётчика под блокировкой файла."""
+    db = DatabaseManager()
+    for _ in range(times):
+        with db.lock("counter.json"):
+            db.invalidate("counter.json")
+            data = db.read("counter.json", {"value": 0})
+            db.write("counter.json", {"value": data["value"] + 1})
+
+
+def test_write_keeps_existing_mode(configure):
+    root = configure()
+    db = DatabaseManager()
+    db.write("users.json", [])
+    path = root / "data" / "users.json"
+    os.chmod(path, 0o640)
+
+    db.write("users.json", [{"user_id": 1}])
+
+    assert stat.S_IMODE(path.stat().st_mode) == 0o640
+    assert json.loads(path.read_text(encoding="utf-8")) == [{"user_id": 1}]
+
+
+def test_new_file_mode_follows_umask(configure):
+    root = configure()
+    DatabaseManager().write("rates.json", {})
+
+    umask = os.umask(0)
+    os.umask(umask)
+    assert stat.S_IMODE((root / "data" / "rates.json").stat().st_mode) == 0o666 & ~umask
+
+
+def test_concurrent_threads_lose_no_updates(configure):
+    configure()
+    threads = [threading.Thread(target=_increment, args=(INCREMENTS,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    DatabaseManager().invalidate()
+    assert DatabaseManager().read("counter.json", None) == {"value": 4 * INCREMENTS}
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="нужен fork")
+def test_concurrent_processes_lose_no_updates(configure):
+    root = configure()
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_increment, args=(INCREMENTS,)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert all(worker.exitcode == 0 for worker in workers)
+
+    data = json.loads((root / "data" / "counter.json").read_text(encoding="utf-8"))
+    assert data == {"value": 4 * INCREMENTS}
+    assert not list((root / "data").glob(".counter.json.*.tmp"))
+
+
+def test_cache_stats_count_hits_and_misses(configure):
+    configure()
+    db = DatabaseManager()
+    db.write("users.json", [])
+    db.invalidate()
+    before = db.cache_stats()
+
+    db.read("users.json", [])
+    db.read("users.json", [])
+
+    after = db.cache_stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+    assert after["entries"] == 1
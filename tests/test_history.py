@@ -0,0 +1,72 @@
+from datetime import date
+
+from finalproject_1_perfilova.parser_service.storage import RatesStorage
+
+
+def record(pair, ts, rate):
+    frm, to = pair.split("_")
+    return {
+        "id": RatesStorage.make_id(pair, ts),
+        "from_currency": frm,
+        "to_currency": to,
+        "rate": rate,
+        "timestamp": ts,
+        "source": "test",
+    }
+
+
+RECORDS = [
+    record("BTC_USD", "2026-10-15T10:00:00Z", 60000.0),
+    record("EUR_USD", "2026-10-15T10:00:00Z", 1.10),
+    record("BTC_USD", "2026-10-16T10:00:00Z", 61000.0),
+    record("BTC_USD", "2026-10-17T09:00:00Z", 62000.0),
+    record("BTC_USD", "2026-10-17T10:00:00Z", 63000.0),
+]
+
+
+def storage():
+    return RatesStorage("rates.json", "history")
+
+
+def test_append_is_deduplicated_by_id(configure):
+    configure()
+    storage().append_history(RECORDS)
+    storage().append_history(RECORDS[2:])
+    storage().append_history(RECORDS)
+
+    assert storage().list_segments() == ["2026-10-15", "2026-10-16", "2026-10-17"]
+    assert sorted(r["id"] for r in storage().iter_history()) == sorted(r["id"] for r in RECORDS)
+
+
+def test_query_range_is_inclusive(configure):
+    configure()
+    storage().append_history(RECORDS)
+
+    rates = [r["rate"] for r in storage().query_history("btc_usd", "2026-10-16T10:00:00Z", "2026-10-17T09:00:00Z")]
+    assert rates == [61000.0, 62000.0]
+    assert [r["rate"] for r in storage().query_history("EUR_USD")] == [1.10]
+    assert storage().query_history("ETH_USD") == []
+
+
+def test_query_rebuilds_missing_index(configure):
+    root = configure()
+    storage().append_history(RECORDS)
+    (root / "data" / "history" / "2026-10-17.idx").unlink()
+
+    assert [r["rate"] for r in storage().query_history("BTC_USD", "2026-10-17")] == [62000.0, 63000.0]
+
+
+def test_compaction_merges_days_into_month(configure):
+    configure()
+    rates = storage()
+    rates.append_history(RECORDS)
+
+    assert rates.compact_history(date(2026, 10, 17)) == 2
+    assert rates.list_segments() == ["2026-10", "2026-10-17"]
+
+    # повтор записи уже слитого дня убирается при следующем слиянии
+    rates.append_history(RECORDS[:1])
+    rates.compact_history(date(2026, 10, 17))
+    assert len([r for r in rates.iter_history() if r["id"] == RECORDS[0]["id"]]) == 1
+
+    assert [r["rate"] for r in rates.query_history("BTC_USD")] == [60000.0, 61000.0, 62000.0, 63000.0]
@@ -0,0 +1,116 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from finalproject_1_perfilova.core.exceptions import ApiRequestError
+from finalproject_1_perfilova.parser_service import http_session
+from finalproject_1_perfilova.parser_service.config import ParserConfig
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1: соединение остаётся открытым между запросами (keep-alive)
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, self.client_address[1], dict(self.headers)))
+        status, headers, body = server.responses.get(self.path, [(404, {}, b"{}")]).pop(0)
+        if not server.responses.get(self.path):
+            # последний ответ повторяется
+            server.responses[self.path] = [(status, headers, body)]
+
+        if status == 200 and headers.get("ETag") and self.headers.get("If-None-Match") == headers["ETag"]:
+            status, body = 304, b""
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    for name in ("HTTP_PROXY", "HTTPS_PROXY", "ALL_PROXY", "http_proxy", "https_proxy", "all_proxy"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(http_session, "_sessions", {})
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.responses = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def fast_config(**overrides):
+    """ParserConfig без пауз между повторами."""
+    cfg = ParserConfig(RETRY_BACKOFF_BASE=0.0, RETRY_BACKOFF_MAX=0.0, REQUEST_TIMEOUT=5)
+    for name, value in overrides.items():
+        setattr(cfg, name, value)
+    return cfg
+
+
+def test_session_shared_between_config_objects():
+    # get_config() создаёт новый ParserConfig на каждое обновление
+    assert http_session.get_http_session(fast_config()) is http_session.get_http_session(fast_config())
+    assert http_session.get_http_session(fast_config()) is not http_session.get_http_session(
+        fast_config(REQUEST_TIMEOUT=3)
+    )
+
+
+def test_connection_reused_across_updates(stub):
+    stub.responses["/rates"] = [(200, {}, b'{"ok": 1}')]
+
+    for _ in range(3):
+        # как build_updater: новый cfg на каждое обновление
+        assert http_session.get_http_session(fast_config()).get_json(stub.url + "/rates", "stub") == {"ok": 1}
+
+    ports = {port for _path, port, _headers in stub.requests}
+    assert len(stub.requests) == 3
+    assert len(ports) == 1
+
+
+def test_retries_on_503_then_succeeds(stub):
+    stub.responses["/flaky"] = [(503, {}, b"{}"), (503, {}, b"{}"), (200, {}, b'{"rate": 2}')]
+
+    data = http_session.get_http_session(fast_config()).get_json(stub.url + "/flaky", "stub")
+
+    assert data == {"rate": 2}
+    assert len(stub.requests) == 3
+
+
+def test_retry_budget_is_bounded(stub):
+    stub.responses["/down"] = [(503, {}, b"{}")]
+
+    with pytest.raises(ApiRequestError, match="503"):
+        http_session.get_http_session(fast_config(RETRY_ATTEMPTS=2)).get_json(stub.url + "/down", "stub")
+    assert len(stub.requests) == 2
+
+
+def test_client_error_is_not_retried(stub):
+    stub.responses["/missing"] = [(404, {}, b"{}")]
+
+    with pytest.raises(ApiRequestError, match="404"):
+        http_session.get_http_session(fast_config()).get_json(stub.url + "/missing", "stub")
+    assert len(stub.requests) == 1
+
+
+def test_not_modified_returns_cached_body(stub):
+    stub.responses["/etag"] = [(200, {"ETag": '"v1"'}, b'{"rate": 5}')]
+    session = http_session.get_http_session(fast_config())
+
+    first = session.get_json(stub.url + "/etag", "stub")
+    second = session.get_json(stub.url + "/etag", "stub")
+
+    assert first == second == {"rate": 5}
+    assert stub.requests[1][2].get("If-None-Match") == '"v1"'
@@ -0,0 +1,43 @@
+from finalproject_1_perfilova.infra.ledger import TradeLedger
+
+
+def event(n):
+    return {"user_id": 1, "side": "buy", "currency": "EUR", "amount": n, "rate": 1.1, "base": "USD"}
+
+
+def test_append_cuts_torn_tail(configure):
+    root = configure()
+    ledger = TradeLedger()
+    ledger.append([event(1), event(2)])
+    path = root / "data" / "ledger.jsonl"
+    intact = path.stat().st_size
+    # сбой посреди записи: строка без перевода строки в конце
+    with open(path, "ab") as f:
+        f.write(b'{"user_id":1,"side":"bu')
+
+    (offset, end), = ledger.append([event(3)])
+
+    assert offset == intact
+    assert end == path.stat().st_size
+    assert [e["amount"] for _start, _end, e in ledger.read_from(0)] == [1, 2, 3]
+
+
+def test_single_torn_line_is_cut_entirely(configure):
+    root = configure()
+    path = root / "data" / "ledger.jsonl"
+    path.write_bytes(b'{"user_id":1,"sid')
+
+    TradeLedger().append([event(1)])
+
+    assert [e["amount"] for _start, _end, e in TradeLedger().read_from(0)] == [1]
+
+
+def test_tail_starts_after_snapshot(configure):
+    configure()
+    ledger = TradeLedger()
+    (_, first_end), _ = ledger.append([event(1), event(2)])
+    ledger.mark_snapshot(first_end)
+    ledger.append([event(3)])
+
+    assert [e["amount"] for _start, _end, e in ledger.tail()] == [2, 3]
+    assert ledger.tail_length() == 2
@@ -0,0 +1,60 @@
+import json
+import logging
+
+import pytest
+
+from finalproject_1_perfilova import logging_config
+from finalproject_1_perfilova.decorators import log_event
+
+
+@pytest.fixture
+def logs(configure):
+    def make(**settings):
+        root = configure(LOG_DIR="logs", **settings)
+        logging.getLogger("valutatrade.actions").setLevel(logging.INFO)
+        logging_config.setup_logging()
+        return root / "logs" / "app.log"
+
+    yield make
+    logging_config.shutdown_logging()
+
+
+def test_action_is_written_as_json_line(logs):
+    log_file = logs()
+    log_event("BUY", {"username": "alice", "currency": "BTC", "amount": 0.01, "rate": 60000.0, "base": "USD"})
+    log_event("SELL", {"username": "alice"}, error=ValueError("мало средств"))
+    logging_config.shutdown_logging()
+
+    lines = [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()]
+    assert [line["action"] for line in lines] == ["BUY", "SELL"]
+    assert lines[0]["logger"] == "valutatrade.actions"
+    assert lines[0]["level"] == "INFO"
+    assert lines[0]["amount"] == 0.01
+    assert lines[0]["result"] == "OK"
+    assert lines[1]["result"] == "ERROR"
+    assert lines[1]["error"] == "мало средств"
+
+
+def test_text_format_builds_line_from_fields(logs):
+    log_file = logs(LOG_FORMAT="text")
+    log_event("BUY", {"username": "alice", "currency": "BTC", "amount": 0.01, "rate": 60000.0, "base": "USD"})
+    logging_config.shutdown_logging()
+
+    line = log_file.read_text(encoding="utf-8").strip()
+    assert line.startswith("INFO ")
+    assert line.endswith("BUY user='alice' currency='BTC' amount=0.0100 rate=60000.00 base='USD' result=OK")
+
+
+def test_file_is_reopened_after_external_rotation(logs):
+    log_file = logs()
+    log_event("BUY", {"username": "alice"})
+    logging_config._listener.stop()
+    logging_config._listener.flush()
+    log_file.rename(log_file.with_name("app.log.1"))
+
+    logging_config._listener.start()
+    log_event("SELL", {"username": "alice"})
+    logging_config.shutdown_logging()
+
+    assert json.loads(log_file.read_text(encoding="utf-8"))["action"] == "SELL"
+    assert json.loads(log_file.with_name("app.log.1").read_text(encoding="utf-8"))["action"] == "BUY"
@@ -0,0 +1,55 @@
+import pytest
+
+from finalproject_1_perfilova.infra import rates_binary
+from finalproject_1_perfilova.parser_service.storage import RatesStorage
+
+NOW = "2026-10-17T12:00:00Z"
+
+
+def pairs(**rates):
+    return {pair: {"rate": rate, "updated_at": NOW, "source": "test"} for pair, rate in rates.items()}
+
+
+def test_snapshot_round_trip(configure):
+    configure()
+    rates_binary.write("rates.bin", pairs(BTC_USD=60000.0, EUR_USD=1.1), last_refresh=NOW, generation=3)
+
+    snapshot = rates_binary.open_snapshot("rates.bin")
+
+    assert snapshot.generation == 3
+    assert sorted(snapshot.names()) == ["BTC_USD", "EUR_USD"]
+    rate, _updated, source = snapshot.get("EUR_USD")
+    assert (rate, source) == (1.1, "test")
+    assert snapshot.get("ETH_USD") is None
+
+
+def test_long_pair_name_is_rejected():
+    with pytest.raises(ValueError):
+        rates_binary.pack_snapshot(pairs(VERYLONGTOKEN_USDT=1.0))
+
+
+def test_storage_falls_back_to_json_for_long_names(configure):
+    root = configure(RATES_BINARY_SNAPSHOT=True)
+    storage = RatesStorage("rates.json", "history")
+    storage.write_snapshot(pairs(BTC_USD=60000.0), last_refresh=NOW)
+    assert (root / "data" / "rates.bin").exists()
+
+    storage.write_snapshot(pairs(BTC_USD=60000.0, VERYLONGTOKEN_USDT=1.0), last_refresh=NOW)
+
+    assert not (root / "data" / "rates.bin").exists()
+    assert rates_binary.open_snapshot("rates.bin") is None
+    assert "VERYLONGTOKEN_USDT" in storage.read_pairs()
+
+
+def test_replaced_snapshot_is_unmapped(configure):
+    configure()
+    rates_binary.write("rates.bin", pairs(BTC_USD=60000.0), last_refresh=NOW, generation=1)
+    old = rates_binary.open_snapshot("rates.bin")
+    assert rates_binary.open_snapshot("rates.bin") is old
+
+    rates_binary.write("rates.bin", pairs(BTC_USD=61000.0, ETH_USD=3000.0), last_refresh=NOW, generation=2)
+    new = rates_binary.open_snapshot("rates.bin")
+
+    assert new is not old
+    assert new.get("BTC_USD")[0] == 61000.0
+    assert old._mmap.closed
@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from finalproject_1_perfilova.core import usecases
+from finalproject_1_perfilova.core.exceptions import InsufficientFundsError
+from finalproject_1_perfilova.service.client import ServiceClient
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def service(configure, request):
+    """project serve в отдельном процессе; пользователь alice вошёл, курс EUR_USD свежий."""
+    root = configure(STORAGE_BACKEND=request.param)
+    now = datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+    snapshot = {"pairs": {"EUR_USD": {"rate": 1.1, "updated_at": now, "source": "test"}}, "last_refresh": now}
+    (root / "data" / "rates.json").write_text(json.dumps(snapshot), encoding="utf-8")
+    usecases.register_user("alice", "secret12")
+    usecases.login_user("alice", "secret12")
+
+    socket_path = str(root / "serve.sock")
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(p for p in sys.path if p)}
+    server = subprocess.Popen(
+        [sys.executable, "-c", "import sys; from finalproject_1_perfilova.service.server import CoreService; CoreService(sys.argv[1]).run()", socket_path],
+        cwd=root,
+        env=env,
+    )
+    client = ServiceClient(socket_path, timeout=10)
+    try:
+        deadline = time.monotonic() + 15
+        while not os.path.exists(socket_path):
+            assert server.poll() is None, "serve завершился при старте"
+            assert time.monotonic() < deadline, "serve не создал сокет"
+            time.sleep(0.05)
+        yield client
+    finally:
+        client.close()
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def test_buy_then_show_portfolio(service):
+    bought = service.call("buy", currency="EUR", amount=2.0)
+    assert "2.0000 EUR" in bought
+
+    portfolio = service.call("show_portfolio")
+    assert "EUR: 2.0000" in portfolio
+    assert "2.20 USD" in portfolio
+
+    rate, _updated_at = service.call("get_rate", from_currency="EUR", to_currency="USD")
+    assert rate == 1.1
+
+
+def test_errors_keep_their_type(service):
+    service.call("buy", currency="EUR", amount=1.0)
+    with pytest.raises(InsufficientFundsError):
+        service.call("sell", currency="EUR", amount=5.0)
+
+    # неудачная продажа ничего не списала
+    assert "EUR: 1.0000" in service.call("show_portfolio")
@@ -0,0 +1,58 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from finalproject_1_perfilova.core import usecases
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def market(configure, request):
+    """Хранилище с пользователями alice и bob и свежим курсом EUR_USD."""
+    root = configure(STORAGE_BACKEND=request.param)
+    now = datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+    snapshot = {"pairs": {"EUR_USD": {"rate": 1.1, "updated_at": now, "source": "test"}}, "last_refresh": now}
+    (root / "data" / "rates.json").write_text(json.dumps(snapshot), encoding="utf-8")
+    usecases.register_user("alice", "secret12")
+    usecases.register_user("bob", "secret12")
+    return root
+
+
+def test_orders_get_individual_results(market):
+    results = usecases.trade_batch([
+        {"line": 1, "user": "alice", "side": "buy", "currency": "EUR", "amount": 10},
+        {"line": 2, "user": "alice", "side": "sell", "currency": "EUR", "amount": 4},
+        {"line": 3, "user": "bob", "side": "sell", "currency": "EUR", "amount": 1},
+        {"line": 4, "user": "carol", "side": "buy", "currency": "EUR", "amount": 1},
+        {"line": 5, "user": "bob", "side": "hold", "currency": "EUR", "amount": 1},
+        {"line": 6, "user": "bob", "side": "buy", "currency": "XXX", "amount": 1},
+        {"line": 7, "user": "alice", "side": "sell", "currency": "EUR", "amount": 100},
+    ])
+
+    assert [r["status"] for r in results] == ["OK", "OK", "ERROR", "ERROR", "ERROR", "ERROR", "ERROR"]
+    assert "carol" in results[3]["message"]
+    alice = usecases._find_user("alice")
+    assert usecases.load_portfolio(int(alice["user_id"])).get_wallet("EUR").balance == pytest.approx(6.0)
+
+
+def test_atomic_batch_rolls_back_everything(market):
+    results = usecases.trade_batch(
+        [
+            {"line": 1, "user": "alice", "side": "buy", "currency": "EUR", "amount": 10},
+            {"line": 2, "user": "bob", "side": "sell", "currency": "EUR", "amount": 1},
+        ],
+        atomic=True,
+    )
+
+    assert [r["status"] for r in results] == ["ROLLED_BACK", "ERROR"]
+    alice = usecases._find_user("alice")
+    assert "EUR" not in usecases.load_portfolio(int(alice["user_id"])).wallets
+
+
+def test_unexpected_errors_are_not_swallowed(market, monkeypatch):
+    def broken(*args):
+        raise RuntimeError("сбой")
+
+    monkeypatch.setattr(usecases, "_apply_buy", broken)
+    with pytest.raises(RuntimeError):
+        usecases.trade_batch([{"line": 1, "user": "alice", "side": "buy", "currency": "EUR", "amount": 1}])
@@ -0,0 +1,78 @@
+import logging
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+from finalproject_1_perfilova.core.exceptions import ApiRequestError
+from finalproject_1_perfilova.parser_service.config import ParserConfig
+from finalproject_1_perfilova.parser_service.updater import RatesUpdater
+
+
+class StubClient:
+    def __init__(self, name, rates=None, delay=0.0, error=None):
+        self.SOURCE_NAME = name
+        self.rates = rates or {}
+        self.delay = delay
+        self.error = error
+
+    def fetch_rates(self):
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.rates
+
+
+def test_fetch_all_skips_sources_past_deadline(configure):
+    configure()
+    updater = RatesUpdater(
+        clients=[
+            StubClient("Fast", {"BTC_USD": 60000.0}),
+            StubClient("Hung", {"ETH_USD": 3000.0}, delay=5.0),
+            StubClient("Broken", error=ApiRequestError("503")),
+        ],
+        storage=None,
+        deadline_seconds=0.3,
+    )
+
+    started_at = time.monotonic()
+    rates, errors = updater.fetch_all()
+
+    assert time.monotonic() - started_at < 2.0
+    assert rates == {"BTC_USD": (60000.0, "Fast")}
+    assert errors == 2
+
+
+def test_hung_source_does_not_block_process_exit(tmp_path):
+    script = textwrap.dedent(
+        """
+        import time
+        from finalproject_1_perfilova.parser_service.updater import RatesUpdater
+
+        class Hung:
+            SOURCE_NAME = "Hung"
+
+            def fetch_rates(self):
+                time.sleep(60)
+
+        RatesUpdater(clients=[Hung()], storage=None, deadline_seconds=0.2).fetch_all()
+        """
+    )
+    started_at = time.monotonic()
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(p for p in sys.path if p)}
+    subprocess.run([sys.executable, "-c", script], cwd=tmp_path, env=env, check=True, timeout=30)
+    assert time.monotonic() - started_at < 15
+
+
+def test_default_deadline_covers_retry_budget():
+    cfg = ParserConfig(REQUEST_TIMEOUT=10, RETRY_ATTEMPTS=3, RETRY_BACKOFF_MAX=8.0)
+    assert cfg.retry_budget() == 10 * 3 + 8.0 * 2
+    assert cfg.UPDATE_DEADLINE == cfg.retry_budget()
+
+
+def test_short_deadline_is_reported(caplog):
+    with caplog.at_level(logging.WARNING):
+        cfg = ParserConfig(UPDATE_DEADLINE=15.0)
+    assert cfg.UPDATE_DEADLINE == 15.0
+    assert "UPDATE_DEADLINE" in caplog.text